@@ -0,0 +1,127 @@
+"""
+Сравнение словарей из ответа API и записей Vacancy/Company по памяти и времени формирования строк таблиц.
+Запуск из корня проекта: python -m benchmarks.bench_models
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+from typing import Any, Callable
+
+from benchmarks.datasets import iter_vacancies
+from src.models import Company, Vacancy
+from src.schema_manager import _content_hash
+
+VACANCIES_COUNT = 20000  # Количество вакансий в наборе данных
+
+
+def dict_row(vacancy: dict) -> tuple:
+    """
+    Формирует строку таблицы vacancies из словаря так, как это делалось до появления записей: зарплата и фрагмент
+    описания разбираются при каждом формировании строки.
+    @param vacancy: Данные о вакансии из ответа API.
+    @return: Кортеж значений с хэшем содержимого.
+    """
+    salary, salary_currency = None, None
+    if vacancy["salary"] is not None:
+        bounds = [bound for bound in (vacancy["salary"]["from"], vacancy["salary"]["to"]) if bound]
+        if bounds:
+            salary = max(bounds)
+            salary_currency = vacancy["salary"]["currency"]
+    snippet = vacancy["snippet"] or {}
+    row = (
+        vacancy["id"],
+        vacancy["employer"]["id"],
+        vacancy["name"],
+        salary,
+        salary_currency,
+        vacancy["published_at"],
+        vacancy["url"],
+        snippet.get("requirement"),
+        snippet.get("responsibility"),
+    )
+    return row + (_content_hash(row),)
+
+
+def record_row(vacancy: Vacancy) -> tuple:
+    """
+    Формирует строку таблицы vacancies из записи о вакансии.
+    @param vacancy: Запись о вакансии.
+    @return: Кортеж значений с хэшем содержимого.
+    """
+    row = vacancy.row()
+    return row + (_content_hash(row),)
+
+
+def measure_memory(build: Callable[[], Any]) -> int:
+    """
+    Измеряет память, занимаемую результатом функции.
+    @param build: Функция, создающая объекты.
+    @return: Размер памяти в байтах.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def measure_time(function: Callable[[], Any], repeat: int = 5) -> float:
+    """
+    Измеряет лучшее время выполнения функции.
+    @param function: Функция.
+    @param repeat: Количество повторов.
+    @return: Время в секундах.
+    """
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def normalize(vacancies: list[dict]) -> list[Vacancy]:
+    """
+    Преобразует вакансии в записи (как стадия normalize_page конвейера).
+    @param vacancies: Вакансии из ответа API.
+    @return: Записи о вакансиях.
+    """
+    companies: dict[str, Company] = {}
+    return [Vacancy.from_api(vacancy, companies) for vacancy in vacancies]
+
+
+def main() -> None:
+    """
+    Выводит результаты сравнения.
+    @return: None
+    """
+    raw = json.dumps(list(iter_vacancies(VACANCIES_COUNT)))
+    vacancies = json.loads(raw)
+    records = normalize(vacancies)
+
+    # Учитывается память, которая остаётся занятой: исходные словари после нормализации освобождаются,
+    # а записи ссылаются на те же строки
+    dict_memory = measure_memory(lambda: json.loads(raw))
+    record_memory = measure_memory(lambda: normalize(json.loads(raw)))
+
+    dict_time = measure_time(lambda: [dict_row(vacancy) for vacancy in vacancies])
+    record_time = measure_time(lambda: [record_row(record) for record in records])
+    normalize_time = measure_time(lambda: normalize(vacancies))
+
+    print("Вакансий: %d" % len(records))
+    print(
+        "Память: словари - %.1f МБ, записи - %.1f МБ (в %.1f раза меньше)"
+        % (dict_memory / 2**20, record_memory / 2**20, dict_memory / record_memory)
+    )
+    print(
+        "Формирование строк: словари - %.3f с, записи - %.3f с (нормализация выполняется один раз - %.3f с)"
+        % (dict_time, record_time, normalize_time)
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Синтетические наборы вакансий в формате ответа API hh.ru для бенчмарков.
+Вакансии строятся по образцу вакансий из data/data.json (все поля ответа API сохраняются), а ID, работодатели,
+зарплаты и даты публикации генерируются псевдослучайно с фиксированным seed, поэтому набор воспроизводим.
+"""
+
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from src.file_utils import JsonWorker
+
+SOURCE_FILE = "data/data.json"  # Вакансии-образцы
+DATA_DIR = "benchmarks/data"  # Каталог сгенерированных наборов
+SEED = 20241201
+EMPLOYERS_RATIO = 20  # В среднем вакансий на одного работодателя
+PERIOD_DAYS = 30  # Период дат публикации
+PUBLISHED_TO = datetime(2024, 12, 1, 12, 0, 0)
+
+CURRENCIES = ("RUR",) * 17 + ("USD", "EUR", "KZT")
+TITLES = ("Python-разработчик", "Backend developer", "Data Engineer", "Golang Developer", "Аналитик данных")
+LEVELS = ("Junior", "Middle", "Senior", "Lead", "")
+
+
+def iter_vacancies(count: int, seed: int = SEED) -> Iterator[dict]:
+    """
+    Генерирует вакансии по одной, поэтому память не зависит от размера набора.
+    @param count: Количество вакансий.
+    @param seed: Начальное значение генератора псевдослучайных чисел.
+    @return: Генератор вакансий в формате ответа API.
+    """
+    with open(SOURCE_FILE, encoding="utf-8") as file:
+        templates = [json.dumps(vacancy, ensure_ascii=False) for vacancy in json.load(file)]
+    rng = random.Random(seed)
+    employers_count = max(1, count // EMPLOYERS_RATIO)
+
+    for index in range(count):
+        # Копия образца через JSON быстрее copy.deepcopy
+        vacancy = json.loads(templates[index % len(templates)])
+        vacancy_id = str(100000000 + index)
+        vacancy["id"] = vacancy_id
+        vacancy["name"] = ("%s %s" % (rng.choice(LEVELS), rng.choice(TITLES))).strip()
+        vacancy["url"] = "https://api.hh.ru/vacancies/%s?host=hh.ru" % vacancy_id
+        vacancy["alternate_url"] = "https://hh.ru/vacancy/%s" % vacancy_id
+
+        employer_id = str(rng.randrange(employers_count) + 1)
+        vacancy["employer"].update(
+            id=employer_id,
+            name="Компания %s" % employer_id,
+            url="https://api.hh.ru/employers/%s" % employer_id,
+            alternate_url="https://hh.ru/employer/%s" % employer_id,
+            trusted=rng.random() < 0.9,
+        )
+
+        if rng.random() < 0.3:
+            vacancy["salary"] = None
+        else:
+            low = rng.randrange(30, 400) * 1000
+            high = low + rng.randrange(0, 200) * 1000 if rng.random() < 0.6 else None
+            vacancy["salary"] = {"from": low, "to": high, "currency": rng.choice(CURRENCIES), "gross": False}
+
+        published_at = PUBLISHED_TO - timedelta(seconds=rng.randrange(PERIOD_DAYS * 24 * 3600))
+        vacancy["published_at"] = vacancy["created_at"] = published_at.strftime("%Y-%m-%dT%H:%M:%S+0300")
+        yield vacancy
+
+
+def dataset_file(count: int, seed: int = SEED) -> str:
+    """
+    Получает путь к файлу JSON Lines с набором вакансий, создавая файл при первом обращении.
+    @param count: Количество вакансий.
+    @param seed: Начальное значение генератора псевдослучайных чисел.
+    @return: Путь к файлу.
+    """
+    file_name = os.path.join(DATA_DIR, "vacancies_%d_%d.ndjson" % (count, seed))
+    if not os.path.exists(file_name):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        # Файл записывается под временным именем, чтобы прерванная генерация не оставила неполный набор
+        JsonWorker(file_name + ".tmp").write_lines(iter_vacancies(count, seed))
+        os.replace(file_name + ".tmp", file_name)
+    return file_name
@@ -0,0 +1,347 @@
+"""
+Набор бенчмарков загрузки и запросов: JsonWorker (запись и чтение), загрузка и запросы хранилища вакансий
+на синтетических наборах вакансий (benchmarks/datasets.py): локального сервера PostgreSQL (параметры из database.ini)
+или встроенной базы данных SQLite (--backend sqlite).
+Каждый шаг выполняется в отдельном процессе, поэтому пиковая память (RSS) измеряется для каждого шага отдельно.
+Результаты записываются в json-файл, который можно сравнить с результатами предыдущего запуска.
+
+Запуск из корня проекта:
+    python -m benchmarks.run --sizes 10000 100000 1000000
+    python -m benchmarks.run --compare benchmarks/results/<предыдущий запуск>.json
+    python -m benchmarks.run --backend sqlite --sizes 10000
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import time
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+import psycopg2
+
+from benchmarks.datasets import SEED, dataset_file
+from src.config import config
+from src.file_utils import JsonWorker
+from src.storage import STORAGE_BACKENDS, PostgresBackend, StorageBackend, open_backend
+
+SIZES = (10000, 100000)  # Размеры наборов по умолчанию
+ARRAY_MAX_SIZE = 100000  # JSON-массив записывается из списка в памяти, поэтому для больших наборов не измеряется
+DATA_BASE_NAME = "headhunter_bench"
+SQLITE_PATH = "benchmarks/data/headhunter_bench.sqlite"
+RESULTS_DIR = "benchmarks/results"
+QUERY_REPEAT = 20  # Количество выполнений каждого запроса
+REGRESSION_THRESHOLD = 0.1  # Ухудшение больше чем на 10% считается регрессией
+
+# Запросы хранилища: имя - (метод, дополнительные аргументы)
+QUERIES: dict[str, tuple[str, tuple]] = {
+    "get_companies_and_vacancies_count": ("get_companies_and_vacancies_count", ()),
+    "get_all_vacancies": ("get_all_vacancies", ()),
+    "get_avg_salary": ("get_avg_salary", ()),
+    "get_salary_stats": ("get_salary_stats", ()),
+    "get_vacancies_with_higher_salary": ("get_vacancies_with_higher_salary", ()),
+    "get_vacancies_with_keyword": ("get_vacancies_with_keyword", ("python разработчик",)),
+    "get_vacancies_with_keyword(fts)": ("get_vacancies_with_keyword", ("python разработчик", "fts")),
+}
+POSTGRESQL_ONLY_QUERIES = ("get_salary_stats",)  # Запросы DBManager, которых нет в интерфейсе StorageBackend
+
+
+def peak_rss_mb() -> float:
+    """
+    Получает пиковый объём памяти процесса (RSS).
+    @return: Пиковый RSS в МБ.
+    """
+    # ru_maxrss на Linux - в КБ, на macOS - в байтах
+    scale = 1 if platform.system() == "Darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+def percentile(values: Sequence[float], fraction: float) -> float:
+    """
+    Вычисляет перцентиль методом ближайшего ранга.
+    @param values: Значения.
+    @param fraction: Доля (например, 0.95).
+    @return: Значение перцентиля.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def json_write_lines(file_name: str, size: int) -> int:
+    """
+    Записывает набор в файл JSON Lines (JsonWorker.write_lines). Вакансии читаются из файла набора потоково, поэтому
+    время включает чтение (см. json_iter_lines).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @return: Количество записанных вакансий.
+    """
+    return JsonWorker(file_name + ".copy").write_lines(JsonWorker(file_name).iter_file())
+
+
+def json_write_file(file_name: str, size: int) -> int:
+    """
+    Записывает набор в файл JSON-массива (JsonWorker.write_file). Время включает чтение набора в список.
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @return: Количество записанных вакансий.
+    """
+    data = list(JsonWorker(file_name).iter_file())
+    JsonWorker(file_name + ".json").write_file(data)
+    return len(data)
+
+
+def json_iter_lines(file_name: str, size: int) -> int:
+    """
+    Читает файл JSON Lines потоково (JsonWorker.iter_file).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @return: Количество прочитанных вакансий.
+    """
+    return sum(1 for _ in JsonWorker(file_name).iter_file())
+
+
+def json_iter_array(file_name: str, size: int) -> int:
+    """
+    Читает файл JSON-массива потоково (JsonWorker.iter_file).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @return: Количество прочитанных вакансий.
+    """
+    return sum(1 for _ in JsonWorker(file_name + ".json").iter_file())
+
+
+def json_read_file(file_name: str, size: int) -> int:
+    """
+    Читает файл JSON-массива целиком (JsonWorker.read_file).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @return: Количество прочитанных вакансий.
+    """
+    return len(JsonWorker(file_name + ".json").read_file())
+
+
+def storage(backend: str) -> StorageBackend:
+    """
+    Открывает хранилище вакансий бенчмарков.
+    @param backend: Имя хранилища - "postgresql" или "sqlite".
+    @return: Хранилище вакансий.
+    """
+    if backend == "sqlite":
+        return open_backend(backend, path=SQLITE_PATH)
+    # Кэш результатов DBManager отключён: измеряется время выполнения запроса базой данных
+    return open_backend(backend, connection_parameters=config(), data_base_name=DATA_BASE_NAME, cache_size=0)
+
+
+def insert_data(file_name: str, size: int, backend: str = "postgresql", incremental: bool = False) -> int:
+    """
+    Загружает набор в базу данных (StorageBackend.insert_data).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @param backend: Имя хранилища.
+    @param incremental: Инкрементальная загрузка.
+    @return: Количество загруженных вакансий.
+    """
+    with storage(backend) as store:
+        store.insert_data(JsonWorker(file_name).iter_file(), incremental=incremental)
+    return size
+
+
+def insert_data_incremental(file_name: str, size: int, backend: str = "postgresql") -> int:
+    """
+    Повторно загружает тот же набор инкрементально (строки не изменились).
+    @param file_name: Путь к файлу набора.
+    @param size: Количество вакансий.
+    @param backend: Имя хранилища.
+    @return: Количество загруженных вакансий.
+    """
+    return insert_data(file_name, size, backend, incremental=True)
+
+
+def run_query(name: str, repeat: int, backend: str = "postgresql") -> list[float]:
+    """
+    Выполняет запрос хранилища несколько раз.
+    @param name: Имя запроса (см. QUERIES).
+    @param repeat: Количество выполнений.
+    @param backend: Имя хранилища.
+    @return: Время выполнения каждого запроса в миллисекундах.
+    """
+    method, args = QUERIES[name]
+    latencies = []
+    with storage(backend) as store:
+        target: Any = store
+        if not hasattr(StorageBackend, method) and isinstance(store, PostgresBackend):
+            # Запросы, которых нет в интерфейсе хранилища, выполняются через DBManager
+            target, args = store.db_manager, (DATA_BASE_NAME, *args)
+        # Первое выполнение открывает соединение и прогревает кэш сервера, поэтому не учитывается
+        getattr(target, method)(*args)
+        for _ in range(repeat):
+            started_at = time.perf_counter()
+            getattr(target, method)(*args)
+            latencies.append((time.perf_counter() - started_at) * 1000)
+    return latencies
+
+
+def _in_child(function: Callable, *args: Any) -> tuple[Any, float, float]:
+    """
+    Выполняет функцию шага (в отдельном процессе).
+    @param function: Функция шага.
+    @param args: Аргументы функции.
+    @return: Результат функции, время выполнения в секундах и пиковый RSS процесса в МБ.
+    """
+    started_at = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started_at, peak_rss_mb()
+
+
+def measure(function: Callable, *args: Any) -> tuple[Any, float, float]:
+    """
+    Выполняет функцию шага в новом процессе.
+    @param function: Функция шага (должна быть доступна для импорта).
+    @param args: Аргументы функции.
+    @return: Результат функции, время выполнения в секундах и пиковый RSS процесса в МБ.
+    """
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(_in_child, (function, *args))
+
+
+def run_size(size: int, repeat: int, backend: str = "postgresql") -> dict[str, dict]:
+    """
+    Выполняет все шаги на наборе одного размера.
+    @param size: Количество вакансий.
+    @param repeat: Количество выполнений каждого запроса.
+    @param backend: Имя хранилища.
+    @return: Результаты шагов {имя шага: метрики}.
+    """
+    file_name = dataset_file(size)
+    results: dict[str, dict] = {}
+
+    steps = [json_write_lines, json_iter_lines]
+    if size <= ARRAY_MAX_SIZE:
+        steps += [json_write_file, json_iter_array, json_read_file]
+    for step in steps:
+        rows, seconds, rss = measure(step, file_name, size)
+        results[step.__name__] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds, "peak_rss_mb": rss}
+        print("%d %s: %.0f строк/с, %.0f МБ" % (size, step.__name__, rows / seconds, rss))
+
+    with storage(backend) as store:
+        store.create_schema(recreate=True)
+    for step in (insert_data, insert_data_incremental):
+        rows, seconds, rss = measure(step, file_name, size, backend)
+        results[step.__name__] = {"rows": rows, "seconds": seconds, "rows_per_sec": rows / seconds, "peak_rss_mb": rss}
+        print("%d %s: %.0f строк/с, %.0f МБ" % (size, step.__name__, rows / seconds, rss))
+
+    for name in QUERIES:
+        if backend != "postgresql" and name in POSTGRESQL_ONLY_QUERIES:
+            continue
+        latencies, _, rss = measure(run_query, name, repeat, backend)
+        results[name] = {
+            "repeat": repeat,
+            "mean_ms": sum(latencies) / len(latencies),
+            "p50_ms": percentile(latencies, 0.5),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "peak_rss_mb": rss,
+        }
+        print("%d %s: p50 %.1f мс, p95 %.1f мс" % (size, name, results[name]["p50_ms"], results[name]["p95_ms"]))
+
+    for suffix in (".copy", ".json"):
+        if os.path.exists(file_name + suffix):
+            os.remove(file_name + suffix)
+    return results
+
+
+def environment(backend: str = "postgresql") -> dict[str, Any]:
+    """
+    Собирает сведения об окружении запуска.
+    @param backend: Имя хранилища.
+    @return: Словарь со сведениями.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    info = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "backend": backend,
+    }
+    if backend == "sqlite":
+        info["sqlite"] = sqlite3.sqlite_version
+    else:
+        conn = psycopg2.connect(dbname="postgres", **config())
+        info["postgresql"] = conn.server_version
+        conn.close()
+    return info
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list[str]:
+    """
+    Сравнивает результаты с предыдущим запуском: rows_per_sec сравнивается как «больше - лучше», p50_ms и p95_ms -
+    как «меньше - лучше».
+    @param results: Результаты текущего запуска.
+    @param baseline: Результаты предыдущего запуска.
+    @param threshold: Доля ухудшения, начиная с которой результат считается регрессией.
+    @return: Строки отчёта.
+    """
+    lines = []
+    for size, steps in results["sizes"].items():
+        for step, metrics in steps.items():
+            previous = baseline.get("sizes", {}).get(size, {}).get(step)
+            if previous is None:
+                continue
+            for metric, higher_is_better in (("rows_per_sec", True), ("p50_ms", False), ("p95_ms", False)):
+                if metric not in metrics or metric not in previous:
+                    continue
+                ratio = metrics[metric] / previous[metric] if previous[metric] else 1.0
+                worse = ratio < 1 - threshold if higher_is_better else ratio > 1 + threshold
+                lines.append(
+                    "%s %s %s: %.1f -> %.1f (x%.2f)%s"
+                    % (size, step, metric, previous[metric], metrics[metric], ratio, " РЕГРЕССИЯ" if worse else "")
+                )
+    return lines
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Запускает набор бенчмарков и записывает результаты в json-файл.
+    @param argv: Аргументы командной строки (None - аргументы процесса).
+    @return: None
+    """
+    parser = argparse.ArgumentParser(description="Бенчмарки загрузки и запросов")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="размеры наборов вакансий")
+    parser.add_argument("--repeat", type=int, default=QUERY_REPEAT, help="количество выполнений каждого запроса")
+    parser.add_argument("--output", default=None, help="файл результатов")
+    parser.add_argument("--compare", default=None, help="файл результатов предыдущего запуска для сравнения")
+    parser.add_argument("--backend", choices=STORAGE_BACKENDS, default="postgresql", help="хранилище вакансий")
+    args = parser.parse_args(argv)
+
+    results = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "seed": SEED,
+        "environment": environment(args.backend),
+        "sizes": {str(size): run_size(size, args.repeat, args.backend) for size in args.sizes},
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, "%s.json" % datetime.now().strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, ensure_ascii=False, indent=2)
+    print("Результаты записаны в %s" % output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)
+        print("\n".join(compare(results, baseline)))
+
+
+if __name__ == "__main__":
+    main()
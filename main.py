@@ -1,29 +1,107 @@
+import argparse
+import sys
+from datetime import timedelta
+from typing import Any, Callable
+
 from src.config import config
-from src.db_manager import DBManager
-from src.headhunter_api import HeadHunterAPI
-from src.schema_manager import SchemaManager
+from src.ingest_state import MAX_AGE_HOURS, IngestState, is_fresh
+from src.instrumentation import instrumentation
+from src.pagination import Page
+from src.storage import STORAGE_BACKENDS, PostgresBackend, StorageBackend, open_backend
 
 
-def main(arg: int | None = None) -> None:
+def print_pages(fetch_page: Callable[[str | None], Page], row_format: str) -> bool:
     """
-    Код для получения данных о вакансиях из API HeadHunter, создания базы данных и взаимодействия с пользователем
+    Выводит результат запроса постранично: следующая страница запрашивается у базы данных по курсору, только если
+    пользователь захочет её посмотреть.
+    @param fetch_page: Функция, получающая страницу по курсору (None - первая страница).
+    @param row_format: Шаблон вывода строки.
+    @return: True, если результат не пустой.
+    """
+    cursor = None
+    found = False
+    while True:
+        page = fetch_page(cursor)
+        for item in page.rows:
+            found = True
+            print(row_format % item)
+        if page.next_cursor is None:
+            return found
+        user_input = input("Показать следующую страницу? y(es) / n(o) (по умолчанию y): ").lower()
+        if user_input == "n":
+            return found
+        cursor = page.next_cursor
+
+
+def report_pages(store: StorageBackend, report: str, **params: Any) -> Callable[[str | None], Page]:
+    """
+    Выбирает функцию получения страницы отчёта для print_pages: у PostgreSQL - постраничный метод DBManager
+    page_<report> (следующая страница выбирается по курсору), у остальных хранилищ - метод хранилища get_<report>,
+    весь результат которого выводится одной страницей.
+    @param store: Хранилище вакансий.
+    @param report: Имя отчёта, например "all_vacancies".
+    @param params: Параметры запроса отчёта.
+    @return: Функция, получающая страницу по курсору.
+    """
+    if isinstance(store, PostgresBackend):
+        fetch_page = getattr(store.db_manager, "page_" + report)
+        return lambda cursor: fetch_page(data_base_name="headhunter", cursor=cursor, **params)
+    get_rows = getattr(store, "get_" + report)
+    return lambda cursor: Page(get_rows(**params), None)
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    """
+    Разбирает аргументы командной строки.
+    @param argv: Аргументы командной строки.
+    @return: Значения аргументов.
+    """
+    parser = argparse.ArgumentParser(description="Поиск вакансий hh.ru и запросы к базе данных вакансий")
+    parser.add_argument(
+        "--query-only",
+        action="store_true",
+        help="сразу перейти к запросам, если в базе данных уже есть загруженные вакансии",
+    )
+    parser.add_argument(
+        "--reuse",
+        action="store_true",
+        help="не загружать вакансии, если они уже загружены с теми же параметрами не раньше --max-age часов назад",
+    )
+    parser.add_argument(
+        "--max-age", type=float, default=MAX_AGE_HOURS, help="срок актуальности загруженных вакансий в часах"
+    )
+    parser.add_argument(
+        "--backend",
+        choices=STORAGE_BACKENDS,
+        default="postgresql",
+        help="хранилище вакансий: сервер PostgreSQL или файл SQLite (без постраничного вывода, выгрузки и сохранения "
+        "параметров загрузки)",
+    )
+    return parser.parse_args(argv)
+
+
+def ask_parameters(arg: int | None) -> tuple[IngestState, bool]:
+    """
+    Запрашивает у пользователя параметры загрузки вакансий из API.
+    @param arg: Если 1, используются значения по умолчанию.
+    @return: Кортеж (параметры загрузки, пересоздать базу данных).
     """
-    # ----------- ПОЛУЧЕНИЕ ВАКАНСИЙ С САЙТА hh.ru В ФОРМАТЕ JSON -------------
     # Аргумент keyword определяет слово, по которому будет осуществлён поиск.
     # Аргумент pages определяет количество страниц, в которых будет осуществлён поиск.
     # Аргумент per_page определяет количество вакансий на странице.
-    print("================ Выполним запрос на сайте hh.ru ====================")
     print("Введём входные данные для поиска вакансий")
     if arg == 1:
 
         keyword = "python"
         pages = 1
         per_page = 10
+        crawl = False
+        recreate = False
 
     else:
 
         # keyword = "python"
-        user_input = input("Введите ключевое слово (по умолчанию 'Python'): ").lower()
+        user_input = input("Введите ключевые слова через запятую (по умолчанию 'Python'): ").lower()
         keyword = user_input if user_input else "python"
 
         # pages = 10
@@ -36,74 +114,132 @@ def main(arg: int | None = None) -> None:
         user_input = input("Введите количество вакансий на странице от 10 до 100 (по умолчанию 10): ").lower()
         per_page = int(user_input) if user_input else 10
 
-    print(f"Вы ввели: ключевое слово - {keyword}, запрошено страниц - {pages}, вакансий на странице - {per_page}")
-    print("Получим сырые данные из API")
+        # crawl = False
+        user_input = input(
+            "Загрузить все найденные вакансии за 30 дней, а не только первые страницы? y(es) / n(o) (по умолчанию n): "
+        ).lower()
+        crawl = user_input == "y"
 
-    # --Создадим экземпляр класса для работы с API headhunter
-    base_url: str = "https://api.hh.ru/vacancies"
-    hh_api = HeadHunterAPI(url=base_url, pages=pages, per_page=per_page)
-    hh_vacancies = hh_api.load_vacancies(keyword=keyword)
-    print(f"Получено {len(hh_vacancies)} вакансий")
+        # recreate = False
+        user_input = input("Пересоздать базу данных с нуля? y(es) / n(o) (по умолчанию n): ").lower()
+        recreate = user_input == "y"
 
-    # --Запишем результат запроса в json-файл
-    print("Запишем результат запроса в json-файл 'data/data.json'")
-    from src.file_utils import JsonWorker
+    print(f"Вы ввели: ключевые слова - {keyword}, запрошено страниц - {pages}, вакансий на странице - {per_page}")
+    return IngestState(keywords=keyword, pages=pages, per_page=per_page, crawl=crawl), recreate
 
-    json_worker = JsonWorker("data/data.json")
-    json_worker.write_file(hh_vacancies)
+
+def ingest(store: StorageBackend, state: IngestState, recreate: bool) -> None:
+    """
+    Создаёт базу данных и таблицы, загружает вакансии из API и записывает параметры загрузки (только PostgreSQL).
+    @param store: Хранилище вакансий.
+    @param state: Параметры загрузки.
+    @param recreate: Пересоздать базу данных с нуля.
+    @return: None
+    """
+    # Модули загрузки из API (requests, конвейер, кэш ответов) импортируются только здесь, поэтому запуск программы
+    # без загрузки вакансий не тратит время на их импорт
+    from src.file_utils import SnapshotWorker
+    from src.headhunter_api import HeadHunterAPI
+    from src.http_client import HttpClient
+    from src.pipeline import Pipeline, normalize_page
+    from src.response_cache import ResponseCache
 
     # -------------------- СОЗДАНИЕ БАЗЫ ДАННЫХ -------------------------------
-    print("========= Создадим базу данных 'headhunter' PostgreSQL  ============")
-    init_connection_parameters = (
-        config()
-    )  # {"host": "localhost", "user": "postgres", "password": "****", "port": 5433}
-
-    # --Создадим базу данных
-    print("Создадим базу данных")
-    sm = SchemaManager(connection_parameters=init_connection_parameters)
-    sm.create_database(data_base_name="headhunter")
-
-    # --Создадим таблицу companies для хранения информации о компаниях
-    print("Создадим таблицу companies для хранения информации о компаниях")
-    query_to_create_companies_table = """
-                CREATE TABLE %s (
-                    company_id VARCHAR(10) PRIMARY KEY,
-                    company_name VARCHAR(255) NOT NULL,
-                    company_url TEXT NOT NULL,
-                    company_alternate_url TEXT,
-                    trusted BOOL,
-                    CONSTRAINT unique_order UNIQUE (company_id, company_name)
-                    -- уникальность по комбинации company_id и company_name
-                )
-                """
-    sm.create_table(data_base_name="headhunter", table_name="companies", query=query_to_create_companies_table)
-
-    # --Создадим таблицу vacancies для хранения информации о вакансиях
-    print("Создадим таблицу vacancies для хранения информации о вакансиях")
-    query_to_create_vacancies_table = """
-                CREATE TABLE %s (
-                    vacancy_id VARCHAR(10) PRIMARY KEY,
-                    company_id VARCHAR REFERENCES companies(company_id),
-                    vacancy_name VARCHAR(255) NOT NULL,
-                    salary INT,
-                    salary_currency VARCHAR(3),
-                    published_at DATE NOT NULL,
-                    vacancy_url TEXT,
-                    requirement TEXT,
-                    responsibility TEXT
-                )
-                """
-    sm.create_table(data_base_name="headhunter", table_name="vacancies", query=query_to_create_vacancies_table)
+    # Если пользователь не выбрал пересоздание базы данных, то существующие база данных и таблицы сохраняются,
+    # а данные обновляются инкрементально: читатели не увидят пустую базу данных во время загрузки.
+    print("========= Создадим базу данных 'headhunter' ============")
+
+    # --Создадим базу данных и таблицы companies (информация о компаниях) и vacancies (информация о вакансиях)
+    # --с индексами
+    print("Создадим таблицы companies и vacancies")
+    store.create_schema(recreate=recreate)
+
+    # ------------ ПОЛУЧЕНИЕ ВАКАНСИЙ С САЙТА hh.ru И ЗАПОЛНЕНИЕ ТАБЛИЦ --------
+    # Страницы загружаются из API, нормализуются и записываются в таблицы одновременно (конвейер с очередями
+    # ограниченного размера), поэтому загрузка в базу данных начинается, пока следующие страницы ещё загружаются.
+    print("Получим данные из API и заполним таблицы")
+
+    # --Создадим экземпляр класса для работы с API headhunter
+    base_url: str = "https://api.hh.ru/vacancies"
+    # --Ответы API кэшируются на диске: повторный запрос с тем же ключевым словом не обращается к hh.ru
+    response_cache = ResponseCache("data/http_cache.sqlite")
+    http_client = HttpClient(cache=response_cache)
+    hh_api = HeadHunterAPI(url=base_url, pages=state.pages, per_page=state.per_page, client=http_client)
+    # --Вакансии, найденные по нескольким ключевым словам, загружаются в базу данных один раз. С crawl API выдаёт
+    # --не больше 2000 вакансий по запросу, поэтому запрос делится на окна дат публикации. При инкрементальной загрузке
+    # --ошибка загрузки страницы прерывает загрузку: иначе вакансии пропущенной страницы были бы помечены закрытыми
+    vacancy_pages = hh_api.iter_vacancies(keywords=state.keywords.split(","), crawl=state.crawl, strict=not recreate)
 
-    # ---------------------- ЗАПОЛНЕНИЕ ТАБЛИЦ --------------------------------
-    # --Прочитаем файл с данными о вакансиях в объект data
-    data = json_worker.read_file()
+    # --Вакансии записываются в сжатый снимок 'data/data.snapshot' по пути в базу данных
+    snapshot_worker = SnapshotWorker("data/data.snapshot")
+    pipeline = Pipeline(vacancy_pages, stages=[normalize_page])
+    pipeline.run(
+        lambda vacancies: store.insert_data(
+            vacancies_data=snapshot_worker.tee(vacancies),
+            incremental=not recreate,
+            scope=state.request_key,
+        )
+    )
+    print("Время работы стадий: %s" % ", ".join("%s - %.2f с" % item for item in pipeline.busy_time.items()))
+    print(
+        "Страниц из кэша: %(hits)d, подтверждено сервером: %(revalidated)d, загружено: %(misses)d"
+        % response_cache.stats
+    )
+    http_client.close()
+    response_cache.close()
 
-    # --Добавим данные из объекта data в таблицы (заполним таблицы)
-    print("Заполним таблицы")
-    sm.insert_data(data_base_name="headhunter", vacancies_data=data)
+    # --Время и параметры загрузки позволят при следующем запуске не загружать вакансии повторно
+    if isinstance(store, PostgresBackend):
+        store.schema_manager.save_ingest_state(data_base_name="headhunter", state=state)
     print("Таблицы готовы")
 
+
+def main(arg: int | None = None, argv: list[str] | None = None) -> None:
+    """
+    Код для получения данных о вакансиях из API HeadHunter, создания базы данных и взаимодействия с пользователем
+    @param arg: Если 1, программа пропустит ввод параметров загрузки и применит значения по умолчанию.
+    @param argv: Аргументы командной строки (см. parse_args).
+    """
+    args = parse_args(argv or [])
+    # Инструментирование включается переменными окружения HH_TRACE_LOG и HH_METRICS_FILE
+    instrumentation.enable_from_env()
+
+    # Хранилище с пулом соединений используется для загрузки и всех запросов пользователя
+    if args.backend == "postgresql":
+        init_connection_parameters = (
+            config()
+        )  # {"host": "localhost", "user": "postgres", "password": "****", "port": 5433}
+        store = open_backend(args.backend, connection_parameters=init_connection_parameters)
+    else:
+        store = open_backend(args.backend)
+    # Постраничный вывод, выгрузка в файл и параметры загрузки есть только у PostgreSQL
+    postgres = store if isinstance(store, PostgresBackend) else None
+
+    # ----------- ПРОВЕРКА ЗАГРУЖЕННЫХ РАНЕЕ ВАКАНСИЙ -------------------------
+    # С --query-only или --reuse программа сначала читает время и параметры последней загрузки из базы данных
+    last_state = None
+    if postgres is not None and (args.query_only or args.reuse):
+        last_state = postgres.schema_manager.load_ingest_state("headhunter")
+    if last_state is not None:
+        print(
+            "В базе данных есть вакансии по ключевым словам '%s', загруженные %s (открытых вакансий: %s)"
+            % (last_state.keywords, f"{last_state.ingested_at:%d.%m.%Y %H:%M}", last_state.vacancy_count)
+        )
+
+    if args.query_only and last_state is not None:
+        print("Загрузка вакансий пропущена")
+    else:
+        if args.query_only:
+            print("В базе данных 'headhunter' нет загруженных вакансий, выполним загрузку")
+
+        # ----------- ПОЛУЧЕНИЕ ВАКАНСИЙ С САЙТА hh.ru -----------------------
+        print("================ Выполним запрос на сайте hh.ru ====================")
+        state, recreate = ask_parameters(arg)
+        if args.reuse and not recreate and is_fresh(last_state, state, timedelta(hours=args.max_age)):
+            print("Вакансии с такими параметрами загружены меньше %g ч назад, загрузка пропущена" % args.max_age)
+        else:
+            ingest(store, state, recreate)
+
     # ------------ ВЫПОЛНЕНИЕ ЗАПРОСА ПОЛЬЗОВАТЕЛЯ К БАЗЕ ДАННЫХ --------------
     excepted_queries = {
         "1": "Получить список всех компаний и количество вакансий у каждой компании",
@@ -112,6 +248,7 @@ def main(arg: int | None = None) -> None:
         "3": "Получить среднюю зарплату по вакансиям",
         "4": "Получить список всех вакансий, у которых зарплата выше средней по всем вакансиям",
         "5": "Получить список всех вакансий, в названии которых содержатся ключевые слова",
+        "6": "Выгрузить все вакансии в файл (CSV или NDJSON)",
     }
     # --Выполним запрос к полученной базе данных.
     print("Выполним запрос к полученной базе данных")
@@ -120,13 +257,14 @@ def main(arg: int | None = None) -> None:
         print("%s - %s" % (key, value))
 
     # ------------------- НАЧАЛО ПОЛЬЗОВАТЕЛЬСКОГО ЦИКЛА -----------------------
+    dbm = postgres.db_manager if postgres is not None else None
+
     # Пока пользователь не подтвердит завершение работы программы, выполнять выбранные запросы
     while 1:
         user_input = input("Введите номер желаемого запроса (по умолчанию - 1): ").lower()
         query_number = user_input if user_input else "1"
         # print("Вы выбрали запрос - %s" % excepted_queries[query_number])
         # print("Результат запроса:", "\n")
-        dbm = DBManager(connection_parameters=init_connection_parameters)
 
         match query_number:
 
@@ -134,8 +272,7 @@ def main(arg: int | None = None) -> None:
                 # Получим список всех компаний и количество вакансий у каждой компании
                 print("Вы выбрали запрос - %s" % excepted_queries[query_number])
                 print("Результат запроса:", "\n")
-                result = dbm.get_companies_and_vacancies_count(data_base_name="headhunter")
-                print(*list("Компания %s: %d вакансий" % (item[0], item[1]) for item in result), sep="\n")
+                print_pages(report_pages(store, "companies_and_vacancies_count"), "Компания %s: %d вакансий")
                 print()
 
             case "2":
@@ -143,28 +280,35 @@ def main(arg: int | None = None) -> None:
                 # на вакансию
                 print("Вы выбрали запрос - %s" % excepted_queries[query_number])
                 print("Результат запроса:", "\n")
-                result = dbm.get_all_vacancies(data_base_name="headhunter")
-                for item in result:
-                    print(
-                        "Требуется %s в компанию '%s', зарплата %s %s, ссылка на вакансию: %s "
-                        % tuple(x for x in item)
-                    )
+                # Вакансии выводятся постранично, каждая страница выбирается по индексу после последней строки
+                # предыдущей страницы
+                print_pages(
+                    report_pages(store, "all_vacancies"),
+                    "Требуется %s в компанию '%s', зарплата %s %s, ссылка на вакансию: %s ",
+                )
                 print()
 
             case "3":
                 # Получим среднюю зарплату по вакансиям
                 print("Вы выбрали запрос - %s" % excepted_queries[query_number])
                 print("Результат запроса:", "\n")
-                result = dbm.get_avg_salary(data_base_name="headhunter")
-                print(f"Средняя зарплата по вакансиям - {round(result[0][0])} {result[0][1]}")
+                if dbm is None:
+                    for avg, currency in store.get_avg_salary():
+                        print(f"Средняя зарплата по вакансиям - {round(avg)} {currency}")
+                else:
+                    result = dbm.get_salary_stats(data_base_name="headhunter")
+                    for currency, count, avg, _, p25, median, p75, _, _ in result:
+                        print(
+                            f"Средняя зарплата по вакансиям - {round(avg)} {currency} (вакансий: {count}, медиана - "
+                            f"{round(median)}, от {round(p25)} до {round(p75)} у половины вакансий)"
+                        )
+                print()
 
             case "4":
                 # Получим список всех вакансий, у которых зарплата выше средней по всем вакансиям
                 print("Вы выбрали запрос - %s" % excepted_queries[query_number])
                 print("Результат запроса:", "\n")
-                result = dbm.get_vacancies_with_higher_salary(data_base_name="headhunter")
-                for item in result:
-                    print("%s зарплата - %s %s" % item)
+                print_pages(report_pages(store, "vacancies_with_higher_salary"), "%s зарплата - %s %s")
                 print()
 
             case "5":
@@ -176,12 +320,38 @@ def main(arg: int | None = None) -> None:
                     "- 'разработчик программист'): "
                 ).lower()
                 kw = user_input if user_input else "разработчик программист"
-                result = dbm.get_vacancies_with_keyword(data_base_name="headhunter", keywords=kw)
-                if not result:
+                user_input = input(
+                    "Искать по всему тексту вакансии с учётом словоформ? y(es) / n(o) (по умолчанию n): "
+                ).lower()
+                mode = "fts" if user_input == "y" else "substring"
+                user_input = input("Вакансия должна содержать все ключевые слова? y(es) / n(o) (по умолчанию n): ")
+                match_all = user_input.lower() == "y"
+                found = print_pages(
+                    report_pages(store, "vacancies_with_keyword", keywords=kw, mode=mode, match_all=match_all),
+                    "%s зарплата - %s %s",
+                )
+                if not found:
                     print("Вакансий с ключевыми словами %s нет в базе" % kw)
+                print()
+
+            case "6":
+                # Выгрузим все вакансии в файл
+                print("Вы выбрали запрос - %s" % excepted_queries[query_number])
+                if dbm is None:
+                    print("Выгрузка в файл доступна только для базы данных PostgreSQL")
                 else:
-                    for item in result:
-                        print("%s зарплата - %s %s" % item)
+                    user_input = input(
+                        "Введите имя файла: .csv, .ndjson или .jsonl, с расширением .gz - сжатый "
+                        "(по умолчанию data/vacancies.csv): "
+                    )
+                    file_name = user_input if user_input else "data/vacancies.csv"
+                    try:
+                        count = dbm.export(data_base_name="headhunter", destination=file_name)
+                    except (ValueError, OSError) as e:
+                        print("Не удалось выгрузить вакансии")
+                        print(e)
+                    else:
+                        print("Выгружено вакансий: %d в файл %s" % (count, file_name))
                 print()
 
             case _:
@@ -194,7 +364,12 @@ def main(arg: int | None = None) -> None:
         if user_input == "y":
             break
 
+    if dbm is not None:
+        print("Результатов запросов из кэша: %(hits)d, выполнено запросов к базе данных: %(misses)d" % dbm.cache_stats)
+    store.close()
+    instrumentation.export()
+
 
 if __name__ == "__main__":
     # Если передать 1, то программа пропустит пользовательский запрос и применит значения по умолчанию
-    main()
+    main(argv=sys.argv[1:])
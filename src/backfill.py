@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterator, NamedTuple
+
+import psycopg2
+
+from src.bulk_loader import BATCH_SIZE, BulkLoader, report
+from src.config import config
+from src.file_utils import SNAPSHOT_MAGIC, SnapshotWorker
+from src.models import Company, Vacancy
+from src.schema_manager import COMPANIES_COLUMNS, VACANCIES_COLUMNS, SchemaManager, _vacancy_row
+
+# Загрузка больших объёмов накопленных вакансий: файл делится на части, каждая часть обрабатывается в отдельном
+# процессе (преобразование в записи, формирование строк и хэшей, COPY по собственному соединению в промежуточные
+# таблицы), после чего данные одной транзакцией переносятся в основные таблицы (SchemaManager.merge_staging)
+
+SHARD_BYTES = 16 * 1024 * 1024  # Размер части файла JSON Lines, обрабатываемой одним процессом
+
+
+class Shard(NamedTuple):
+    """Часть файла, обрабатываемая одним процессом."""
+
+    file_name: str
+    snapshot: bool  # True - группы строк снимка [start, stop), False - диапазон байтов [start, stop) файла JSON Lines
+    start: int
+    stop: int
+
+
+def plan_shards(file_name: str, shard_bytes: int = SHARD_BYTES) -> list[Shard]:
+    """
+    Делит файл на части: снимок (SnapshotWorker) - по группам строк, файл JSON Lines - по диапазонам байтов.
+    @param file_name: Путь к файлу снимка или JSON Lines.
+    @param shard_bytes: Размер части файла JSON Lines в байтах.
+    @return: Список частей файла.
+    @raise ValueError: Если файл является JSON-массивом (его нельзя разделить на части без разбора).
+    """
+    with open(file_name, "rb") as file:
+        head = file.read(len(SNAPSHOT_MAGIC))
+
+    if head == SNAPSHOT_MAGIC:
+        return [
+            Shard(file_name, True, index, index + 1) for index in range(SnapshotWorker(file_name).row_group_count())
+        ]
+    if head.lstrip().startswith(b"["):
+        raise ValueError("JSON array cannot be split, convert it with JsonWorker.write_lines: %s" % file_name)
+
+    size = os.path.getsize(file_name)
+    return [Shard(file_name, False, start, min(start + shard_bytes, size)) for start in range(0, size, shard_bytes)]
+
+
+def iter_shard(shard: Shard) -> Iterator[Vacancy | dict]:
+    """
+    Читает вакансии части файла.
+    @param shard: Часть файла.
+    @return: Генератор записей о вакансиях (снимок) или словарей из ответа API (JSON Lines).
+    """
+    if shard.snapshot:
+        yield from SnapshotWorker(shard.file_name).iter_file(range(shard.start, shard.stop))
+        return
+
+    with open(shard.file_name, "rb") as file:
+        # Строка относится к части, в которой она начинается: если часть начинается внутри строки,
+        # эта строка пропускается (её прочитает предыдущая часть)
+        if shard.start > 0:
+            file.seek(shard.start - 1)
+            file.readline()
+        while file.tell() < shard.stop:
+            line = file.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def load_shard(connection_parameters: dict, data_base_name: str, shard: Shard, batch_size: int = BATCH_SIZE) -> dict:
+    """
+    Обрабатывает часть файла в процессе-обработчике: преобразует вакансии в строки таблиц и загружает их через COPY
+    в таблицы staging_companies и staging_vacancies по отдельному соединению.
+    @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+    @param data_base_name: Имя базы данных.
+    @param shard: Часть файла.
+    @param batch_size: Количество строк в одном COPY.
+    @return: Количество загруженных строк по таблицам.
+    """
+    # Компании повторяются только в пределах части; повторы между частями исключаются при переносе данных
+    companies: dict[str, Company] = {}
+    vacancy_rows = []
+    for vacancy in iter_shard(shard):
+        if isinstance(vacancy, Vacancy):
+            companies.setdefault(vacancy.company.company_id, vacancy.company)
+        else:
+            vacancy = Vacancy.from_api(vacancy, companies)
+        vacancy_rows.append(_vacancy_row(vacancy))
+
+    conn = psycopg2.connect(dbname=data_base_name, **connection_parameters)
+    try:
+        with conn.cursor() as cur:
+            loader = BulkLoader(cur, batch_size=batch_size)
+            counts = {
+                "companies": loader.load(
+                    "staging_companies", COMPANIES_COLUMNS, (company.row() for company in companies.values())
+                ),
+                "vacancies": loader.load("staging_vacancies", VACANCIES_COLUMNS, vacancy_rows),
+            }
+        conn.commit()
+    finally:
+        conn.close()
+
+    return counts
+
+
+def backfill(
+    connection_parameters: dict,
+    data_base_name: str,
+    file_name: str,
+    processes: int | None = None,
+    incremental: bool = True,
+    shard_bytes: int = SHARD_BYTES,
+    scope: str | None = None,
+) -> dict[str, int]:
+    """
+    Загружает в базу данных вакансии из снимка или файла JSON Lines, обрабатывая части файла в пуле процессов.
+    Части загружаются по нескольким соединениям одновременно в промежуточные таблицы, затем данные переносятся
+    в основные таблицы одной транзакцией. Если обработка части завершилась с ошибкой, основные таблицы не меняются.
+    @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+    @param data_base_name: Имя базы данных.
+    @param file_name: Путь к файлу снимка или JSON Lines.
+    @param processes: Количество процессов (None - по количеству ядер процессора).
+    @param incremental: Обновить существующие данные вместо полной перезаписи таблиц.
+    @param shard_bytes: Размер части файла JSON Lines в байтах.
+    @param scope: Ключ запроса к API (IngestState.request_key), вакансии которого, отсутствующие в файле,
+    помечаются закрытыми. Если None, вакансии не закрываются: файл может содержать лишь часть вакансий.
+    @return: Количество загруженных строк по таблицам.
+    """
+    shards = plan_shards(file_name, shard_bytes)
+    sm = SchemaManager(connection_parameters=connection_parameters)
+    sm.create_staging(data_base_name)
+
+    started_at = time.perf_counter()
+    counts = {"companies": 0, "vacancies": 0}
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            for shard_counts in executor.map(partial(load_shard, connection_parameters, data_base_name), shards):
+                for table, count in shard_counts.items():
+                    counts[table] += count
+    except BaseException:
+        sm.drop_staging(data_base_name)
+        raise
+    report(counts, started_at)
+
+    merged = sm.merge_staging(data_base_name, incremental=incremental, scope=scope)
+    print("Добавлено или изменено компаний: %d, вакансий: %d, закрыто вакансий: %d" % merged)
+    return counts
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Команда загрузки накопленных вакансий: python -m src.backfill [файл] [--processes N] [--recreate]
+    [--close-missing].
+    @param argv: Аргументы командной строки (None - аргументы процесса).
+    @return: None
+    """
+    parser = argparse.ArgumentParser(description="Параллельная загрузка вакансий из снимка или файла JSON Lines")
+    parser.add_argument("file_name", nargs="?", default="data/data.snapshot", help="файл снимка или JSON Lines")
+    parser.add_argument("--database", default="headhunter", help="имя базы данных")
+    parser.add_argument("--processes", type=int, default=None, help="количество процессов (по умолчанию - ядер)")
+    parser.add_argument("--shard-mb", type=int, default=SHARD_BYTES >> 20, help="размер части файла JSON Lines в МБ")
+    parser.add_argument("--recreate", action="store_true", help="перезаписать таблицы вместо обновления")
+    parser.add_argument(
+        "--close-missing",
+        action="store_true",
+        help="пометить закрытыми вакансии последней загрузки из API, которых нет в файле",
+    )
+    args = parser.parse_args(argv)
+
+    scope = None
+    if args.close_missing and not args.recreate:
+        state = SchemaManager(connection_parameters=config()).load_ingest_state(args.database)
+        if state is None:
+            print("Загрузок из API не было, отсутствующие вакансии не закрываются")
+        else:
+            scope = state.request_key
+
+    backfill(
+        config(),
+        args.database,
+        args.file_name,
+        processes=args.processes,
+        incremental=not args.recreate,
+        shard_bytes=args.shard_mb << 20,
+        scope=scope,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import io
+import time
+from itertools import islice
+from typing import Any, Iterable, Iterator, Sequence
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extras import execute_values
+
+from src.instrumentation import instrumentation
+
+BATCH_SIZE = 5000  # Количество строк, передаваемых на сервер за один COPY / INSERT
+
+
+def batched(rows: Iterable, batch_size: int) -> Iterator[list]:
+    """
+    Разбивает последовательность на пакеты заданного размера.
+    @param rows: Последовательность строк.
+    @param batch_size: Размер пакета.
+    @return: Генератор пакетов (списков строк).
+    """
+    iterator = iter(rows)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+
+def copy_value(value: Any) -> str:
+    """
+    Преобразует значение в поле текстового формата COPY.
+    @param value: Значение поля.
+    @return: Строковое представление значения для COPY.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    text = str(value)
+    # Экранирование нужно редко, поэтому сначала дешёвые проверки наличия специальных символов
+    if "\\" in text:
+        text = text.replace("\\", "\\\\")
+    if "\t" in text:
+        text = text.replace("\t", "\\t")
+    if "\n" in text:
+        text = text.replace("\n", "\\n")
+    if "\r" in text:
+        text = text.replace("\r", "\\r")
+    return text
+
+
+def copy_buffer(rows: Iterable[Sequence]) -> io.StringIO:
+    """
+    Формирует буфер с данными в текстовом формате COPY.
+    @param rows: Строки таблицы (кортежи значений).
+    @return: Буфер, готовый к передаче в COPY FROM STDIN.
+    """
+    buffer = io.StringIO()
+    buffer.writelines("\t".join(map(copy_value, row)) + "\n" for row in rows)
+    buffer.seek(0)
+    return buffer
+
+
+class BulkLoader:
+    """Класс для пакетной загрузки строк в таблицы PostgreSQL через COPY FROM STDIN или execute_values."""
+
+    def __init__(self, cursor: Any, batch_size: int = BATCH_SIZE, use_copy: bool = True) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param cursor: Курсор psycopg2, в транзакции которого выполняется загрузка.
+        @param batch_size: Количество строк в одном пакете.
+        @param use_copy: Использовать COPY FROM STDIN (при ошибке COPY загрузчик переключается на execute_values).
+        """
+        self.__cursor = cursor
+        self.__batch_size = batch_size
+        self.__use_copy = use_copy
+
+    def __copy(self, table: str, columns: Sequence[str], batch: list) -> None:
+        """
+        Загружает пакет строк через COPY FROM STDIN. При ошибке транзакция откатывается к точке сохранения, и пакет
+        загружается через execute_values.
+        @param table: Имя таблицы.
+        @param columns: Имена столбцов.
+        @param batch: Пакет строк.
+        @return: None
+        """
+        query = sql.SQL("COPY {} ({}) FROM STDIN").format(
+            sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        self.__cursor.execute("SAVEPOINT bulk_copy")
+        try:
+            self.__cursor.copy_expert(query, copy_buffer(batch))
+        except psycopg2.Error as e:
+            print("COPY недоступен, загрузка продолжится через INSERT ... VALUES")
+            print(e)
+            self.__cursor.execute("ROLLBACK TO SAVEPOINT bulk_copy")
+            self.__use_copy = False
+            self.__insert(table, columns, batch)
+        else:
+            self.__cursor.execute("RELEASE SAVEPOINT bulk_copy")
+
+    def __insert(self, table: str, columns: Sequence[str], batch: list) -> None:
+        """
+        Загружает пакет строк через INSERT ... VALUES (execute_values).
+        @param table: Имя таблицы.
+        @param columns: Имена столбцов.
+        @param batch: Пакет строк.
+        @return: None
+        """
+        query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        execute_values(self.__cursor, query, batch, page_size=self.__batch_size)
+
+    def load(self, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+        """
+        Загружает строки в таблицу пакетами.
+        @param table: Имя таблицы.
+        @param columns: Имена столбцов.
+        @param rows: Строки таблицы (кортежи значений в порядке columns).
+        @return: Количество загруженных строк.
+        """
+        count = 0
+        for batch in batched(rows, self.__batch_size):
+            with instrumentation.span("db.load_batch", table=table):
+                if self.__use_copy:
+                    self.__copy(table, columns, batch)
+                else:
+                    self.__insert(table, columns, batch)
+            instrumentation.count("db.rows", len(batch), table=table)
+            count += len(batch)
+
+        return count
+
+
+def report(counts: dict[str, int], started_at: float) -> None:
+    """
+    Выводит в консоль количество загруженных строк и скорость загрузки.
+    @param counts: Количество загруженных строк по таблицам.
+    @param started_at: Время начала загрузки (time.perf_counter()).
+    @return: None
+    """
+    elapsed = time.perf_counter() - started_at
+    total = sum(counts.values())
+    rate = total / elapsed if elapsed > 0 else 0.0
+    tables = ", ".join("%s - %d" % item for item in counts.items())
+    print("Загружено строк: %s за %.2f с (%.0f строк/с)" % (tables, elapsed, rate))
@@ -0,0 +1,173 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+import psycopg2
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+MIN_SIZE = 1  # Количество соединений, открываемых при создании пула
+MAX_SIZE = 10  # Максимальное количество соединений в пуле
+TIMEOUT = 30.0  # Время ожидания свободного соединения в секундах
+HEALTH_CHECK_INTERVAL = 30.0  # Соединение, простоявшее дольше этого времени, проверяется запросом SELECT 1
+
+
+class ConnectionPool:
+    """Потокобезопасный пул соединений с базой данных PostgreSQL с проверкой работоспособности соединений."""
+
+    def __init__(
+        self,
+        connection_parameters: dict,
+        data_base_name: str,
+        min_size: int = MIN_SIZE,
+        max_size: int = MAX_SIZE,
+        timeout: float = TIMEOUT,
+        health_check_interval: float = HEALTH_CHECK_INTERVAL,
+    ) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+        @param data_base_name: Имя базы данных.
+        @param min_size: Количество соединений, открываемых при создании пула.
+        @param max_size: Максимальное количество соединений в пуле.
+        @param timeout: Время ожидания свободного соединения в секундах.
+        @param health_check_interval: Соединение, простоявшее дольше этого времени, перед выдачей проверяется
+        запросом SELECT 1.
+        """
+        self.__pool = ThreadedConnectionPool(min_size, max_size, dbname=data_base_name, **connection_parameters)
+        # ThreadedConnectionPool сразу выбрасывает PoolError, если свободных соединений нет, поэтому потоки сверх
+        # max_size ждут на семафоре
+        self.__slots = threading.BoundedSemaphore(max_size)
+        self.__timeout = timeout
+        self.__health_check_interval = health_check_interval
+        self.__returned_at: dict[int, float] = {}
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """
+        Признак закрытого пула.
+        @return: True, если пул закрыт.
+        """
+        return bool(self.__pool.closed)
+
+    def __is_healthy(self, conn: Any) -> bool:
+        """
+        Проверяет работоспособность соединения.
+        @param conn: Соединение psycopg2.
+        @return: True, если соединением можно пользоваться.
+        """
+        if conn.closed:
+            return False
+        returned_at = self.__returned_at.get(id(conn))
+        if returned_at is not None and time.monotonic() - returned_at < self.__health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def __getconn(self) -> Any:
+        """
+        Выдаёт работоспособное соединение из пула, заменяя разорванные соединения новыми.
+        @return: Соединение psycopg2.
+        """
+        while True:
+            conn = self.__pool.getconn()
+            if self.__is_healthy(conn):
+                return conn
+            self.__returned_at.pop(id(conn), None)
+            self.__pool.putconn(conn, close=True)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Выдаёт соединение из пула на время блока with. После блока незавершённая транзакция откатывается,
+        и соединение возвращается в пул.
+        @return: Соединение psycopg2.
+        @raise PoolError: Если свободное соединение не появилось за время ожидания.
+        """
+        if not self.__slots.acquire(timeout=self.__timeout):
+            raise PoolError("connection pool exhausted")
+        try:
+            conn = self.__getconn()
+            try:
+                yield conn
+            finally:
+                self.__returned_at[id(conn)] = time.monotonic()
+                self.__pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            self.__slots.release()
+
+    def close(self) -> None:
+        """
+        Закрывает все соединения пула.
+        @return: None
+        """
+        if not self.__pool.closed:
+            self.__pool.closeall()
+
+
+_pools: dict[tuple, ConnectionPool] = {}
+_pool_users: dict[tuple, int] = {}  # Количество владельцев общего пула (вызовов get_pool без release_pool)
+_pools_lock = threading.Lock()
+
+
+def get_pool(
+    connection_parameters: dict, data_base_name: str, min_size: int = MIN_SIZE, max_size: int = MAX_SIZE
+) -> ConnectionPool:
+    """
+    Возвращает общий для процесса пул соединений с базой данных (пулы различаются именем базы данных и параметрами
+    подключения). Закрытый пул заменяется новым. Каждый вызов увеличивает количество владельцев пула: получивший
+    пул освобождает его функцией release_pool, а не закрывает.
+    @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+    @param data_base_name: Имя базы данных.
+    @param min_size: Количество соединений, открываемых при создании пула.
+    @param max_size: Максимальное количество соединений в пуле.
+    @return: Экземпляр класса ConnectionPool.
+    """
+    key = (data_base_name, tuple(sorted(connection_parameters.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.closed:
+            pool = _pools[key] = ConnectionPool(connection_parameters, data_base_name, min_size, max_size)
+            _pool_users[key] = 0
+        _pool_users[key] += 1
+        return pool
+
+
+def release_pool(pool: ConnectionPool) -> None:
+    """
+    Освобождает общий пул, полученный функцией get_pool: пул закрывается, когда его освободят все владельцы.
+    Пул, которого уже нет среди общих (закрыт и заменён или закрыт функцией close_all_pools), не меняется.
+    @param pool: Пул соединений.
+    @return: None
+    """
+    with _pools_lock:
+        for key, shared in _pools.items():
+            if shared is pool:
+                _pool_users[key] -= 1
+                if _pool_users[key] <= 0:
+                    pool.close()
+                    del _pools[key], _pool_users[key]
+                return
+
+
+def close_all_pools() -> None:
+    """
+    Закрывает все общие пулы соединений независимо от количества владельцев.
+    @return: None
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+        _pool_users.clear()
@@ -1,131 +1,429 @@
-import psycopg2
+from typing import IO, Any, ContextManager, Iterator
+
+from src.connection_pool import MAX_SIZE, MIN_SIZE, ConnectionPool, get_pool, release_pool
+from src.exporter import EXPORT_QUERIES, copy_to
+from src.instrumentation import instrumentation
+from src.pagination import PAGE_SIZE, Page, decode_cursor, make_page, page_limit
+from src.query_cache import CACHE_SIZE, QueryCache, data_generation
+from src.search import build_search_page_query, build_search_query
+
+ITERSIZE = 2000  # Количество строк, получаемых с сервера за один запрос серверного курсора
+
+# Количество вакансий у компаний и статистика зарплат читаются из сводных таблиц company_stats и salary_stats,
+# которые пересчитываются после каждой загрузки данных (см. stats.py)
+COMPANIES_AND_VACANCIES_COUNT_QUERY = """
+                SELECT company_name, vacancy_count FROM company_stats
+                JOIN companies ON companies.company_id = company_stats.company_id
+                ORDER BY company_name
+                """
+
+ALL_VACANCIES_QUERY = """
+                SELECT vacancy_name, companies.company_name, salary, salary_currency, vacancy_url
+                FROM vacancies
+                JOIN companies ON companies.company_id = vacancies.company_id
+                WHERE NOT vacancies.closed
+                ORDER BY vacancy_name
+                """
+
+AVG_SALARY_QUERY = """
+                SELECT avg_salary, salary_currency
+                FROM salary_stats
+                ORDER BY vacancy_count DESC, salary_currency
+                """
+
+SALARY_STATS_QUERY = """
+                SELECT salary_currency, vacancy_count, avg_salary, min_salary, p25_salary, median_salary, p75_salary,
+                    p90_salary, max_salary
+                FROM salary_stats
+                ORDER BY vacancy_count DESC, salary_currency
+                """
+
+# Зарплата сравнивается со средней зарплатой в той же валюте
+HIGHER_SALARY_QUERY = """
+                SELECT vacancy_name, salary, vacancies.salary_currency FROM vacancies
+                JOIN salary_stats ON salary_stats.salary_currency = vacancies.salary_currency
+                WHERE NOT closed AND salary > avg_salary
+                ORDER BY vacancies.salary_currency, salary DESC
+                """
+
+# Запросы страниц (см. pagination.py): в конце строки - столбцы ключа постраничного вывода, условие {after} отбирает
+# строки после ключа последней строки предыдущей страницы
+COMPANIES_AND_VACANCIES_COUNT_PAGE_QUERY = """
+                SELECT company_name, vacancy_count, company_name, companies.company_id FROM company_stats
+                JOIN companies ON companies.company_id = company_stats.company_id
+                WHERE {after}
+                ORDER BY company_name, companies.company_id
+                LIMIT %s
+                """
+COMPANIES_AFTER = "(company_name, companies.company_id) > (%s, %s)"
+
+ALL_VACANCIES_PAGE_QUERY = """
+                SELECT vacancy_name, companies.company_name, salary, salary_currency, vacancy_url, vacancy_name,
+                    vacancy_id
+                FROM vacancies
+                JOIN companies ON companies.company_id = vacancies.company_id
+                WHERE NOT vacancies.closed AND {after}
+                ORDER BY vacancy_name, vacancy_id
+                LIMIT %s
+                """
+ALL_VACANCIES_AFTER = "(vacancy_name, vacancy_id) > (%s, %s)"
+
+# Вакансии каждой валюты выбираются по индексу (salary_currency, salary, vacancy_id) в порядке убывания зарплаты,
+# начиная с ключа курсора в валюте курсора и с начала в следующих валютах. Для целой зарплаты условие salary > avg
+# равносильно salary > floor(avg), которое сравнивается с индексом без приведения типов
+HIGHER_SALARY_PAGE_QUERY = """
+                SELECT vacancy_name, salary, salary_stats.salary_currency, salary_stats.salary_currency, salary,
+                    vacancy_id
+                FROM salary_stats
+                CROSS JOIN LATERAL (
+                    SELECT vacancy_name, salary, vacancy_id FROM vacancies
+                    WHERE NOT closed AND vacancies.salary_currency = salary_stats.salary_currency
+                        AND salary > floor(avg_salary)::int
+                        AND (salary, vacancy_id) < (
+                            CASE WHEN salary_stats.salary_currency = %(currency)s THEN %(salary)s ELSE 2147483647 END,
+                            CASE WHEN salary_stats.salary_currency = %(currency)s THEN %(vacancy_id)s
+                                ELSE 9223372036854775807 END
+                        )
+                    ORDER BY salary DESC, vacancy_id DESC
+                    LIMIT %(limit)s
+                ) AS higher
+                WHERE {after}
+                ORDER BY salary_stats.salary_currency, higher.salary DESC, higher.vacancy_id DESC
+                LIMIT %(limit)s
+                """
+HIGHER_SALARY_AFTER = "salary_stats.salary_currency >= %(currency)s"
+
+# Запросы методов DBManager с примерами параметров (используются для проверки планов выполнения)
+REPORT_QUERIES: dict[str, tuple[str, list | None]] = {
+    "get_companies_and_vacancies_count": (COMPANIES_AND_VACANCIES_COUNT_QUERY, None),
+    "get_all_vacancies": (ALL_VACANCIES_QUERY, None),
+    "get_avg_salary": (AVG_SALARY_QUERY, None),
+    "get_salary_stats": (SALARY_STATS_QUERY, None),
+    "get_vacancies_with_higher_salary": (HIGHER_SALARY_QUERY, None),
+    "get_vacancies_with_keyword": build_search_query("python разработчик"),
+    "get_vacancies_with_keyword(fts)": build_search_query("python разработчик", mode="fts"),
+}
 
 
 class DBManager:
     """Класс для работы с ДБ PostgreSQL."""
 
-    def __init__(self, connection_parameters: dict) -> None:
+    def __init__(
+        self,
+        connection_parameters: dict,
+        min_size: int = MIN_SIZE,
+        max_size: int = MAX_SIZE,
+        cache_size: int = CACHE_SIZE,
+    ) -> None:
         """
         Инициализирует параметры подключения к базе данных.
+        Соединения берутся из общего потокобезопасного пула для каждой базы данных, поэтому экземпляр класса можно
+        использовать из нескольких потоков.
+        Результаты методов get_* сохраняются в LRU-кэше и выдаются из памяти, пока данные не изменятся: SchemaManager
+        после каждой загрузки данных увеличивает поколение данных базы (query_cache.bump_generation), и результаты
+        прежнего поколения перестают использоваться. Изменения, сделанные в базе данных другими процессами, кэш
+        не отслеживает - для этого есть метод invalidate.
+        @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+        @param min_size: Количество соединений, открываемых при создании пула.
+        @param max_size: Максимальное количество соединений в пуле.
+        @param cache_size: Максимальное количество результатов запросов в кэше (0 - без кэша).
         """
         self.__params = connection_parameters
+        self.__min_size = min_size
+        self.__max_size = max_size
+        self.__pools: dict[str, ConnectionPool] = {}
+        self.__cache = QueryCache(max_size=cache_size)
 
-    def get_companies_and_vacancies_count(self, data_base_name: str) -> list[tuple]:
+    def __enter__(self) -> "DBManager":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __connection(self, data_base_name: str) -> ContextManager[Any]:
         """
-        Получает список всех компаний и количество вакансий у каждой компании.
+        Выдаёт соединение с базой данных из пула на время блока with.
+        @param data_base_name: Имя базы данных.
+        @return: Контекстный менеджер соединения psycopg2.
+        """
+        pool = self.__pools.get(data_base_name)
+        if pool is None or pool.closed:
+            if pool is not None:
+                release_pool(pool)
+            pool = get_pool(self.__params, data_base_name, self.__min_size, self.__max_size)
+            self.__pools[data_base_name] = pool
+        return pool.connection()
+
+    @property
+    def cache_stats(self) -> dict[str, int]:
+        """
+        Статистика кэша результатов запросов.
+        @return: Словарь {"hits": результатов из кэша, "misses": запросов к базе данных}.
+        """
+        return self.__cache.stats
+
+    def invalidate(self) -> None:
+        """
+        Очищает кэш результатов запросов (например, если данные изменены другим процессом).
+        @return: None
+        """
+        self.__cache.clear()
+
+    def __fetch(self, data_base_name: str, query: str, params: list | dict | None = None) -> list[tuple]:
         """
-        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        Выполняет запрос и получает все строки результата. Результат берётся из кэша, если данные базы не менялись
+        с момента его сохранения.
+        @param data_base_name: Имя базы данных.
+        @param query: SQL-запрос.
+        @param params: Параметры запроса.
+        @return: Список строк результата.
+        """
+        key = (data_base_name, query, tuple(sorted(params.items()) if isinstance(params, dict) else params or ()))
+        # Поколение читается до выполнения запроса: если данные изменятся во время запроса, результат будет сохранён
+        # с прежним поколением и не будет использован
+        generation = data_generation(data_base_name)
+        cached = self.__cache.get(key, generation)
+        instrumentation.count("db.query_cache", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
         res: list[tuple] = []
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT company_name, COUNT(vacancies.vacancy_id) FROM companies
-                JOIN vacancies ON vacancies.company_id = companies.company_id
-                GROUP BY company_name
-                ORDER BY company_name
-                """
-            )
+        with self.__connection(data_base_name) as conn, conn.cursor() as cur:
+            cur.execute(query, params)
             res = cur.fetchall()
 
-        conn.close()
-
+        self.__cache.put(key, generation, res)
         return res
 
+    def close(self) -> None:
+        """
+        Освобождает общие пулы соединений, которые использовал экземпляр класса (release_pool): пул закрывается, когда
+        его не использует ни один экземпляр.
+        @return: None
+        """
+        for pool in self.__pools.values():
+            release_pool(pool)
+        self.__pools.clear()
+
+    @instrumentation.timed("db.query", query="get_companies_and_vacancies_count")
+    def get_companies_and_vacancies_count(self, data_base_name: str) -> list[tuple]:
+        """
+        Получает список всех компаний и количество вакансий у каждой компании.
+        """
+        return self.__fetch(data_base_name, COMPANIES_AND_VACANCIES_COUNT_QUERY)
+
+    @instrumentation.timed("db.query", query="get_all_vacancies")
     def get_all_vacancies(self, data_base_name: str) -> list[tuple]:
         """
         Получает список всех вакансий с указанием названия компании, названия вакансии и зарплаты и ссылки на
         вакансию.
         """
-        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
-        res: list[tuple] = []
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT vacancy_name, companies.company_name, salary, salary_currency, vacancy_url
-                FROM vacancies
-                JOIN companies ON companies.company_id = vacancies.company_id
-                ORDER BY vacancy_name
-                """
-            )
-            res = cur.fetchall()
-
-        conn.close()
-
-        return res
+        return self.__fetch(data_base_name, ALL_VACANCIES_QUERY)
 
+    @instrumentation.timed("db.query", query="get_avg_salary")
     def get_avg_salary(self, data_base_name: str) -> list[tuple]:
         """
-        Получает среднюю зарплату по вакансиям.
+        Получает среднюю зарплату по вакансиям в каждой валюте (валюты с большим количеством вакансий - первыми).
         """
-        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
-        res: list[tuple]
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT AVG(salary), salary_currency
-                FROM vacancies
-                WHERE salary <> 0
-                GROUP BY salary_currency
-                """
-            )
-            res = cur.fetchall()
-
-        conn.close()
+        return self.__fetch(data_base_name, AVG_SALARY_QUERY)
 
-        return res
+    @instrumentation.timed("db.query", query="get_salary_stats")
+    def get_salary_stats(self, data_base_name: str) -> list[tuple]:
+        """
+        Получает статистику зарплат открытых вакансий по валютам.
+        @param data_base_name: Имя базы данных.
+        @return: Список кортежей (валюта, количество вакансий, средняя, минимальная, 25-й перцентиль, медиана,
+        75-й перцентиль, 90-й перцентиль, максимальная зарплата).
+        """
+        return self.__fetch(data_base_name, SALARY_STATS_QUERY)
 
+    @instrumentation.timed("db.query", query="get_vacancies_with_higher_salary")
     def get_vacancies_with_higher_salary(self, data_base_name: str) -> list[tuple]:
         """
-        Получает список всех вакансий, у которых зарплата выше средней по всем вакансиям.
+        Получает список всех вакансий, у которых зарплата выше средней по всем вакансиям в той же валюте.
         """
-        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
-        res: list[tuple] = []
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT vacancy_name, salary, salary_currency FROM vacancies
-                WHERE salary > (SELECT AVG(salary) FROM vacancies)
-                ORDER BY salary DESC
-                """
-            )
-            res = cur.fetchall()
+        return self.__fetch(data_base_name, HIGHER_SALARY_QUERY)
 
-        conn.close()
+    @instrumentation.timed("db.query", query="get_vacancies_with_keyword")
+    def get_vacancies_with_keyword(
+        self, data_base_name: str, keywords: str, mode: str = "substring", match_all: bool = False
+    ) -> list[tuple]:
+        """
+        Получает список всех вакансий, в названии которых содержатся переданные в метод слова.
+        Результат упорядочен по релевантности.
+        @param data_base_name: Имя базы данных.
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" (подстрока в названии вакансии) или "fts" (полнотекстовый поиск по
+        названию, требованиям и обязанностям с учётом словоформ).
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        """
+        return self.__fetch(data_base_name, *build_search_query(keywords, mode, match_all))
 
-        return res
+    def __stream(self, data_base_name: str, query: str, params: list | None, itersize: int) -> Iterator[tuple]:
+        """
+        Выполняет запрос через именованный (серверный) курсор и возвращает строки по мере получения с сервера.
+        Соединение занято до тех пор, пока генератор не будет исчерпан или закрыт.
+        @param data_base_name: Имя базы данных.
+        @param query: SQL-запрос.
+        @param params: Параметры запроса.
+        @param itersize: Количество строк, получаемых с сервера за один запрос.
+        @return: Генератор строк результата.
+        """
+        with self.__connection(data_base_name) as conn:
+            with conn.cursor(name="dbmanager_stream") as cur:
+                cur.itersize = itersize
+                cur.execute(query, params)
+                yield from cur
+            conn.rollback()
 
-    def get_vacancies_with_keyword(self, data_base_name: str, keywords: str) -> list[tuple]:
+    def iter_all_vacancies(self, data_base_name: str, itersize: int = ITERSIZE) -> Iterator[tuple]:
         """
-        Получает список всех вакансий, в названии которых содержатся переданные в метод слова.
+        Возвращает генератор всех вакансий с указанием названия компании, названия вакансии и зарплаты и ссылки на
+        вакансию. Строки читаются с сервера порциями по itersize, поэтому память не зависит от размера результата.
+        @param data_base_name: Имя базы данных.
+        @param itersize: Количество строк, получаемых с сервера за один запрос.
+        @return: Генератор строк результата.
         """
-        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
-        res: list[tuple] = []
-        with conn.cursor() as cur:
-            keyword_list = keywords.split()
+        return self.__stream(data_base_name, ALL_VACANCIES_QUERY, None, itersize)
 
-            try:
-                # Формируем условие WHERE с использованием ILIKE (выполняет поиск независимо от регистра)
-                where_clause = " OR ".join(["vacancy_name ILIKE %s" for _ in keyword_list])
+    def iter_vacancies_with_keyword(
+        self,
+        data_base_name: str,
+        keywords: str,
+        mode: str = "substring",
+        match_all: bool = False,
+        itersize: int = ITERSIZE,
+    ) -> Iterator[tuple]:
+        """
+        Возвращает генератор вакансий, в названии которых содержатся переданные в метод слова (см.
+        get_vacancies_with_keyword). Строки читаются с сервера порциями по itersize, поэтому память не зависит
+        от размера результата.
+        @param data_base_name: Имя базы данных.
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" или "fts".
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @param itersize: Количество строк, получаемых с сервера за один запрос.
+        @return: Генератор строк результата.
+        """
+        return self.__stream(data_base_name, *build_search_query(keywords, mode, match_all), itersize)
 
-                # Полный SQL-запрос
-                query = (
-                    """SELECT vacancy_name, salary, salary_currency
-                FROM vacancies WHERE %s ORDER BY vacancy_name"""
-                    % where_clause
-                )
+    def __page(
+        self, data_base_name: str, query: str, after: str, key_size: int, cursor: str | None, limit: int
+    ) -> Page:
+        """
+        Получает страницу результата запроса с постраничным выводом по ключу.
+        @param data_base_name: Имя базы данных.
+        @param query: Запрос страницы с условием {after} и параметром LIMIT в конце.
+        @param after: Условие отбора строк после ключа курсора (параметры - значения ключа).
+        @param key_size: Количество столбцов ключа в конце строки результата.
+        @param cursor: Курсор страницы (None - первая страница).
+        @param limit: Количество строк на странице.
+        @return: Страница результата.
+        @raise ValueError: Если курсор повреждён или размер страницы недопустим.
+        """
+        page_limit(limit)
+        key = decode_cursor(cursor, key_size) if cursor is not None else []
+        query = query.format(after=after if cursor is not None else "TRUE")
+        return make_page(self.__fetch(data_base_name, query, key + [limit + 1]), key_size, limit)
 
-                # Выполнение параметризованного запроса
-                cur.execute(query, [f"%{keyword}%" for keyword in keyword_list])
+    @instrumentation.timed("db.query", query="page_companies_and_vacancies_count")
+    def page_companies_and_vacancies_count(
+        self, data_base_name: str, cursor: str | None = None, limit: int = PAGE_SIZE
+    ) -> Page:
+        """
+        Получает страницу списка компаний с количеством вакансий (см. get_companies_and_vacancies_count).
+        @param data_base_name: Имя базы данных.
+        @param cursor: Курсор страницы из Page.next_cursor предыдущей страницы (None - первая страница).
+        @param limit: Количество строк на странице.
+        @return: Страница с кортежами (название компании, количество вакансий).
+        @raise ValueError: Если курсор повреждён или размер страницы недопустим.
+        """
+        return self.__page(data_base_name, COMPANIES_AND_VACANCIES_COUNT_PAGE_QUERY, COMPANIES_AFTER, 2, cursor, limit)
 
-            except KeyError:
-                res = []
+    @instrumentation.timed("db.query", query="page_all_vacancies")
+    def page_all_vacancies(self, data_base_name: str, cursor: str | None = None, limit: int = PAGE_SIZE) -> Page:
+        """
+        Получает страницу списка вакансий (см. get_all_vacancies), упорядоченного по названию и ID вакансии.
+        @param data_base_name: Имя базы данных.
+        @param cursor: Курсор страницы из Page.next_cursor предыдущей страницы (None - первая страница).
+        @param limit: Количество строк на странице.
+        @return: Страница с кортежами (название вакансии, компания, зарплата, валюта, ссылка на вакансию).
+        @raise ValueError: Если курсор повреждён или размер страницы недопустим.
+        """
+        return self.__page(data_base_name, ALL_VACANCIES_PAGE_QUERY, ALL_VACANCIES_AFTER, 2, cursor, limit)
 
-            else:
-                res = cur.fetchall()
+    @instrumentation.timed("db.query", query="page_vacancies_with_higher_salary")
+    def page_vacancies_with_higher_salary(
+        self, data_base_name: str, cursor: str | None = None, limit: int = PAGE_SIZE
+    ) -> Page:
+        """
+        Получает страницу списка вакансий с зарплатой выше средней в той же валюте (см.
+        get_vacancies_with_higher_salary), упорядоченного по валюте, убыванию зарплаты и ID вакансии.
+        @param data_base_name: Имя базы данных.
+        @param cursor: Курсор страницы из Page.next_cursor предыдущей страницы (None - первая страница).
+        @param limit: Количество строк на странице.
+        @return: Страница с кортежами (название вакансии, зарплата, валюта).
+        @raise ValueError: Если курсор повреждён или размер страницы недопустим.
+        """
+        page_limit(limit)
+        currency, salary, vacancy_id = decode_cursor(cursor, 3) if cursor is not None else (None, None, None)
+        query = HIGHER_SALARY_PAGE_QUERY.format(after=HIGHER_SALARY_AFTER if cursor is not None else "TRUE")
+        params = {"currency": currency, "salary": salary, "vacancy_id": vacancy_id, "limit": limit + 1}
+        return make_page(self.__fetch(data_base_name, query, params), 3, limit)
 
-        conn.close()
+    @instrumentation.timed("db.query", query="page_vacancies_with_keyword")
+    def page_vacancies_with_keyword(
+        self,
+        data_base_name: str,
+        keywords: str,
+        mode: str = "substring",
+        match_all: bool = False,
+        cursor: str | None = None,
+        limit: int = PAGE_SIZE,
+    ) -> Page:
+        """
+        Получает страницу результатов поиска вакансий по ключевым словам (см. get_vacancies_with_keyword),
+        упорядоченных по релевантности, названию и ID вакансии.
+        @param data_base_name: Имя базы данных.
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" или "fts".
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @param cursor: Курсор страницы из Page.next_cursor предыдущей страницы (None - первая страница).
+        @param limit: Количество строк на странице.
+        @return: Страница с кортежами (название вакансии, зарплата, валюта).
+        @raise ValueError: Если курсор повреждён, размер страницы недопустим или передан неизвестный режим поиска.
+        """
+        page_limit(limit)
+        after = decode_cursor(cursor, 3) if cursor is not None else None
+        query, params = build_search_page_query(keywords, mode, match_all, after=after, limit=limit + 1)
+        return make_page(self.__fetch(data_base_name, query, params), 3, limit)
 
-        return res
+    def export(
+        self,
+        data_base_name: str,
+        destination: str | IO[bytes],
+        table: str = "vacancies",
+        fmt: str | None = None,
+        compress: bool | None = None,
+    ) -> int:
+        """
+        Выгружает вакансии (вместе с данными компаний) или компании (с количеством вакансий) командой
+        COPY (SELECT ...) TO STDOUT: строки формирует сервер, поэтому выгрузка не создаёт кортежей Python, и память
+        не зависит от объёма данных.
+        @param data_base_name: Имя базы данных.
+        @param destination: Путь к файлу (.csv, .ndjson или .jsonl, с расширением .gz - сжатый gzip) или файловый
+        объект, открытый на запись в двоичном режиме.
+        @param table: Что выгружать - "vacancies" или "companies".
+        @param fmt: Формат - "csv" или "ndjson" (None - по расширению файла, для файлового объекта - "csv").
+        @param compress: Сжимать выгрузку gzip (None - по расширению файла).
+        @return: Количество выгруженных строк.
+        @raise ValueError: Если таблица, формат или расширение файла не поддерживаются.
+        """
+        if table not in EXPORT_QUERIES:
+            raise ValueError("Unsupported export table: %s" % table)
+        with self.__connection(data_base_name) as conn, conn.cursor() as cur:
+            return copy_to(cur, EXPORT_QUERIES[table], destination, fmt=fmt, compress=compress)
 
 
 if __name__ == "__main__":
@@ -170,3 +468,5 @@ if __name__ == "__main__":
         for item in result:
             print("%s зарплата - %s %s" % item)
     print()
+
+    dbm.close()
@@ -0,0 +1,123 @@
+import json
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Iterator
+
+from src.models import Company
+
+
+class EmployerIndex:
+    """Хэш-индекс работодателей по id для исключения повторного добавления компаний при загрузке вакансий."""
+
+    def __init__(self, max_in_memory: int | None = None, spill_path: str | None = None) -> None:
+        """
+        Инициализатор экземпляра класса.
+        По умолчанию все работодатели хранятся в словаре в памяти. Если задан max_in_memory, в памяти хранится
+        не больше max_in_memory последних использованных работодателей (LRU), а полный индекс ведётся в файле SQLite.
+        @param max_in_memory: Максимальное количество работодателей в памяти (None - без ограничения).
+        @param spill_path: Путь к файлу индекса на диске (по умолчанию - временный файл, удаляемый при закрытии).
+        """
+        self.__max_in_memory = max_in_memory
+        self.__records: OrderedDict[Any, dict | Company] = OrderedDict()
+        self.__disk: sqlite3.Connection | None = None
+        self.__temp_dir: tempfile.TemporaryDirectory | None = None
+        self.__count = 0
+
+        if max_in_memory is not None:
+            if spill_path is None:
+                self.__temp_dir = tempfile.TemporaryDirectory()
+                spill_path = os.path.join(self.__temp_dir.name, "employers.sqlite")
+            self.__disk = sqlite3.connect(spill_path)
+            # Индекс восстанавливается из исходных данных, поэтому журнал и синхронизация с диском не нужны
+            self.__disk.execute("PRAGMA journal_mode = OFF")
+            self.__disk.execute("PRAGMA synchronous = OFF")
+            self.__disk.execute("CREATE TABLE IF NOT EXISTS employers (id TEXT PRIMARY KEY, record TEXT NOT NULL)")
+
+    def __enter__(self) -> "EmployerIndex":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __contains__(self, employer_id: Any) -> bool:
+        if employer_id in self.__records:
+            return True
+        if self.__disk is None:
+            return False
+        return self.__disk.execute("SELECT 1 FROM employers WHERE id = ?", (str(employer_id),)).fetchone() is not None
+
+    def add(self, employer: dict | Company) -> bool:
+        """
+        Добавляет работодателя в индекс, если его там ещё нет.
+        @param employer: Данные о работодателе из ответа API (ключ "id" обязателен) или запись о компании.
+        @return: True, если работодатель встретился впервые, иначе False.
+        """
+        employer_id = employer.company_id if isinstance(employer, Company) else employer["id"]
+        if employer_id in self.__records:
+            self.__records.move_to_end(employer_id)
+            return False
+
+        if self.__disk is not None:
+            cursor = self.__disk.execute(
+                "INSERT OR IGNORE INTO employers (id, record) VALUES (?, ?)",
+                (str(employer_id), json.dumps(self.__as_dict(employer), ensure_ascii=False)),
+            )
+            self.__remember(employer_id, employer)
+            if cursor.rowcount == 0:
+                return False
+        else:
+            self.__records[employer_id] = employer
+
+        self.__count += 1
+        return True
+
+    @staticmethod
+    def __as_dict(employer: dict | Company) -> dict:
+        """
+        Преобразует запись о компании в словарь для хранения в индексе на диске.
+        @param employer: Данные о работодателе или запись о компании.
+        @return: Словарь с данными о работодателе.
+        """
+        return asdict(employer) if isinstance(employer, Company) else employer
+
+    def __remember(self, employer_id: Any, employer: dict | Company) -> None:
+        """
+        Помещает работодателя в LRU-кэш, вытесняя давно не использованных.
+        @param employer_id: ID работодателя.
+        @param employer: Данные о работодателе.
+        @return: None
+        """
+        self.__records[employer_id] = employer
+        if self.__max_in_memory is not None and len(self.__records) > self.__max_in_memory:
+            self.__records.popitem(last=False)
+
+    def records(self) -> Iterator[dict | Company]:
+        """
+        Возвращает данные о работодателях в том виде, в котором они встретились впервые (из индекса на диске записи
+        о компаниях читаются как словари).
+        @return: Генератор словарей с данными о работодателях.
+        """
+        if self.__disk is None:
+            yield from self.__records.values()
+        else:
+            for (record,) in self.__disk.execute("SELECT record FROM employers ORDER BY rowid"):
+                yield json.loads(record)
+
+    def close(self) -> None:
+        """
+        Закрывает индекс на диске и удаляет временный файл.
+        @return: None
+        """
+        if self.__disk is not None:
+            self.__disk.commit()
+            self.__disk.close()
+            self.__disk = None
+        if self.__temp_dir is not None:
+            self.__temp_dir.cleanup()
+            self.__temp_dir = None
@@ -0,0 +1,117 @@
+import contextlib
+import gzip
+import os
+from typing import IO, Any
+
+from psycopg2 import sql
+
+from src.instrumentation import instrumentation
+
+# Выгрузка выполняется командой COPY (SELECT ...) TO STDOUT: сервер сам формирует строки CSV или JSON, а клиент только
+# переписывает полученные байты в файл, поэтому кортежи Python не создаются
+
+EXPORT_QUERIES = {
+    "vacancies": """
+        SELECT vacancy_id, vacancy_name, vacancies.company_id, company_name, salary, salary_currency, published_at,
+            vacancy_url, company_alternate_url, trusted, requirement, responsibility, closed
+        FROM vacancies
+        JOIN companies ON companies.company_id = vacancies.company_id
+        ORDER BY vacancy_id
+        """,
+    "companies": """
+        SELECT companies.company_id, company_name, company_url, company_alternate_url, trusted,
+            COALESCE(vacancy_count, 0) AS vacancy_count, COALESCE(salary_vacancy_count, 0) AS salary_vacancy_count
+        FROM companies
+        LEFT JOIN company_stats ON company_stats.company_id = companies.company_id
+        ORDER BY companies.company_id
+        """,
+}
+
+EXPORT_FORMATS = ("csv", "ndjson")
+
+# Строки JSON не содержат управляющих символов (row_to_json их экранирует), поэтому формат CSV с кавычками
+# и разделителем из управляющих символов передаёт JSON без изменений (текстовый формат COPY удваивал бы "\")
+COPY_OPTIONS = {
+    "csv": "FORMAT csv, HEADER true",
+    "ndjson": "FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02'",
+}
+
+
+def export_format(file_name: str) -> tuple[str, bool]:
+    """
+    Определяет формат выгрузки по расширению файла: .csv или .ndjson / .jsonl, с расширением .gz - сжатый gzip.
+    @param file_name: Имя файла.
+    @return: Кортеж (формат, сжатие).
+    @raise ValueError: Если расширение файла не поддерживается.
+    """
+    base, extension = os.path.splitext(file_name.lower())
+    compress = extension == ".gz"
+    if compress:
+        extension = os.path.splitext(base)[1]
+    if extension == ".csv":
+        return "csv", compress
+    if extension in (".ndjson", ".jsonl"):
+        return "ndjson", compress
+    raise ValueError("Unsupported export file extension: %s" % file_name)
+
+
+def copy_query(query: str, fmt: str = "csv") -> sql.Composed:
+    """
+    Формирует команду COPY для выгрузки результата запроса.
+    @param query: SQL-запрос SELECT.
+    @param fmt: Формат выгрузки - "csv" (с заголовком) или "ndjson" (объект JSON на строку).
+    @return: Команда COPY ... TO STDOUT.
+    @raise ValueError: Если формат не поддерживается.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError("Unsupported export format: %s" % fmt)
+    if fmt == "ndjson":
+        query = "SELECT row_to_json(result) FROM (%s) AS result" % query
+    return sql.SQL("COPY ({}) TO STDOUT WITH ({})").format(sql.SQL(query), sql.SQL(COPY_OPTIONS[fmt]))
+
+
+def copy_to(
+    cur: Any, query: str, destination: str | IO[bytes], fmt: str | None = None, compress: bool | None = None
+) -> int:
+    """
+    Выгружает результат запроса командой COPY TO STDOUT в файл или файловый объект.
+    @param cur: Курсор psycopg2.
+    @param query: SQL-запрос SELECT.
+    @param destination: Путь к файлу или файловый объект, открытый на запись в двоичном режиме.
+    @param fmt: Формат выгрузки - "csv" или "ndjson" (None - по расширению файла, для файлового объекта - "csv").
+    @param compress: Сжимать выгрузку gzip (None - по расширению файла .gz).
+    @return: Количество выгруженных строк.
+    """
+    if isinstance(destination, str) and fmt is None:
+        fmt, detected_compress = export_format(destination)
+        compress = detected_compress if compress is None else compress
+    elif isinstance(destination, str) and compress is None:
+        compress = destination.lower().endswith(".gz")
+    fmt = fmt or "csv"
+
+    command = copy_query(query, fmt)
+    with instrumentation.span("db.export", format=fmt):
+        if isinstance(destination, str):
+            full_path = os.path.abspath(destination)
+            # Файл записывается под временным именем, чтобы прерванная выгрузка не оставила неполный файл
+            try:
+                with open(full_path + ".tmp", "wb") as raw:
+                    if compress:
+                        with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as file:
+                            cur.copy_expert(command, file)
+                    else:
+                        cur.copy_expert(command, raw)
+            except BaseException:
+                # Если файл не удалось открыть, удалять нечего
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(full_path + ".tmp")
+                raise
+            os.replace(full_path + ".tmp", full_path)
+        elif compress:
+            with gzip.GzipFile(fileobj=destination, mode="wb", compresslevel=6) as file:
+                cur.copy_expert(command, file)
+        else:
+            cur.copy_expert(command, destination)
+
+    instrumentation.count("db.exported_rows", cur.rowcount, format=fmt)
+    return int(cur.rowcount)
@@ -1,6 +1,44 @@
+import contextlib
 import json
+import mmap
 import os
-from typing import Any
+import struct
+import zlib
+from typing import Any, Iterable, Iterator, Sequence
+
+from src.instrumentation import instrumentation
+from src.models import Company, Vacancy
+
+CHUNK_SIZE = 1 << 16  # Размер блока, читаемого из файла при потоковом разборе JSON-массива
+
+ROW_GROUP_SIZE = 10000  # Количество вакансий в группе строк снимка (столбцы группы сжимаются отдельно)
+COMPRESSION_LEVEL = 6  # Уровень сжатия zlib
+SNAPSHOT_MAGIC = b"HHSNAP2\n"
+# Столбцы снимка: поля записей о вакансиях и компаниях (см. models.py), которые сохраняются в базе данных
+SNAPSHOT_COLUMNS = (
+    "vacancy_id",
+    "company_id",
+    "vacancy_name",
+    "salary",
+    "salary_currency",
+    "published_at",
+    "vacancy_url",
+    "requirement",
+    "responsibility",
+    "company_name",
+    "company_url",
+    "company_alternate_url",
+    "trusted",
+)
+
+
+def _snapshot_row(vacancy: Vacancy) -> tuple:
+    """
+    Формирует строку снимка из записи о вакансии.
+    @param vacancy: Запись о вакансии.
+    @return: Кортеж значений в порядке SNAPSHOT_COLUMNS.
+    """
+    return vacancy.row() + vacancy.company.row()[1:]
 
 
 class JsonWorker:
@@ -13,6 +51,7 @@ class JsonWorker:
         """
         self.__file_name = file_name
 
+    @instrumentation.timed("json.write_file")
     def write_file(self, data: list) -> None:
         """
         Записывает json-объект в json-файл.
@@ -23,6 +62,7 @@ class JsonWorker:
         with open(full_path, "w", encoding="UTF-8") as file:
             json.dump(data, file, ensure_ascii=False)
 
+    @instrumentation.timed("json.read_file")
     def read_file(self) -> list[dict] | Any:
         """
         Читает содержимое json-файла в json-объект (список словарей).
@@ -34,6 +74,274 @@ class JsonWorker:
 
         return data
 
+    @instrumentation.timed("json.write_lines")
+    def write_lines(self, data: Iterable[dict]) -> int:
+        """
+        Записывает объекты в файл в формате JSON Lines (NDJSON): по одному объекту на строку. Объекты записываются
+        по мере получения, поэтому данные не нужно держать в памяти целиком.
+        @param data: Объекты (словари), предназначенные для записи в файл.
+        @return: Количество записанных объектов.
+        """
+        full_path = os.path.abspath(self.__file_name)
+        count = 0
+        with open(full_path, "w", encoding="UTF-8") as file:
+            for item in data:
+                file.write(json.dumps(item, ensure_ascii=False))
+                file.write("\n")
+                count += 1
+
+        return count
+
+    def iter_file(self, chunk_size: int = CHUNK_SIZE) -> Iterator[dict]:
+        """
+        Читает объекты из файла по одному. Поддерживаются формат JSON Lines (NDJSON) и JSON-массив, который
+        разбирается по частям, поэтому память не зависит от размера файла.
+        @param chunk_size: Размер блока, читаемого из файла при разборе JSON-массива.
+        @return: Генератор объектов (словарей).
+        """
+        full_path = os.path.abspath(self.__file_name)
+        with open(full_path, "r", encoding="utf-8") as file:
+            # Формат определяется по первому значащему символу файла (JSON-массив может быть записан одной строкой,
+            # поэтому файл читается посимвольно, а не построчно)
+            first = " "
+            while first.isspace():
+                first = file.read(1)
+            file.seek(0)
+
+            if first == "[":
+                yield from self.__iter_array(file, chunk_size)
+            else:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+
+    @staticmethod
+    def __iter_array(file: Any, chunk_size: int) -> Iterator[Any]:
+        """
+        Разбирает JSON-массив из файла по частям и возвращает его элементы по одному.
+        @param file: Файл, открытый на чтение.
+        @param chunk_size: Размер читаемого блока.
+        @return: Генератор элементов массива.
+        @raise ValueError: Если файл не является корректным JSON-массивом.
+        """
+        decoder = json.JSONDecoder()
+        buffer = ""
+        position = 0
+        started = eof = False
+
+        while True:
+            # Пропускаем пробелы, открывающую скобку и запятые между элементами
+            while position < len(buffer) and buffer[position] in " \t\r\n,[":
+                if buffer[position] == "[":
+                    if started:
+                        break
+                    started = True
+                position += 1
+            if started and position < len(buffer) and buffer[position] == "]":
+                return
+            if started and position < len(buffer):
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # Число в конце блока может продолжаться в следующем блоке
+                    if end < len(buffer) or eof:
+                        yield item
+                        position = end
+                        continue
+            elif eof:
+                raise ValueError("Unexpected end of JSON array")
+
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+
+class SnapshotWorker:
+    """
+    Класс для работы со сжатыми снимками вакансий в столбцовом формате.
+    Файл снимка состоит из групп строк по row_group_size вакансий. Каждый столбец группы (см. SNAPSHOT_COLUMNS)
+    хранится отдельным блоком JSON-массива, сжатого zlib. В конце файла находится оглавление с расположением блоков.
+    Файл читается через mmap, распаковываются только нужные столбцы.
+    """
+
+    def __init__(
+        self,
+        file_name: str = "data/data.snapshot",
+        row_group_size: int = ROW_GROUP_SIZE,
+        compression_level: int = COMPRESSION_LEVEL,
+    ) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param file_name: Строковая переменная, содержащая относительный путь к файлу.
+        @param row_group_size: Количество вакансий в группе строк.
+        @param compression_level: Уровень сжатия zlib (0-9).
+        """
+        self.__file_name = file_name
+        self.__row_group_size = row_group_size
+        self.__compression_level = compression_level
+
+    def write_file(self, data: Iterable[Vacancy | dict]) -> int:
+        """
+        Записывает вакансии в файл снимка. Вакансии записываются группами строк по мере получения, поэтому данные
+        не нужно держать в памяти целиком.
+        @param data: Вакансии (записи Vacancy или словари из ответа API).
+        @return: Количество записанных вакансий.
+        """
+        count = 0
+        for _ in self.tee(data):
+            count += 1
+
+        return count
+
+    def tee(self, data: Iterable[Vacancy | dict]) -> Iterator[Vacancy]:
+        """
+        Записывает вакансии в файл снимка и одновременно передаёт их дальше, например в SchemaManager.insert_data.
+        Оглавление записывается, когда генератор исчерпан, после чего снимок заменяет прежний файл; если генератор
+        закрыт раньше или данные выбросили исключение, прежний снимок не меняется.
+        @param data: Вакансии (записи Vacancy или словари из ответа API, которые преобразуются в записи).
+        @return: Генератор записей о вакансиях.
+        """
+        full_path = os.path.abspath(self.__file_name)
+        row_groups: list[dict] = []
+        batch: list[Vacancy] = []
+        companies: dict[str, Company] = {}
+        count = 0
+
+        # Снимок записывается под временным именем и заменяет прежний, только когда записано оглавление: прерванная
+        # загрузка не портит последний полный снимок
+        try:
+            with open(full_path + ".tmp", "wb") as file:
+                file.write(SNAPSHOT_MAGIC)
+                for vacancy in data:
+                    if not isinstance(vacancy, Vacancy):
+                        vacancy = Vacancy.from_api(vacancy, companies)
+                    batch.append(vacancy)
+                    yield vacancy
+                    if len(batch) == self.__row_group_size:
+                        row_groups.append(self.__write_row_group(file, batch))
+                        count += len(batch)
+                        batch = []
+                        companies.clear()
+                if batch:
+                    row_groups.append(self.__write_row_group(file, batch))
+                    count += len(batch)
+
+                # Оглавление: расположение блоков столбцов, затем его длина и сигнатура
+                footer = json.dumps({"rows": count, "row_groups": row_groups}).encode("utf-8")
+                file.write(footer)
+                file.write(struct.pack("<Q", len(footer)))
+                file.write(SNAPSHOT_MAGIC)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(full_path + ".tmp")
+            raise
+        os.replace(full_path + ".tmp", full_path)
+
+    def __write_row_group(self, file: Any, batch: list[Vacancy]) -> dict:
+        """
+        Записывает группу строк: каждый столбец - отдельным сжатым блоком.
+        @param file: Файл снимка, открытый на запись.
+        @param batch: Записи о вакансиях группы строк.
+        @return: Описание группы строк для оглавления.
+        """
+        blocks = {}
+        with instrumentation.span("snapshot.write_row_group"):
+            for name, values in zip(SNAPSHOT_COLUMNS, zip(*map(_snapshot_row, batch))):
+                block = zlib.compress(
+                    json.dumps(values, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                    self.__compression_level,
+                )
+                blocks[name] = (file.tell(), len(block))
+                file.write(block)
+        return {"rows": len(batch), "columns": blocks}
+
+    @staticmethod
+    def __footer(mapped: Any, file_name: str) -> dict:
+        """
+        Читает оглавление снимка.
+        @param mapped: Файл снимка, отображённый в память.
+        @param file_name: Имя файла (для сообщения об ошибке).
+        @return: Оглавление снимка.
+        @raise ValueError: Если файл не является снимком.
+        """
+        tail = len(SNAPSHOT_MAGIC) + 8
+        if mapped[: len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC or mapped[-len(SNAPSHOT_MAGIC) :] != SNAPSHOT_MAGIC:
+            raise ValueError("Not a snapshot file: %s" % file_name)
+        (footer_length,) = struct.unpack("<Q", mapped[-tail : -len(SNAPSHOT_MAGIC)])
+        footer: dict = json.loads(mapped[len(mapped) - tail - footer_length : len(mapped) - tail])
+        return footer
+
+    def row_group_count(self) -> int:
+        """
+        Получает количество групп строк в снимке (группы строк можно читать независимо, см. iter_file).
+        @return: Количество групп строк.
+        @raise ValueError: Если файл не является снимком.
+        """
+        full_path = os.path.abspath(self.__file_name)
+        with open(full_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return len(self.__footer(mapped, self.__file_name)["row_groups"])
+
+    def __row_groups(self, columns: Sequence[str], selected: Iterable[int] | None = None) -> Iterator[dict[str, list]]:
+        """
+        Читает из файла снимка значения столбцов по группам строк.
+        @param columns: Имена столбцов.
+        @param selected: Номера групп строк (None - все группы строк).
+        @return: Генератор словарей {имя столбца: значения столбца в группе строк}.
+        @raise ValueError: Если файл не является снимком или в снимке нет столбца.
+        """
+        full_path = os.path.abspath(self.__file_name)
+        with open(full_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            row_groups = self.__footer(mapped, self.__file_name)["row_groups"]
+            if selected is not None:
+                row_groups = [row_groups[index] for index in selected]
+
+            for row_group in row_groups:
+                values = {}
+                with instrumentation.span("snapshot.read_row_group"):
+                    for name in columns:
+                        if name not in row_group["columns"]:
+                            raise ValueError("Unknown snapshot column: %s" % name)
+                        offset, length = row_group["columns"][name]
+                        values[name] = json.loads(zlib.decompress(mapped[offset : offset + length]))
+                yield values
+
+    def read_column(self, column: str) -> list:
+        """
+        Читает из снимка значения одного столбца (остальные столбцы не распаковываются).
+        @param column: Имя столбца (см. SNAPSHOT_COLUMNS), например "vacancy_id" или "salary".
+        @return: Список значений столбца.
+        """
+        values = []
+        for row_group in self.__row_groups([column]):
+            values.extend(row_group[column])
+
+        return values
+
+    def iter_file(self, row_groups: Iterable[int] | None = None) -> Iterator[Vacancy]:
+        """
+        Читает вакансии из снимка по одной. Вакансии одной компании в группе строк ссылаются на одну запись о компании.
+        @param row_groups: Номера читаемых групп строк (None - весь снимок).
+        @return: Генератор записей о вакансиях.
+        """
+        for row_group in self.__row_groups(SNAPSHOT_COLUMNS, row_groups):
+            companies: dict[str, Company] = {}
+            for row in zip(*(row_group[name] for name in SNAPSHOT_COLUMNS)):
+                company = companies.get(row[1])
+                if company is None:
+                    company = companies[row[1]] = Company(row[1], *row[9:])
+                yield Vacancy(row[0], company, *row[2:9])
+
+    def read_file(self) -> list[Vacancy]:
+        """
+        Читает все вакансии из снимка.
+        @return: Список записей о вакансиях.
+        """
+        return list(self.iter_file())
+
 
 if __name__ == "__main__":
     from src.headhunter_api import HeadHunterAPI
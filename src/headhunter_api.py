@@ -1,14 +1,40 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator
 
 import requests
 
+from src.http_client import HttpClient, get_shared_client
+from src.instrumentation import instrumentation
+
 BASE_URL = "https://api.hh.ru/vacancies"
+MAX_WORKERS = 20  # Максимальное количество потоков для параллельной загрузки страниц
+MAX_RESULTS = 2000  # API выдаёт не больше 2000 вакансий по одному запросу (page * per_page)
+CRAWL_PERIOD = timedelta(days=30)  # Период публикации вакансий, который обходит crawl_vacancies по умолчанию
+MIN_WINDOW = timedelta(seconds=2)  # Окно дат, которое уже не делится на части
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"  # Со смещением часового пояса, если дата его содержит
 
 
 class BaseAPI(ABC):
     """Абстрактный класс для работы с API сервиса с вакансиями"""
 
+    def __init__(self, client: HttpClient | None = None) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param client: HTTP-клиент с пулом соединений (по умолчанию - общий клиент для всех API).
+        """
+        self.__client = client if client is not None else get_shared_client()
+
+    @property
+    def client(self) -> HttpClient:
+        """
+        HTTP-клиент, через который выполняются запросы к API.
+        @return: Экземпляр класса HttpClient.
+        """
+        return self.__client
+
     @abstractmethod
     def load_vacancies(self, keyword: str) -> list[dict]:
         """Обязательный метод для получения списка вакансий.
@@ -23,50 +49,303 @@ class BaseAPI(ABC):
 class HeadHunterAPI(BaseAPI):
     """Класс для работы с API HeadHunter."""
 
-    def __init__(self, url: str = BASE_URL, pages: int = 1, per_page: int = 10) -> None:
+    def __init__(
+        self,
+        url: str = BASE_URL,
+        pages: int = 1,
+        per_page: int = 10,
+        max_workers: int = MAX_WORKERS,
+        client: HttpClient | None = None,
+    ) -> None:
         """
         Инициализатор экземпляра класса.
         @param url: URL-адрес для GET-запроса (по умолчанию "https://api.hh.ru/vacancies" - все сайты группы компаний).
         @param pages: Определяет количество страниц, в которых будет осуществлён поиск (по умолчанию - 1).
         @param per_page: Количество вакансий на странице (по умолчанию - 10).
+        @param max_workers: Максимальное количество потоков для параллельной загрузки страниц.
+        @param client: HTTP-клиент с пулом соединений (по умолчанию - общий клиент для всех API).
         """
+        super().__init__(client)
         self.__url: str = url
         self.__headers: Any = {"User-Agent": "HH-User-Agent"}
-        self.__params: Any = {"text": "", "page": pages, "per_page": per_page, "only_with_salary": True}
+        self.__params: Any = {"text": "", "per_page": per_page, "only_with_salary": True}
+        self.__pages: int = pages
+        self.__max_workers: int = max_workers
         self.__vacancies: list = []
 
-    def __connect_to_api(self) -> requests.models.Response | None:
+    def __request(self, params: dict) -> dict | None:
         """
-        Метод для подключения к API и проверки статус-кода.
-        @return: Ответ сервера при подключении к API.
+        Выполняет запрос страницы с вакансиями.
+        @param params: Параметры запроса.
+        @return: Ответ API (словарь с ключами items, found, pages) или None, если страницу получить не удалось.
         """
         try:
-            response = requests.get(self.__url)
+            response = self.client.get(self.__url, headers=self.__headers, params=params)
             response.raise_for_status()
-            return response
         except requests.exceptions.RequestException as e:
-            # Если при подключении возникла ошибка, то выводим её в консоль.
+            # Если страницу получить не удалось, то выводим ошибку в консоль и продолжаем с остальными страницами.
             print(e)
+            instrumentation.count("hh.page_errors")
             return None
 
+        with instrumentation.span("hh.parse_page"):
+            data: dict = response.json()
+        instrumentation.count("hh.pages")
+        return data
+
+    def __load_page(self, keyword: str, page: int) -> list[dict]:
+        """
+        Метод для получения одной страницы с вакансиями.
+        @param keyword: Ключевое слово запроса.
+        @param page: Номер страницы (нумерация с 0).
+        @return: Список вакансий на странице.
+        """
+        data = self.__request({**self.__params, "text": keyword, "page": page})
+        items: list[dict] = data.get("items", []) if data is not None else []
+        return items
+
+    @staticmethod
+    def __merge(vacancies: dict, positions: dict, keyword: str, items: list[dict], position: tuple) -> None:
+        """
+        Добавляет вакансии страницы к результату, исключая повторы по id.
+        @param vacancies: Результат {id вакансии: вакансия}.
+        @param positions: Первое появление вакансий {id вакансии: позиция}.
+        @param keyword: Ключевое слово, по которому получена страница.
+        @param items: Вакансии страницы.
+        @param position: Позиция страницы (вакансии упорядочиваются по позиции первого появления).
+        @return: None
+        """
+        for number, vacancy in enumerate(items):
+            item_position = position + (number,)
+            known = vacancies.get(vacancy["id"])
+            if known is None:
+                vacancies[vacancy["id"]] = {**vacancy, "matched_keywords": [keyword]}
+                positions[vacancy["id"]] = item_position
+                continue
+            if keyword not in known["matched_keywords"]:
+                known["matched_keywords"].append(keyword)
+            positions[vacancy["id"]] = min(positions[vacancy["id"]], item_position)
+
+    @staticmethod
+    def __ordered(vacancies: dict, positions: dict, keywords: list[str]) -> list[dict]:
+        """
+        Упорядочивает вакансии по первому появлению, а их ключевые слова - в порядке списка ключевых слов.
+        @param vacancies: Результат {id вакансии: вакансия}.
+        @param positions: Первое появление вакансий {id вакансии: позиция}.
+        @param keywords: Ключевые слова.
+        @return: Список вакансий.
+        """
+        for vacancy in vacancies.values():
+            vacancy["matched_keywords"].sort(key=keywords.index)
+        return sorted(vacancies.values(), key=lambda vacancy: positions[vacancy["id"]])
+
+    @staticmethod
+    def __unique_keywords(keywords: Iterable[str]) -> list[str]:
+        """
+        Приводит ключевые слова к нижнему регистру и убирает повторы и пустые строки.
+        @param keywords: Ключевые слова.
+        @return: Список ключевых слов.
+        """
+        return list(dict.fromkeys(keyword.strip().lower() for keyword in keywords if keyword.strip()))
+
+    @instrumentation.timed("hh.load_vacancies")
     def load_vacancies(self, keyword: str = "Python") -> list[dict]:
         """
         Метод для получения списка вакансий.
+        Страницы 0..pages-1 загружаются параллельно, результат объединяется в порядке номеров страниц.
         @param keyword: Строковая переменная, содержащая ключевое слово, по которому осуществляется первичный отбор
         вакансий.
         @return: Список вакансий.
         """
-        response = self.__connect_to_api()
-        if response is None:
-            return []
-
         self.__params["text"] = keyword
-        response = requests.get(self.__url, headers=self.__headers, params=self.__params)
-        vacancies = response.json()
-        self.__vacancies = vacancies.get("items", [])
+        with ThreadPoolExecutor(max_workers=max(1, min(self.__max_workers, self.__pages))) as executor:
+            # executor.map возвращает результаты в порядке номеров страниц, а не в порядке завершения запросов
+            pages = list(executor.map(self.__load_page, [keyword] * self.__pages, range(self.__pages)))
+        self.__vacancies = [vacancy for page in pages for vacancy in page]
+
+        return self.__vacancies
+
+    def __iter_pages(
+        self,
+        keywords: list[str],
+        crawl: bool = False,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        max_results: int = MAX_RESULTS,
+        strict: bool = False,
+    ) -> Iterator[tuple[int, tuple, list[dict]]]:
+        """
+        Загружает страницы с вакансиями по ключевым словам в общем пуле потоков и возвращает их по мере получения.
+        Без crawl загружаются страницы 0..pages-1 каждого ключевого слова. С crawl для каждого ключевого слова
+        запрашивается первая страница периода публикации: если найдено не больше max_results вакансий, загружаются
+        остальные страницы, иначе период делится на found // max_results + 1 равных окон (date_from / date_to),
+        и для каждого окна проверка повторяется. Первая страница окна, в том числе разделённого, возвращается как
+        результат, поэтому проверка не стоит лишнего запроса (вакансии первой страницы разделённого окна встретятся
+        и в окнах-частях и исключаются как повторы).
+        Одновременно выполняется не больше max_workers запросов, а следующие запросы отправляются, только когда
+        потребитель забирает страницы, поэтому количество загруженных, но не обработанных страниц ограничено.
+        @param keywords: Ключевые слова.
+        @param crawl: Загружать все найденные вакансии с делением периода публикации на окна.
+        @param date_from: Начало периода публикации (по умолчанию - date_to минус 30 дней).
+        @param date_to: Конец периода публикации (по умолчанию - текущее время в UTC или, если date_from без
+        часового пояса, местное время).
+        @param max_results: Максимальное количество вакансий, которое API выдаёт по одному запросу.
+        @param strict: Прервать загрузку, если страницу получить не удалось (иначе страница пропускается).
+        @return: Генератор кортежей (номер ключевого слова, позиция страницы для упорядочивания, вакансии страницы).
+        @raise RuntimeError: Если strict и страницу получить не удалось.
+        """
+        per_page = self.__params["per_page"]
+        # Задача: (номер ключевого слова, окно дат публикации или None, номер страницы)
+        backlog: deque[tuple[int, tuple[datetime, datetime] | None, int]] = deque()
+        if crawl:
+            if date_to is None:
+                # Время с часовым поясом нельзя сравнивать со временем без него
+                tz = date_from.tzinfo if date_from is not None else timezone.utc
+                date_to = datetime.now(tz).replace(microsecond=0)
+            date_from = date_from if date_from is not None else date_to - CRAWL_PERIOD
+            backlog.extend((index, (date_from, date_to), 0) for index in range(len(keywords)))
+        else:
+            backlog.extend((index, None, page) for index in range(len(keywords)) for page in range(self.__pages))
+
+        with ThreadPoolExecutor(max_workers=self.__max_workers) as executor:
+            running: dict[Future, tuple[int, tuple[datetime, datetime] | None, int]] = {}
+            while backlog or running:
+                while backlog and len(running) < self.__max_workers:
+                    index, window, page = task = backlog.popleft()
+                    params = {**self.__params, "text": keywords[index], "page": page}
+                    if window is not None:
+                        params["date_from"], params["date_to"] = (bound.strftime(DATE_FORMAT) for bound in window)
+                    running[executor.submit(self.__request, params)] = task
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, window, page = running.pop(future)
+                    data = future.result()
+                    if data is None:
+                        if strict:
+                            raise RuntimeError("Failed to load page %d for keyword '%s'" % (page, keywords[index]))
+                        continue
+                    if window is None:
+                        yield index, (index, page), data.get("items", [])
+                        continue
+
+                    start, end = window
+                    found = data.get("found", 0)
+                    if page == 0 and found > max_results and end - start >= MIN_WINDOW:
+                        # Окно делится на части так, чтобы в каждой (при равномерном распределении вакансий по датам)
+                        # было не больше max_results вакансий
+                        parts = max(2, min(found // max_results + 1, int((end - start).total_seconds())))
+                        step = (end - start) / parts
+                        bounds = [start + step * part for part in range(parts)] + [end]
+                        for part_start, part_end in zip(bounds, bounds[1:]):
+                            backlog.append(
+                                (index, (part_start.replace(microsecond=0), part_end.replace(microsecond=0)), 0)
+                            )
+                        yield index, (index, -end.timestamp(), page), data.get("items", [])
+                        continue
+
+                    if page == 0:
+                        if found > max_results:
+                            print(
+                                "Окно %s - %s по запросу '%s' не делится, получено %d из %d вакансий"
+                                % (start, end, keywords[index], max_results, found)
+                            )
+                        pages = min(data.get("pages", 1), max_results // per_page)
+                        backlog.extend((index, window, next_page) for next_page in range(1, pages))
+                    yield index, (index, -end.timestamp(), page), data.get("items", [])
+
+    def __collect(self, keywords: list[str], pages: Iterable[tuple[int, tuple, list[dict]]]) -> list[dict]:
+        """
+        Объединяет страницы с вакансиями, исключая повторы по id.
+        @param keywords: Ключевые слова.
+        @param pages: Страницы (номер ключевого слова, позиция страницы, вакансии страницы).
+        @return: Список вакансий без повторов в порядке первого появления.
+        """
+        vacancies: dict[Any, dict] = {}
+        positions: dict[Any, tuple] = {}
+        for index, position, items in pages:
+            self.__merge(vacancies, positions, keywords[index], items, position)
 
+        self.__vacancies = self.__ordered(vacancies, positions, keywords)
         return self.__vacancies
 
+    @instrumentation.timed("hh.load_vacancies_many")
+    def load_vacancies_many(self, keywords: Iterable[str]) -> list[dict]:
+        """
+        Метод для получения списка вакансий по нескольким ключевым словам.
+        Страницы всех ключевых слов загружаются параллельно в общем пуле потоков. Повторы вакансий (по id)
+        исключаются по мере получения страниц, в поле "matched_keywords" каждой вакансии записываются ключевые слова,
+        по которым она найдена. Вакансии упорядочены по первому появлению (в порядке ключевых слов и страниц).
+        @param keywords: Ключевые слова (приводятся к нижнему регистру, повторы и пустые строки пропускаются).
+        @return: Список вакансий без повторов.
+        """
+        unique_keywords = self.__unique_keywords(keywords)
+        return self.__collect(unique_keywords, self.__iter_pages(unique_keywords))
+
+    @instrumentation.timed("hh.crawl_vacancies")
+    def crawl_vacancies(
+        self,
+        keywords: Iterable[str],
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        max_results: int = MAX_RESULTS,
+    ) -> list[dict]:
+        """
+        Метод для получения всех вакансий по ключевым словам в обход ограничения API на глубину выдачи: период
+        публикации делится на окна дат, в каждое из которых попадает не больше max_results вакансий (окна загружаются
+        параллельно). Количество страниц pages не учитывается; per_page = 100 даёт наименьшее количество запросов.
+        Повторы вакансий исключаются как в load_vacancies_many.
+        @param keywords: Ключевые слова.
+        @param date_from: Начало периода публикации (по умолчанию - date_to минус 30 дней).
+        @param date_to: Конец периода публикации (по умолчанию - текущее время).
+        @param max_results: Максимальное количество вакансий, которое API выдаёт по одному запросу.
+        @return: Список вакансий без повторов (окна с более поздними датами - первыми).
+        """
+        unique_keywords = self.__unique_keywords(keywords)
+        return self.__collect(
+            unique_keywords, self.__iter_pages(unique_keywords, True, date_from, date_to, max_results)
+        )
+
+    @instrumentation.timed("hh.iter_vacancies")
+    def iter_vacancies(
+        self,
+        keywords: Iterable[str],
+        crawl: bool = False,
+        date_from: datetime | None = None,
+        date_to: datetime | None = None,
+        max_results: int = MAX_RESULTS,
+        strict: bool = False,
+    ) -> Iterator[list[dict]]:
+        """
+        Метод для потоковой загрузки вакансий: страницы возвращаются по мере получения (в порядке завершения
+        запросов), пока загружаются следующие. Каждая вакансия возвращается один раз, при первом появлении; список
+        "matched_keywords" уже возвращённой вакансии дополняется, если она встретится по другому ключевому слову.
+        Для исключения повторов хранятся только id вакансий.
+        @param keywords: Ключевые слова.
+        @param crawl: Загружать все найденные вакансии с делением периода публикации на окна (см. crawl_vacancies).
+        @param date_from: Начало периода публикации для crawl.
+        @param date_to: Конец периода публикации для crawl.
+        @param max_results: Максимальное количество вакансий, которое API выдаёт по одному запросу.
+        @param strict: Прервать загрузку, если страницу получить не удалось. Нужно при инкрементальной загрузке
+        в базу данных: вакансии пропущенной страницы иначе были бы помечены закрытыми.
+        @return: Генератор страниц (списков новых вакансий).
+        @raise RuntimeError: Если strict и страницу получить не удалось.
+        """
+        unique_keywords = self.__unique_keywords(keywords)
+        matched_keywords: dict[Any, list[str]] = {}
+        for index, _, items in self.__iter_pages(unique_keywords, crawl, date_from, date_to, max_results, strict):
+            keyword = unique_keywords[index]
+            page = []
+            for vacancy in items:
+                known = matched_keywords.get(vacancy["id"])
+                if known is None:
+                    matched_keywords[vacancy["id"]] = known = [keyword]
+                    page.append({**vacancy, "matched_keywords": known})
+                elif keyword not in known:
+                    known.append(keyword)
+            if page:
+                yield page
+
 
 if __name__ == "__main__":
     # ----------- ПОЛУЧЕНИЕ ВАКАНСИЙ С САЙТА hh.ru В ФОРМАТЕ JSON -------------
@@ -0,0 +1,231 @@
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from src.instrumentation import instrumentation
+from src.response_cache import CachedResponse, ResponseCache
+
+POOL_SIZE = 20  # Количество keep-alive соединений (и одновременных запросов) на один хост
+TIMEOUT = (3.05, 30.0)  # Таймауты (подключение, чтение) в секундах
+MAX_RETRIES = 5  # Количество повторных попыток после первой неудачной
+BACKOFF_FACTOR = 0.5  # Базовая задержка экспоненциальной выдержки в секундах
+BACKOFF_MAX = 30.0  # Максимальная задержка экспоненциальной выдержки в секундах
+MAX_RETRY_AFTER = 120.0  # Максимальное значение заголовка Retry-After, которое клиент готов ждать
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpClient:
+    """Класс для выполнения HTTP-запросов через общий пул keep-alive соединений с повторными попытками."""
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        timeout: float | tuple[float, float] = TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        backoff_factor: float = BACKOFF_FACTOR,
+        backoff_max: float = BACKOFF_MAX,
+        max_retry_after: float = MAX_RETRY_AFTER,
+        cache: ResponseCache | None = None,
+    ) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param pool_size: Количество keep-alive соединений на один хост. Одновременно к хосту выполняется не больше
+        pool_size запросов, остальные потоки ждут освобождения соединения.
+        @param timeout: Таймаут запроса в секундах или кортеж (таймаут подключения, таймаут чтения).
+        @param max_retries: Количество повторных попыток при ошибках соединения и статус-кодах 429/5xx.
+        @param backoff_factor: Базовая задержка экспоненциальной выдержки в секундах.
+        @param backoff_max: Максимальная задержка экспоненциальной выдержки в секундах.
+        @param max_retry_after: Максимальная задержка из заголовка Retry-After, при превышении повторы прекращаются.
+        @param cache: Кэш ответов. Свежие ответы выдаются из кэша без запроса к серверу, устаревшие проверяются
+        условным запросом (If-None-Match / If-Modified-Since). None - без кэша.
+        """
+        self.__pool_size = pool_size
+        self.__timeout = timeout
+        self.__max_retries = max_retries
+        self.__backoff_factor = backoff_factor
+        self.__backoff_max = backoff_max
+        self.__max_retry_after = max_retry_after
+        self.__cache = cache
+        self.__host_semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self.__lock = threading.Lock()
+
+        # Повторы выполняются самим клиентом, поэтому встроенные повторы urllib3 отключены
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.__session = requests.Session()
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+    def __enter__(self) -> "HttpClient":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @property
+    def cache(self) -> ResponseCache | None:
+        """
+        Кэш ответов клиента.
+        @return: Экземпляр класса ResponseCache или None, если кэш не используется.
+        """
+        return self.__cache
+
+    def close(self) -> None:
+        """
+        Закрывает все соединения пула.
+        @return: None
+        """
+        self.__session.close()
+
+    def __host_semaphore(self, url: str) -> threading.BoundedSemaphore:
+        """
+        Возвращает семафор, ограничивающий количество одновременных запросов к хосту размером пула.
+        @param url: URL-адрес запроса.
+        @return: Семафор хоста.
+        """
+        host = urlsplit(url).netloc
+        with self.__lock:
+            if host not in self.__host_semaphores:
+                self.__host_semaphores[host] = threading.BoundedSemaphore(self.__pool_size)
+            return self.__host_semaphores[host]
+
+    def __backoff(self, attempt: int) -> float:
+        """
+        Вычисляет задержку перед повторной попыткой (экспоненциальная выдержка со случайным разбросом).
+        @param attempt: Номер неудачной попытки (нумерация с 0).
+        @return: Задержка в секундах.
+        """
+        return random.uniform(0, min(self.__backoff_max, self.__backoff_factor * 2**attempt))
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> float | None:
+        """
+        Разбирает заголовок Retry-After (количество секунд или HTTP-дата).
+        @param response: Ответ сервера.
+        @return: Задержка в секундах или None, если заголовка нет или он некорректен.
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    @staticmethod
+    def _cached_response(url: str, cached: CachedResponse) -> requests.Response:
+        """
+        Формирует объект ответа requests из записи кэша.
+        @param url: URL-адрес запроса.
+        @param cached: Запись кэша.
+        @return: Ответ сервера.
+        """
+        response = requests.Response()
+        response.status_code = cached.status_code
+        response.headers = CaseInsensitiveDict(cached.headers)
+        response._content = cached.content
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        return response
+
+    @instrumentation.timed("http.get")
+    def get(self, url: str, params: dict | None = None, headers: dict | None = None) -> requests.Response:
+        """
+        Выполняет GET-запрос с повторными попытками при ошибках соединения и статус-кодах 429/5xx.
+        Если у клиента есть кэш, свежий ответ выдаётся из кэша, а устаревший проверяется условным запросом:
+        при ответе 304 Not Modified выдаётся ответ из кэша, успешные ответы сохраняются в кэше.
+        @param url: URL-адрес запроса.
+        @param params: Параметры запроса.
+        @param headers: Заголовки запроса.
+        @return: Ответ сервера (последний ответ, если все попытки завершились статус-кодом 429/5xx).
+        @raise requests.exceptions.RequestException: Если все попытки завершились ошибкой соединения.
+        """
+        if self.__cache is None:
+            return self.__get(url, params, headers)
+
+        key = self.__cache.key(url, params)
+        cached = self.__cache.get(key)
+        if cached is not None and self.__cache.is_fresh(cached):
+            self.__cache.count("hits")
+            return self._cached_response(url, cached)
+
+        request_headers = dict(headers or {})
+        if cached is not None:
+            etag, last_modified = cached.header("ETag"), cached.header("Last-Modified")
+            if etag is not None:
+                request_headers["If-None-Match"] = etag
+            if last_modified is not None:
+                request_headers["If-Modified-Since"] = last_modified
+
+        response = self.__get(url, params, request_headers)
+        if cached is not None and response.status_code == 304:
+            self.__cache.touch(key)
+            self.__cache.count("revalidated")
+            return self._cached_response(url, cached)
+
+        self.__cache.count("misses")
+        if response.status_code == 200 and "no-store" not in response.headers.get("Cache-Control", ""):
+            self.__cache.put(key, response.status_code, dict(response.headers), response.content)
+        return response
+
+    def __get(self, url: str, params: dict | None, headers: dict | None) -> requests.Response:
+        """
+        Выполняет GET-запрос с повторными попытками при ошибках соединения и статус-кодах 429/5xx.
+        @param url: URL-адрес запроса.
+        @param params: Параметры запроса.
+        @param headers: Заголовки запроса.
+        @return: Ответ сервера.
+        @raise requests.exceptions.RequestException: Если все попытки завершились ошибкой соединения.
+        """
+        attempt = 0
+        while True:
+            try:
+                with self.__host_semaphore(url), instrumentation.span("http.request"):
+                    response = self.__session.get(url, params=params, headers=headers, timeout=self.__timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                instrumentation.count("http.errors", error=type(e).__name__)
+                if attempt >= self.__max_retries:
+                    raise
+                delay = self.__backoff(attempt)
+            else:
+                instrumentation.count("http.responses", status=response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.__max_retries:
+                    return response
+                retry_after = self._retry_after(response)
+                if retry_after is not None and retry_after > self.__max_retry_after:
+                    return response
+                delay = self.__backoff(attempt) if retry_after is None else retry_after
+                response.close()
+
+            instrumentation.count("http.retries")
+            time.sleep(delay)
+            attempt += 1
+
+
+_shared_client: HttpClient | None = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> HttpClient:
+    """
+    Возвращает общий для всех клиентов API экземпляр HttpClient с параметрами по умолчанию.
+    @return: Экземпляр класса HttpClient.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient()
+        return _shared_client
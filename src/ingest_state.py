@@ -0,0 +1,111 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+# После каждой загрузки вакансий из API в таблицу ingest_state (см. schema.py) записываются время загрузки и параметры
+# запроса к API. По ним при запуске программы определяется, можно ли сразу перейти к запросам к базе данных
+
+MAX_AGE_HOURS = 12  # Данные, загруженные раньше, считаются устаревшими
+
+SAVE_INGEST_STATE_QUERY = """
+    INSERT INTO ingest_state (keywords, pages, per_page, crawl, vacancy_count)
+    VALUES (%s, %s, %s, %s, (SELECT COUNT(*) FROM vacancies WHERE NOT closed))
+    """
+LOAD_INGEST_STATE_QUERY = """
+    SELECT keywords, pages, per_page, crawl, ingested_at, vacancy_count
+    FROM ingest_state
+    ORDER BY ingested_at DESC
+    LIMIT 1
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class IngestState:
+    """Параметры загрузки вакансий из API и время загрузки."""
+
+    keywords: str  # Ключевые слова через запятую
+    pages: int
+    per_page: int
+    crawl: bool
+    ingested_at: datetime | None = None
+    vacancy_count: int | None = None  # Количество открытых вакансий после загрузки
+
+    @staticmethod
+    def normalize_keywords(keywords: str) -> str:
+        """
+        Приводит ключевые слова к виду, не зависящему от регистра, пробелов и порядка слов.
+        @param keywords: Ключевые слова через запятую.
+        @return: Отсортированные ключевые слова в нижнем регистре через запятую.
+        """
+        return ",".join(sorted({keyword.strip().lower() for keyword in keywords.split(",") if keyword.strip()}))
+
+    @property
+    def request_key(self) -> str:
+        """
+        Ключ запроса к API: одинаковый у загрузок с теми же ключевыми словами и параметрами.
+        @return: Строка вида "django,python|1|10|0".
+        """
+        return "%s|%d|%d|%d" % (self.normalize_keywords(self.keywords), self.pages, self.per_page, self.crawl)
+
+    def same_request(self, other: "IngestState") -> bool:
+        """
+        Проверяет, что загрузка выполнена с теми же параметрами запроса к API.
+        @param other: Параметры другой загрузки.
+        @return: True, если ключевые слова и параметры совпадают.
+        """
+        own = (self.normalize_keywords(self.keywords), self.pages, self.per_page, self.crawl)
+        return own == (self.normalize_keywords(other.keywords), other.pages, other.per_page, other.crawl)
+
+    def age(self, now: datetime | None = None) -> timedelta | None:
+        """
+        Получает время, прошедшее после загрузки.
+        @param now: Текущее время (None - текущее время UTC).
+        @return: Время после загрузки или None, если время загрузки неизвестно.
+        """
+        if self.ingested_at is None:
+            return None
+        return (now or datetime.now(timezone.utc)) - self.ingested_at
+
+
+def is_fresh(
+    state: IngestState | None,
+    requested: IngestState,
+    max_age: timedelta = timedelta(hours=MAX_AGE_HOURS),
+    now: datetime | None = None,
+) -> bool:
+    """
+    Проверяет, можно ли использовать данные базы данных вместо новой загрузки из API.
+    @param state: Параметры последней загрузки (None - загрузок не было).
+    @param requested: Параметры запрошенной загрузки.
+    @param max_age: Максимальное время после последней загрузки.
+    @param now: Текущее время (None - текущее время UTC).
+    @return: True, если последняя загрузка выполнена с теми же параметрами не раньше max_age назад.
+    """
+    if state is None or not state.same_request(requested):
+        return False
+    age = state.age(now)
+    return age is not None and age <= max_age
+
+
+def save_ingest_state(cur: Any, state: IngestState) -> None:
+    """
+    Записывает параметры загрузки в таблицу ingest_state в текущей транзакции (время загрузки - время транзакции).
+    @param cur: Курсор psycopg2.
+    @param state: Параметры загрузки.
+    @return: None
+    """
+    cur.execute(
+        SAVE_INGEST_STATE_QUERY,
+        [IngestState.normalize_keywords(state.keywords), state.pages, state.per_page, state.crawl],
+    )
+
+
+def load_ingest_state(cur: Any) -> IngestState | None:
+    """
+    Читает параметры последней загрузки из таблицы ingest_state.
+    @param cur: Курсор psycopg2.
+    @return: Параметры последней загрузки или None, если загрузок не было.
+    """
+    cur.execute(LOAD_INGEST_STATE_QUERY)
+    row = cur.fetchone()
+    return IngestState(*row) if row is not None else None
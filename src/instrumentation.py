@@ -0,0 +1,319 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Generator, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+LOG_ENV = "HH_TRACE_LOG"  # Переменная окружения: путь к журналу интервалов (JSON Lines)
+METRICS_ENV = "HH_METRICS_FILE"  # Переменная окружения: путь к файлу метрик в текстовом формате Prometheus
+METRIC_PREFIX = "hh"
+
+
+class _NullSpan:
+    """Интервал, который ничего не измеряет (используется, когда инструментирование отключено)."""
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Измеряемый интервал: время выполнения блока with."""
+
+    __slots__ = ("__owner", "__name", "__labels", "__started_at")
+
+    def __init__(self, owner: "Instrumentation", name: str, labels: dict[str, Any]) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param owner: Экземпляр Instrumentation, в котором сохраняется результат.
+        @param name: Имя интервала.
+        @param labels: Метки интервала.
+        """
+        self.__owner = owner
+        self.__name = name
+        self.__labels = labels
+        self.__started_at = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.__owner._push(self.__name)
+        self.__started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        self.__owner._finish(self.__name, self.__labels, time.perf_counter() - self.__started_at, exc_type is None)
+
+
+class Instrumentation:
+    """
+    Инструментирование горячих участков: интервалы (время выполнения), счётчики и экспорт в журнал JSON Lines
+    и текстовый формат Prometheus. По умолчанию отключено: span возвращает общий пустой интервал, count сразу
+    возвращается, поэтому накладные расходы - одна проверка флага.
+    """
+
+    def __init__(self) -> None:
+        """
+        Инициализатор экземпляра класса.
+        """
+        self.__enabled = False
+        self.__lock = threading.Lock()
+        self.__local = threading.local()
+        self.__spans: dict[tuple, list[float]] = {}  # (имя, метки) -> [количество, сумма, максимум, ошибки]
+        self.__counters: dict[tuple, float] = {}
+        self.__log: Any = None
+        self.__metrics_path: str | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Признак включённого инструментирования.
+        @return: True, если интервалы и счётчики записываются.
+        """
+        return self.__enabled
+
+    def enable(self, log_path: str | None = None, metrics_path: str | None = None) -> None:
+        """
+        Включает инструментирование.
+        @param log_path: Путь к журналу интервалов: каждый завершённый интервал записывается строкой JSON (None - без
+        журнала).
+        @param metrics_path: Путь к файлу метрик Prometheus, который записывается методом export (None - не
+        записывать).
+        @return: None
+        """
+        with self.__lock:
+            if log_path is not None:
+                self.__log = open(os.path.abspath(log_path), "a", encoding="utf-8")
+            self.__metrics_path = metrics_path
+            self.__enabled = True
+
+    def enable_from_env(self) -> bool:
+        """
+        Включает инструментирование, если задана переменная окружения HH_TRACE_LOG или HH_METRICS_FILE.
+        @return: True, если инструментирование включено.
+        """
+        log_path, metrics_path = os.environ.get(LOG_ENV), os.environ.get(METRICS_ENV)
+        if log_path or metrics_path:
+            self.enable(log_path=log_path or None, metrics_path=metrics_path or None)
+        return self.__enabled
+
+    def disable(self) -> None:
+        """
+        Отключает инструментирование и закрывает журнал (накопленные значения сохраняются до reset).
+        @return: None
+        """
+        with self.__lock:
+            self.__enabled = False
+            if self.__log is not None:
+                self.__log.close()
+                self.__log = None
+
+    def reset(self) -> None:
+        """
+        Удаляет накопленные значения интервалов и счётчиков.
+        @return: None
+        """
+        with self.__lock:
+            self.__spans.clear()
+            self.__counters.clear()
+
+    def span(self, name: str, **labels: Any) -> Any:
+        """
+        Создаёт интервал для блока with: with instrumentation.span("db.copy", table="vacancies"): ...
+        @param name: Имя интервала.
+        @param labels: Метки интервала.
+        @return: Контекстный менеджер интервала.
+        """
+        if not self.__enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def count(self, name: str, value: float = 1, **labels: Any) -> None:
+        """
+        Увеличивает счётчик.
+        @param name: Имя счётчика.
+        @param value: Приращение.
+        @param labels: Метки счётчика.
+        @return: None
+        """
+        if not self.__enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def timed(self, name: str, **labels: Any) -> Callable[[F], F]:
+        """
+        Декоратор: время выполнения функции записывается интервалом name. Для генераторной функции измеряется время
+        от получения первого элемента до исчерпания генератора (включая обработку элементов вызывающим кодом).
+        @param name: Имя интервала.
+        @param labels: Метки интервала.
+        @return: Декоратор.
+        """
+
+        def decorator(function: F) -> F:
+            if inspect.isgeneratorfunction(function):
+
+                @functools.wraps(function)
+                def generator_wrapper(*args: Any, **kwargs: Any) -> Generator[Any, Any, Any]:
+                    if not self.__enabled:
+                        return (yield from function(*args, **kwargs))
+                    with _Span(self, name, labels):
+                        return (yield from function(*args, **kwargs))
+
+                return generator_wrapper  # type: ignore[return-value]
+
+            @functools.wraps(function)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.__enabled:
+                    return function(*args, **kwargs)
+                with _Span(self, name, labels):
+                    return function(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
+
+    def _push(self, name: str) -> None:
+        """
+        Отмечает начало интервала в текущем потоке (для определения родительского интервала).
+        @param name: Имя интервала.
+        @return: None
+        """
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+        stack.append(name)
+
+    def _finish(self, name: str, labels: dict[str, Any], seconds: float, ok: bool) -> None:
+        """
+        Сохраняет результат завершённого интервала.
+        @param name: Имя интервала.
+        @param labels: Метки интервала.
+        @param seconds: Длительность в секундах.
+        @param ok: False, если блок завершился исключением.
+        @return: None
+        """
+        # Интервал генератора может завершиться не последним (генератор закрыт позже) или в другом потоке,
+        # поэтому имя удаляется поиском с конца стека
+        stack = getattr(self.__local, "stack", [])
+        for index in range(len(stack) - 1, -1, -1):
+            if stack[index] == name:
+                del stack[index]
+                break
+        key = (name, tuple(sorted(labels.items())))
+        with self.__lock:
+            stats = self.__spans.get(key)
+            if stats is None:
+                stats = self.__spans[key] = [0, 0.0, 0.0, 0]
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+            stats[3] += not ok
+            if self.__log is not None:
+                event = {"ts": time.time(), "span": name, "seconds": round(seconds, 6), "ok": ok}
+                if stack:
+                    event["parent"] = stack[-1]
+                if labels:
+                    event["labels"] = labels
+                self.__log.write(json.dumps(event, ensure_ascii=False, default=str) + "\n")
+
+    def snapshot(self) -> dict[str, list[dict]]:
+        """
+        Получает накопленные значения.
+        @return: Словарь {"spans": [...], "counters": [...]}: для интервалов - количество, суммарное и максимальное
+        время и количество ошибок, для счётчиков - значение.
+        """
+        with self.__lock:
+            return {
+                "spans": [
+                    {
+                        "name": name,
+                        "labels": dict(labels),
+                        "count": count,
+                        "seconds": total,
+                        "max": peak,
+                        "errors": errors,
+                    }
+                    for (name, labels), (count, total, peak, errors) in sorted(self.__spans.items(), key=repr)
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self.__counters.items(), key=repr)
+                ],
+            }
+
+    def prometheus(self) -> str:
+        """
+        Формирует текст метрик в формате Prometheus (text exposition format). Имя интервала или счётчика передаётся
+        меткой, потому что имена метрик Prometheus не могут содержать точки.
+        @return: Текст метрик.
+        """
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP %s_span_seconds Time spent in instrumented spans." % METRIC_PREFIX,
+            "# TYPE %s_span_seconds summary" % METRIC_PREFIX,
+        ]
+        for span in snapshot["spans"]:
+            labels = _labels(dict(span["labels"], span=span["name"]))
+            lines.append("%s_span_seconds_sum%s %r" % (METRIC_PREFIX, labels, span["seconds"]))
+            lines.append("%s_span_seconds_count%s %d" % (METRIC_PREFIX, labels, span["count"]))
+        lines += ["# TYPE %s_span_seconds_max gauge" % METRIC_PREFIX]
+        lines += [
+            "%s_span_seconds_max%s %r" % (METRIC_PREFIX, _labels(dict(span["labels"], span=span["name"])), span["max"])
+            for span in snapshot["spans"]
+        ]
+        lines += ["# TYPE %s_span_errors_total counter" % METRIC_PREFIX]
+        lines += [
+            "%s_span_errors_total%s %d"
+            % (METRIC_PREFIX, _labels(dict(span["labels"], span=span["name"])), span["errors"])
+            for span in snapshot["spans"]
+        ]
+        lines += ["# TYPE %s_events_total counter" % METRIC_PREFIX]
+        lines += [
+            "%s_events_total%s %r"
+            % (METRIC_PREFIX, _labels(dict(counter["labels"], counter=counter["name"])), counter["value"])
+            for counter in snapshot["counters"]
+        ]
+        return "\n".join(lines) + "\n"
+
+    def export(self, metrics_path: str | None = None) -> None:
+        """
+        Записывает метрики в файл в формате Prometheus (файл перезаписывается целиком, чтобы его можно было
+        передать node_exporter textfile collector) и сбрасывает журнал на диск.
+        @param metrics_path: Путь к файлу (None - путь, заданный при включении).
+        @return: None
+        """
+        path = metrics_path or self.__metrics_path
+        if self.__log is not None:
+            self.__log.flush()
+        if path is None:
+            return
+        full_path = os.path.abspath(path)
+        with open(full_path + ".tmp", "w", encoding="utf-8") as file:
+            file.write(self.prometheus())
+        os.replace(full_path + ".tmp", full_path)
+
+
+def _labels(labels: dict[str, Any]) -> str:
+    """
+    Формирует метки метрики Prometheus.
+    @param labels: Метки.
+    @return: Строка вида {name="value",...}.
+    """
+    escaped = (
+        '%s="%s"' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in sorted(labels.items())
+    )
+    return "{%s}" % ",".join(escaped)
+
+
+# Общий экземпляр, которым пользуются модули проекта
+instrumentation = Instrumentation()
@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from typing import Any
+
+# Записи о компаниях и вакансиях содержат только поля, которые сохраняются в базе данных. Записи со __slots__
+# занимают в памяти в несколько раз меньше вложенных словарей ответа API, а зарплата и фрагмент описания
+# разбираются один раз при создании записи.
+
+
+@dataclass(frozen=True, slots=True)
+class Company:
+    """Компания (работодатель)."""
+
+    company_id: str
+    company_name: str
+    company_url: str | None
+    company_alternate_url: str | None
+    trusted: bool | None
+
+    @classmethod
+    def from_api(cls, employer: dict) -> "Company":
+        """
+        Создаёт запись о компании из данных о работодателе.
+        @param employer: Данные о работодателе из ответа API.
+        @return: Запись о компании.
+        """
+        return cls(employer["id"], employer["name"], employer["url"], employer["alternate_url"], employer["trusted"])
+
+    def row(self) -> tuple:
+        """
+        Формирует строку таблицы companies.
+        @return: Кортеж значений в порядке столбцов таблицы companies.
+        """
+        return self.company_id, self.company_name, self.company_url, self.company_alternate_url, self.trusted
+
+
+@dataclass(frozen=True, slots=True)
+class Vacancy:
+    """Вакансия."""
+
+    vacancy_id: str
+    company: Company
+    vacancy_name: str
+    salary: int | None
+    salary_currency: str | None
+    published_at: str
+    vacancy_url: str
+    requirement: str | None
+    responsibility: str | None
+
+    @classmethod
+    def from_api(cls, vacancy: dict, companies: dict[str, Company] | None = None) -> "Vacancy":
+        """
+        Создаёт запись о вакансии из данных о вакансии.
+        @param vacancy: Данные о вакансии из ответа API.
+        @param companies: Словарь уже созданных записей о компаниях по ID: вакансии одной компании ссылаются на одну
+        запись (None - запись о компании создаётся для каждой вакансии).
+        @return: Запись о вакансии.
+        """
+        employer = vacancy["employer"]
+        company = companies.get(employer["id"]) if companies is not None else None
+        if company is None:
+            company = Company.from_api(employer)
+            if companies is not None:
+                companies[company.company_id] = company
+
+        # --Сеанс экзорцизма с ключами salary, потому что кто-то там хочет либо работать без денег,
+        # --либо хочет столько денег, сколько Вселенная дать не в состоянии.
+        # --Если зарплата не указана, в таблицу записывается NULL.
+        salary, salary_currency = None, None
+        if vacancy["salary"] is not None:
+            bounds = [bound for bound in (vacancy["salary"]["from"], vacancy["salary"]["to"]) if bound]
+            if bounds:
+                salary = max(bounds)
+                salary_currency = vacancy["salary"]["currency"]
+
+        # --Сеанс экзорцизма с ключом snippet, потому что кто-то в команде разработчиков hh решил,
+        # --что компетенции и ответственность непременно нужно объединить в какой-то фрагмент...
+        snippet: dict[str, Any] = vacancy["snippet"] or {}
+
+        return cls(
+            vacancy["id"],
+            company,
+            vacancy["name"],
+            salary,
+            salary_currency,
+            vacancy["published_at"],
+            vacancy["url"],
+            snippet.get("requirement"),
+            snippet.get("responsibility"),
+        )
+
+    def row(self) -> tuple:
+        """
+        Формирует строку таблицы vacancies (без хэша содержимого).
+        @return: Кортеж значений в порядке столбцов таблицы vacancies.
+        """
+        return (
+            self.vacancy_id,
+            self.company.company_id,
+            self.vacancy_name,
+            self.salary,
+            self.salary_currency,
+            self.published_at,
+            self.vacancy_url,
+            self.requirement,
+            self.responsibility,
+        )
@@ -0,0 +1,74 @@
+import base64
+import binascii
+import json
+from typing import NamedTuple
+
+# Постраничный вывод по ключу (keyset pagination): страница начинается после ключа последней строки предыдущей
+# страницы, поэтому сервер находит её по индексу, и любая страница получается так же быстро, как первая (в отличие
+# от OFFSET, при котором пропускаемые строки всё равно читаются). Ключ передаётся вызывающему коду непрозрачным
+# курсором - строкой base64, из которой восстанавливается список значений ключа
+
+PAGE_SIZE = 20  # Количество строк на странице по умолчанию
+MAX_PAGE_SIZE = 1000  # Максимальное количество строк на странице
+
+
+class Page(NamedTuple):
+    """Страница результата запроса."""
+
+    rows: list[tuple]
+    next_cursor: str | None  # Курсор следующей страницы (None - страница последняя)
+
+
+def encode_cursor(key: list | tuple) -> str:
+    """
+    Кодирует ключ последней строки страницы в курсор.
+    @param key: Значения ключа (строки, числа или None).
+    @return: Курсор - строка base64 без символов, требующих экранирования в URL.
+    """
+    data = json.dumps(list(key), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """
+    Восстанавливает ключ из курсора.
+    @param cursor: Курсор, полученный из encode_cursor.
+    @param size: Ожидаемое количество значений ключа.
+    @return: Список значений ключа.
+    @raise ValueError: Если курсор повреждён или получен для другого запроса.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(data.decode("utf-8"))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid page cursor: %r" % cursor) from None
+    if not isinstance(key, list) or len(key) != size:
+        raise ValueError("Invalid page cursor: %r" % cursor)
+    return key
+
+
+def page_limit(limit: int) -> int:
+    """
+    Проверяет размер страницы.
+    @param limit: Количество строк на странице.
+    @return: Количество строк на странице.
+    @raise ValueError: Если размер страницы меньше 1 или больше MAX_PAGE_SIZE.
+    """
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError("Page size must be between 1 and %d: %d" % (MAX_PAGE_SIZE, limit))
+    return limit
+
+
+def make_page(rows: list[tuple], key_size: int, limit: int) -> Page:
+    """
+    Формирует страницу из строк, полученных запросом с LIMIT limit + 1: последние key_size столбцов каждой строки -
+    ключ постраничного вывода, лишняя строка показывает, что есть следующая страница.
+    @param rows: Строки результата запроса.
+    @param key_size: Количество столбцов ключа в конце строки.
+    @param limit: Количество строк на странице.
+    @return: Страница без столбцов ключа.
+    """
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1][-key_size:]) if has_next else None
+    return Page([row[:-key_size] for row in rows], next_cursor)
@@ -0,0 +1,179 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar
+
+from src.models import Company, Vacancy
+
+QUEUE_SIZE = 4  # Количество страниц в очереди между соседними стадиями
+POLL_INTERVAL = 0.1  # Интервал проверки остановки конвейера при ожидании очереди в секундах
+
+T = TypeVar("T")
+
+_DONE = object()  # Признак окончания данных в очереди
+
+
+def normalize_page(page: list[dict]) -> list[Vacancy]:
+    """
+    Стадия нормализации: преобразует вакансии страницы в записи Vacancy, поэтому в очередях конвейера находятся
+    компактные записи только с сохраняемыми полями. Вакансии одной компании ссылаются на одну запись о компании.
+    @param page: Вакансии страницы (словари из ответа API).
+    @return: Записи о вакансиях страницы.
+    """
+    companies: dict[str, Company] = {}
+    return [Vacancy.from_api(vacancy, companies) for vacancy in page]
+
+
+class Pipeline:
+    """
+    Конвейер загрузки: источник страниц, стадии обработки и приёмник работают одновременно в отдельных потоках,
+    соединённых очередями ограниченного размера. Если следующая стадия не успевает, предыдущая ждёт места в очереди,
+    поэтому в памяти находится не больше queue_size страниц между каждой парой стадий.
+    """
+
+    def __init__(
+        self,
+        source: Iterable[list],
+        stages: Sequence[Callable[[list], list]] = (normalize_page,),
+        queue_size: int = QUEUE_SIZE,
+    ) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param source: Источник страниц (например, HeadHunterAPI.iter_vacancies).
+        @param stages: Стадии обработки: функции, преобразующие страницу (список записей) в страницу.
+        @param queue_size: Максимальное количество страниц в очереди между соседними стадиями.
+        """
+        self.__source = source
+        self.__stages = list(stages)
+        self.__queues: list[queue.Queue] = [queue.Queue(maxsize=queue_size) for _ in range(len(self.__stages) + 1)]
+        self.__stop = threading.Event()
+        self.__errors: list[BaseException] = []
+        self.__busy: dict[str, float] = {}
+        self.__sink_wait = 0.0
+
+    @property
+    def busy_time(self) -> dict[str, float]:
+        """
+        Время работы стадий в секундах (без ожидания очередей).
+        @return: Словарь {имя стадии: время работы}.
+        """
+        return dict(self.__busy)
+
+    def __put(self, index: int, item: Any) -> bool:
+        """
+        Помещает элемент в очередь, ожидая места, пока конвейер не остановлен.
+        @param index: Номер очереди.
+        @param item: Элемент.
+        @return: True, если элемент помещён в очередь.
+        """
+        while not self.__stop.is_set():
+            try:
+                self.__queues[index].put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def __get(self, index: int) -> Any:
+        """
+        Забирает элемент из очереди, ожидая его, пока конвейер не остановлен.
+        @param index: Номер очереди.
+        @return: Элемент или признак окончания данных, если конвейер остановлен.
+        """
+        while True:
+            try:
+                return self.__queues[index].get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if self.__stop.is_set():
+                    return _DONE
+
+    def __run_source(self) -> None:
+        """
+        Поток источника: помещает страницы источника в первую очередь.
+        @return: None
+        """
+        started_at = time.perf_counter()
+        waited = 0.0
+        pages = iter(self.__source)
+        try:
+            for page in pages:
+                put_at = time.perf_counter()
+                if not self.__put(0, page):
+                    return
+                waited += time.perf_counter() - put_at
+        except BaseException as e:
+            self.__errors.append(e)
+            self.__stop.set()
+        finally:
+            # Генератор источника закрывается явно, чтобы он завершил свои запросы, если конвейер остановлен раньше
+            close = getattr(pages, "close", None)
+            if close is not None:
+                close()
+            self.__busy["source"] = time.perf_counter() - started_at - waited
+            self.__put(0, _DONE)
+
+    def __run_stage(self, index: int) -> None:
+        """
+        Поток стадии обработки: забирает страницы из очереди index, обрабатывает и помещает в очередь index + 1.
+        @param index: Номер стадии.
+        @return: None
+        """
+        stage = self.__stages[index]
+        name = getattr(stage, "__name__", "stage_%d" % index)
+        busy = 0.0
+        try:
+            while (page := self.__get(index)) is not _DONE:
+                started_at = time.perf_counter()
+                result = stage(page)
+                busy += time.perf_counter() - started_at
+                if not self.__put(index + 1, result):
+                    return
+        except BaseException as e:
+            self.__errors.append(e)
+            self.__stop.set()
+        finally:
+            self.__busy[name] = busy
+            self.__put(index + 1, _DONE)
+
+    def __items(self) -> Iterator[Any]:
+        """
+        Возвращает записи страниц из последней очереди.
+        @return: Генератор записей.
+        @raise BaseException: Ошибка источника или стадии (приёмник прерывается и не получает неполные данные).
+        Данные, которые источник пропустил без исключения, приёмник не обнаружит, поэтому источник для
+        инкрементальной загрузки должен выбрасывать исключение при ошибке (HeadHunterAPI.iter_vacancies(strict=True)).
+        """
+        while True:
+            waited_at = time.perf_counter()
+            page = self.__get(len(self.__stages))
+            self.__sink_wait += time.perf_counter() - waited_at
+            if page is _DONE:
+                break
+            yield from page
+        if self.__errors:
+            raise self.__errors[0]
+
+    def run(self, sink: Callable[[Iterator[Any]], T]) -> T:
+        """
+        Запускает конвейер и передаёт записи приёмнику в текущем потоке.
+        @param sink: Приёмник: функция, принимающая генератор записей (например, загрузка в базу данных).
+        @return: Результат приёмника.
+        @raise BaseException: Ошибка источника, стадии или приёмника.
+        """
+        threads = [threading.Thread(target=self.__run_source, daemon=True)]
+        threads.extend(
+            threading.Thread(target=self.__run_stage, args=(index,), daemon=True)
+            for index in range(len(self.__stages))
+        )
+        for thread in threads:
+            thread.start()
+
+        started_at = time.perf_counter()
+        try:
+            return sink(self.__items())
+        finally:
+            self.__busy["sink"] = time.perf_counter() - started_at - self.__sink_wait
+            # Если приёмник завершился раньше (в том числе с ошибкой), остальные стадии останавливаются
+            self.__stop.set()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,102 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable
+
+CACHE_SIZE = 128  # Максимальное количество результатов запросов в кэше
+MAX_CACHED_ROWS = 10000  # Результаты с большим количеством строк не кэшируются
+
+# Поколение данных базы данных увеличивается после каждого изменения данных (SchemaManager), поэтому результат,
+# сохранённый в кэше при другом поколении, считается устаревшим
+_generations: dict[str, int] = {}
+_generations_lock = threading.Lock()
+
+
+def data_generation(data_base_name: str) -> int:
+    """
+    Получает текущее поколение данных базы данных.
+    @param data_base_name: Имя базы данных.
+    @return: Номер поколения.
+    """
+    return _generations.get(data_base_name, 0)
+
+
+def bump_generation(data_base_name: str) -> None:
+    """
+    Увеличивает поколение данных базы данных: результаты запросов, сохранённые в кэше раньше, становятся устаревшими.
+    Вызывается после фиксации транзакции, изменившей данные.
+    @param data_base_name: Имя базы данных.
+    @return: None
+    """
+    with _generations_lock:
+        _generations[data_base_name] = _generations.get(data_base_name, 0) + 1
+
+
+class QueryCache:
+    """Потокобезопасный кэш результатов запросов ограниченного размера с вытеснением давно не использованных (LRU)."""
+
+    def __init__(self, max_size: int = CACHE_SIZE, max_rows: int = MAX_CACHED_ROWS) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param max_size: Максимальное количество результатов в кэше (0 - кэш отключён).
+        @param max_rows: Максимальное количество строк в кэшируемом результате.
+        """
+        self.__max_size = max_size
+        self.__max_rows = max_rows
+        self.__entries: OrderedDict[Hashable, tuple[int, list]] = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0}
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Статистика обращений к кэшу.
+        @return: Словарь {"hits": найдено в кэше, "misses": не найдено или устарело}.
+        """
+        return dict(self.__stats)
+
+    def get(self, key: Hashable, generation: int) -> list | None:
+        """
+        Получает результат запроса из кэша.
+        @param key: Ключ запроса.
+        @param generation: Текущее поколение данных.
+        @return: Копия сохранённого списка строк или None, если результата нет или он получен при другом поколении
+        данных.
+        """
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] != generation:
+                if entry is not None:
+                    del self.__entries[key]
+                self.__stats["misses"] += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__stats["hits"] += 1
+        # Возвращается копия, чтобы изменение списка вызывающим кодом не меняло результат в кэше
+        return list(entry[1])
+
+    def put(self, key: Hashable, generation: int, rows: list) -> None:
+        """
+        Сохраняет результат запроса в кэше, вытесняя давно не использованные результаты.
+        @param key: Ключ запроса.
+        @param generation: Поколение данных, при котором получен результат.
+        @param rows: Список строк результата.
+        @return: None
+        """
+        if self.__max_size <= 0 or len(rows) > self.__max_rows:
+            return
+        with self.__lock:
+            self.__entries[key] = (generation, list(rows))
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Удаляет все результаты из кэша.
+        @return: None
+        """
+        with self.__lock:
+            self.__entries.clear()
@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, NamedTuple
+
+from src.instrumentation import instrumentation
+
+CACHE_PATH = "data/http_cache.sqlite"  # Файл кэша ответов по умолчанию
+CACHE_TTL = 900.0  # Время в секундах, в течение которого ответ из кэша используется без обращения к серверу
+CACHE_MAX_BYTES = 100 * 1024 * 1024  # Максимальный суммарный размер тел ответов в кэше
+
+
+class CachedResponse(NamedTuple):
+    """Ответ сервера, сохранённый в кэше."""
+
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    stored_at: float
+
+    def header(self, name: str) -> str | None:
+        """
+        Получает заголовок ответа без учёта регистра имени.
+        @param name: Имя заголовка.
+        @return: Значение заголовка или None, если заголовка нет.
+        """
+        name = name.lower()
+        return next((value for key, value in self.headers.items() if key.lower() == name), None)
+
+
+class ResponseCache:
+    """
+    Кэш HTTP-ответов на диске (SQLite) с ограничением времени жизни записей и суммарного размера.
+    При превышении размера вытесняются давно не использованные записи (LRU).
+    """
+
+    def __init__(self, path: str = CACHE_PATH, ttl: float = CACHE_TTL, max_bytes: int = CACHE_MAX_BYTES) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param path: Путь к файлу кэша.
+        @param ttl: Время в секундах, в течение которого запись считается свежей. Устаревшая запись не удаляется,
+        а используется для условного запроса (If-None-Match / If-Modified-Since).
+        @param max_bytes: Максимальный суммарный размер тел ответов в кэше.
+        """
+        self.__ttl = ttl
+        self.__max_bytes = max_bytes
+        self.__lock = threading.Lock()
+        self.__stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+
+        # Соединение используется из потоков загрузки страниц, доступ к нему сериализуется блокировкой
+        self.__db = sqlite3.connect(os.path.abspath(path), check_same_thread=False)
+        self.__db.execute("PRAGMA journal_mode = WAL")
+        self.__db.execute("PRAGMA synchronous = NORMAL")
+        self.__db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                status_code INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                content BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """)
+        self.__db.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at_idx ON responses (accessed_at)")
+        self.__size = self.__db.execute("SELECT COALESCE(SUM(LENGTH(content)), 0) FROM responses").fetchone()[0]
+
+    def __enter__(self) -> "ResponseCache":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @staticmethod
+    def key(url: str, params: dict | None = None) -> str:
+        """
+        Формирует ключ кэша из URL-адреса и параметров запроса (порядок параметров не важен).
+        @param url: URL-адрес запроса.
+        @param params: Параметры запроса.
+        @return: Ключ кэша.
+        """
+        return url + "?" + json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """
+        Счётчики кэша: hits - ответ выдан из кэша без запроса к серверу, revalidated - сервер подтвердил
+        устаревшую запись ответом 304, misses - запись не найдена или устарела, stored - записано ответов,
+        evicted - вытеснено записей.
+        @return: Словарь счётчиков.
+        """
+        with self.__lock:
+            return dict(self.__stats)
+
+    def is_fresh(self, response: CachedResponse) -> bool:
+        """
+        Проверяет, не истекло ли время жизни записи.
+        @param response: Запись кэша.
+        @return: True, если запись можно использовать без обращения к серверу.
+        """
+        return time.time() - response.stored_at < self.__ttl
+
+    def get(self, key: str) -> CachedResponse | None:
+        """
+        Получает запись кэша и отмечает её как использованную.
+        @param key: Ключ кэша.
+        @return: Запись кэша или None, если записи нет.
+        """
+        with self.__lock:
+            row = self.__db.execute(
+                "SELECT status_code, headers, content, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.__db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self.__db.commit()
+        return CachedResponse(row[0], json.loads(row[1]), row[2], row[3])
+
+    def put(self, key: str, status_code: int, headers: dict[str, str], content: bytes) -> None:
+        """
+        Сохраняет ответ в кэше и вытесняет давно не использованные записи, если превышен размер кэша.
+        @param key: Ключ кэша.
+        @param status_code: Статус-код ответа.
+        @param headers: Заголовки ответа.
+        @param content: Тело ответа.
+        @return: None
+        """
+        if len(content) > self.__max_bytes:
+            return
+        now = time.time()
+        with self.__lock:
+            old = self.__db.execute("SELECT LENGTH(content) FROM responses WHERE key = ?", (key,)).fetchone()
+            self.__db.execute(
+                "INSERT OR REPLACE INTO responses (key, status_code, headers, content, stored_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, status_code, json.dumps(headers), content, now, now),
+            )
+            self.__size += len(content) - (old[0] if old else 0)
+            self.__stats["stored"] += 1
+
+            while self.__size > self.__max_bytes:
+                key_to_evict, size = self.__db.execute(
+                    "SELECT key, LENGTH(content) FROM responses ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                self.__db.execute("DELETE FROM responses WHERE key = ?", (key_to_evict,))
+                self.__size -= size
+                self.__stats["evicted"] += 1
+            self.__db.commit()
+
+    def touch(self, key: str) -> None:
+        """
+        Продлевает время жизни записи (после ответа сервера 304 Not Modified).
+        @param key: Ключ кэша.
+        @return: None
+        """
+        with self.__lock:
+            self.__db.execute("UPDATE responses SET stored_at = ? WHERE key = ?", (time.time(), key))
+            self.__db.commit()
+
+    def count(self, counter: str) -> None:
+        """
+        Увеличивает счётчик кэша.
+        @param counter: Имя счётчика (см. stats).
+        @return: None
+        """
+        with self.__lock:
+            self.__stats[counter] += 1
+        instrumentation.count("http.cache", result=counter)
+
+    def clear(self) -> None:
+        """
+        Удаляет все записи кэша.
+        @return: None
+        """
+        with self.__lock:
+            self.__db.execute("DELETE FROM responses")
+            self.__db.commit()
+            self.__size = 0
+
+    def close(self) -> None:
+        """
+        Закрывает файл кэша.
+        @return: None
+        """
+        with self.__lock:
+            self.__db.close()
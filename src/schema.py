@@ -0,0 +1,253 @@
+import hashlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from src.search import SEARCH_VECTOR_EXPRESSION
+
+
+@dataclass(frozen=True)
+class Column:
+    """Описание столбца таблицы."""
+
+    name: str
+    type: str
+    constraints: str = ""
+
+    def definition(self) -> str:
+        """
+        Формирует определение столбца для CREATE TABLE.
+        @return: Строка определения столбца.
+        """
+        return " ".join(part for part in (self.name, self.type, self.constraints) if part)
+
+
+@dataclass(frozen=True)
+class Index:
+    """Описание индекса таблицы."""
+
+    name: str
+    expression: str
+    method: str = "btree"
+    where: str | None = None
+
+
+@dataclass(frozen=True)
+class Table:
+    """Описание таблицы: столбцы, первичный ключ, ограничения, индексы и столбец секционирования."""
+
+    name: str
+    columns: tuple[Column, ...]
+    primary_key: tuple[str, ...]
+    constraints: tuple[str, ...] = ()
+    indexes: tuple[Index, ...] = ()
+    partition_column: str | None = None
+
+    @property
+    def column_names(self) -> tuple[str, ...]:
+        """
+        Имена столбцов таблицы.
+        @return: Кортеж имён столбцов.
+        """
+        return tuple(column.name for column in self.columns)
+
+    def create_query(self, partitioned: bool = False) -> str:
+        """
+        Формирует запрос CREATE TABLE IF NOT EXISTS.
+        Секционированная таблица включает столбец секционирования в первичный ключ, как требует PostgreSQL.
+        @param partitioned: Создать таблицу, секционированную по диапазонам partition_column.
+        @return: SQL-запрос.
+        """
+        partition_column = self.partition_column if partitioned else None
+        primary_key = self.primary_key
+        if partition_column is not None and partition_column not in primary_key:
+            primary_key += (partition_column,)
+
+        definitions = [column.definition() for column in self.columns]
+        definitions.append("PRIMARY KEY (%s)" % ", ".join(primary_key))
+        definitions.extend(self.constraints)
+        query = "CREATE TABLE IF NOT EXISTS %s (\n    %s\n)" % (self.name, ",\n    ".join(definitions))
+        if partition_column is not None:
+            query += " PARTITION BY RANGE (%s)" % partition_column
+        return query
+
+    def index_queries(self) -> list[str]:
+        """
+        Формирует запросы CREATE INDEX IF NOT EXISTS для индексов таблицы.
+        @return: Список SQL-запросов.
+        """
+        queries = []
+        for index in self.indexes:
+            query = "CREATE INDEX IF NOT EXISTS %s ON %s USING %s (%s)" % (
+                index.name,
+                self.name,
+                index.method,
+                index.expression,
+            )
+            if index.where:
+                query += " WHERE %s" % index.where
+            queries.append(query)
+        return queries
+
+
+@dataclass(frozen=True)
+class Partition:
+    """Описание секции таблицы по диапазону [start, end)."""
+
+    table: str
+    start: date
+    end: date
+
+    @property
+    def name(self) -> str:
+        """
+        Имя секции (таблица и месяц начала диапазона).
+        @return: Имя секции.
+        """
+        return "%s_%s" % (self.table, self.start.strftime("%Y_%m"))
+
+    def create_query(self) -> str:
+        """
+        Формирует запрос создания секции.
+        @return: SQL-запрос.
+        """
+        return "CREATE TABLE IF NOT EXISTS %s PARTITION OF %s FOR VALUES FROM ('%s') TO ('%s')" % (
+            self.name,
+            self.table,
+            self.start.isoformat(),
+            self.end.isoformat(),
+        )
+
+
+def monthly_partitions(table: str, first_month: date, months: int) -> list[Partition]:
+    """
+    Формирует описания помесячных секций.
+    @param table: Имя секционированной таблицы.
+    @param first_month: Любая дата первого месяца.
+    @param months: Количество месяцев.
+    @return: Список описаний секций.
+    """
+    partitions = []
+    start = first_month.replace(day=1)
+    for _ in range(months):
+        end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        partitions.append(Partition(table, start, end))
+        start = end
+    return partitions
+
+
+COMPANIES = Table(
+    name="companies",
+    columns=(
+        Column("company_id", "BIGINT"),
+        Column("company_name", "VARCHAR(255)", "NOT NULL"),
+        Column("company_url", "TEXT", "NOT NULL"),
+        Column("company_alternate_url", "TEXT"),
+        Column("trusted", "BOOL"),
+    ),
+    primary_key=("company_id",),
+    indexes=(
+        # Постраничный вывод компаний по названию
+        Index("companies_name_idx", "company_name, company_id"),
+    ),
+)
+
+VACANCIES = Table(
+    name="vacancies",
+    columns=(
+        Column("vacancy_id", "BIGINT"),
+        Column("company_id", "BIGINT", "NOT NULL REFERENCES companies(company_id)"),
+        Column("vacancy_name", "VARCHAR(255)", "NOT NULL"),
+        Column("salary", "INT"),  # NULL, если зарплата не указана
+        Column("salary_currency", "VARCHAR(3)"),
+        Column("published_at", "TIMESTAMPTZ", "NOT NULL"),
+        Column("vacancy_url", "TEXT"),
+        Column("requirement", "TEXT"),
+        Column("responsibility", "TEXT"),
+        Column("content_hash", "CHAR(32)", "NOT NULL"),  # хэш содержимого вакансии для пропуска неизменённых строк
+        Column("closed", "BOOL", "NOT NULL DEFAULT FALSE"),  # вакансия пропала из выдачи при последней загрузке
+        # Ключ запроса к API, при загрузке по которому вакансия встретилась последней (см. IngestState.request_key):
+        # пропавшими считаются только вакансии того же запроса
+        Column("ingest_key", "TEXT"),
+        Column("search_vector", "TSVECTOR", "GENERATED ALWAYS AS (%s) STORED" % SEARCH_VECTOR_EXPRESSION),
+    ),
+    primary_key=("vacancy_id",),
+    indexes=(
+        # Соединение с companies и отчёт по количеству вакансий у компаний
+        Index("vacancies_company_id_idx", "company_id"),
+        # Отбор вакансий по валюте и зарплате (средняя зарплата, вакансии с зарплатой выше средней) и постраничный
+        # вывод вакансий с зарплатой выше средней
+        Index("vacancies_salary_idx", "salary_currency, salary, vacancy_id", where="salary IS NOT NULL"),
+        # Отбор по дате публикации
+        Index("vacancies_published_at_idx", "published_at"),
+        # Сортировка списка вакансий по названию
+        Index("vacancies_name_idx", "vacancy_name, vacancy_id"),
+    ),
+    partition_column="published_at",
+)
+
+# Сводная статистика зарплат открытых вакансий по валютам (пересчитывается после загрузки, см. stats.py)
+SALARY_STATS = Table(
+    name="salary_stats",
+    columns=(
+        Column("salary_currency", "VARCHAR(3)"),
+        Column("vacancy_count", "INT", "NOT NULL"),
+        Column("avg_salary", "NUMERIC(12, 2)", "NOT NULL"),
+        Column("min_salary", "INT", "NOT NULL"),
+        Column("p25_salary", "NUMERIC(12, 2)", "NOT NULL"),
+        Column("median_salary", "NUMERIC(12, 2)", "NOT NULL"),
+        Column("p75_salary", "NUMERIC(12, 2)", "NOT NULL"),
+        Column("p90_salary", "NUMERIC(12, 2)", "NOT NULL"),
+        Column("max_salary", "INT", "NOT NULL"),
+    ),
+    primary_key=("salary_currency",),
+)
+
+# Количество открытых вакансий у компаний (пересчитывается после загрузки, см. stats.py)
+COMPANY_STATS = Table(
+    name="company_stats",
+    columns=(
+        Column("company_id", "BIGINT", "REFERENCES companies(company_id) ON DELETE CASCADE"),
+        Column("vacancy_count", "INT", "NOT NULL"),
+        Column("salary_vacancy_count", "INT", "NOT NULL"),  # вакансии с указанной зарплатой
+    ),
+    primary_key=("company_id",),
+)
+
+# Время и параметры загрузок вакансий из API (см. ingest_state.py)
+INGEST_STATE = Table(
+    name="ingest_state",
+    columns=(
+        Column("ingested_at", "TIMESTAMPTZ", "NOT NULL DEFAULT now()"),
+        Column("keywords", "TEXT", "NOT NULL"),
+        Column("pages", "INT", "NOT NULL"),
+        Column("per_page", "INT", "NOT NULL"),
+        Column("crawl", "BOOL", "NOT NULL"),
+        Column("vacancy_count", "INT"),
+    ),
+    primary_key=("ingested_at",),
+)
+
+# Таблицы в порядке создания (таблица, на которую ссылается внешний ключ, создаётся раньше)
+SCHEMA = (COMPANIES, VACANCIES, SALARY_STATS, COMPANY_STATS, INGEST_STATE)
+
+
+def schema_version(tables: tuple[Table, ...]) -> str:
+    """
+    Вычисляет версию схемы - хэш запросов создания таблиц и индексов. Версия меняется при любом изменении описания
+    схемы (столбцы, типы, ограничения, индексы).
+    @param tables: Описания таблиц.
+    @return: MD5-хэш в шестнадцатеричном виде.
+    """
+    queries = [query for table in tables for query in (table.create_query(), *table.index_queries())]
+    return hashlib.md5("\n".join(queries).encode("utf-8")).hexdigest()
+
+
+SCHEMA_VERSION = schema_version(SCHEMA)
+
+# Версия схемы, по которой созданы таблицы базы данных: если она не совпадает с SCHEMA_VERSION, таблицы создаются
+# заново (см. SchemaManager.create_schema)
+SCHEMA_VERSION_TABLE = Table(
+    name="schema_version",
+    columns=(Column("version", "CHAR(32)"),),
+    primary_key=("version",),
+)
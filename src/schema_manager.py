@@ -1,6 +1,141 @@
+import hashlib
+import time
+from datetime import date
+from typing import Any, Iterable
+
 import psycopg2
 from psycopg2 import sql
 
+from src.bulk_loader import BATCH_SIZE, BulkLoader, batched, report
+from src.dedup import EmployerIndex
+from src.ingest_state import IngestState, load_ingest_state, save_ingest_state
+from src.instrumentation import instrumentation
+from src.models import Company, Vacancy
+from src.query_cache import bump_generation
+from src.schema import SCHEMA, SCHEMA_VERSION, SCHEMA_VERSION_TABLE, VACANCIES, monthly_partitions
+from src.search import (
+    ADD_SEARCH_VECTOR_QUERY,
+    CREATE_SEARCH_VECTOR_INDEX_QUERY,
+    CREATE_TRIGRAM_EXTENSION_QUERY,
+    CREATE_TRIGRAM_INDEX_QUERY,
+)
+from src.stats import refresh_stats
+
+COMPANIES_COLUMNS = ("company_id", "company_name", "company_url", "company_alternate_url", "trusted")
+VACANCIES_COLUMNS = (
+    "vacancy_id",
+    "company_id",
+    "vacancy_name",
+    "salary",
+    "salary_currency",
+    "published_at",
+    "vacancy_url",
+    "requirement",
+    "responsibility",
+    "content_hash",
+)
+
+PARTITION_MONTHS = 3  # Количество помесячных секций vacancies (текущий месяц и предыдущие)
+
+# Запросы инкрементальной загрузки: данные из временных таблиц переносятся в основные таблицы, при этом
+# перезаписываются только изменившиеся строки
+UPSERT_COMPANIES_QUERY = """
+    INSERT INTO companies (company_id, company_name, company_url, company_alternate_url, trusted)
+    SELECT DISTINCT ON (company_id) company_id, company_name, company_url, company_alternate_url, trusted
+    FROM staging_companies
+    ORDER BY company_id
+    ON CONFLICT (company_id) DO UPDATE SET
+        company_name = EXCLUDED.company_name,
+        company_url = EXCLUDED.company_url,
+        company_alternate_url = EXCLUDED.company_alternate_url,
+        trusted = EXCLUDED.trusted
+    WHERE (companies.company_name, companies.company_url, companies.company_alternate_url, companies.trusted)
+        IS DISTINCT FROM
+        (EXCLUDED.company_name, EXCLUDED.company_url, EXCLUDED.company_alternate_url, EXCLUDED.trusted)
+    """
+UPSERT_VACANCIES_QUERY = """
+    INSERT INTO vacancies (vacancy_id, company_id, vacancy_name, salary, salary_currency, published_at, vacancy_url,
+        requirement, responsibility, content_hash, ingest_key)
+    SELECT DISTINCT ON (vacancy_id) vacancy_id, company_id, vacancy_name, salary, salary_currency, published_at,
+        vacancy_url, requirement, responsibility, content_hash, ingest_key
+    FROM staging_vacancies
+    ORDER BY vacancy_id
+    ON CONFLICT ({conflict_target}) DO UPDATE SET
+        company_id = EXCLUDED.company_id,
+        vacancy_name = EXCLUDED.vacancy_name,
+        salary = EXCLUDED.salary,
+        salary_currency = EXCLUDED.salary_currency,
+        published_at = EXCLUDED.published_at,
+        vacancy_url = EXCLUDED.vacancy_url,
+        requirement = EXCLUDED.requirement,
+        responsibility = EXCLUDED.responsibility,
+        content_hash = EXCLUDED.content_hash,
+        closed = FALSE,
+        ingest_key = COALESCE(EXCLUDED.ingest_key, vacancies.ingest_key)
+    WHERE vacancies.content_hash <> EXCLUDED.content_hash OR vacancies.closed
+    {returning}
+    """
+RETURNING_KEYS = "RETURNING salary_currency, company_id"
+# Валюты и компании вакансий до изменения (для пересчёта статистики по старым значениям)
+CHANGED_VACANCIES_KEYS_QUERY = """
+    SELECT vacancies.salary_currency, vacancies.company_id
+    FROM vacancies JOIN staging_vacancies ON staging_vacancies.vacancy_id = vacancies.vacancy_id
+    WHERE vacancies.content_hash <> staging_vacancies.content_hash OR vacancies.closed
+    """
+# В секционированной таблице первичный ключ включает published_at, поэтому перепубликованная вакансия сначала
+# удаляется из старой секции
+DELETE_MOVED_VACANCIES_QUERY = """
+    DELETE FROM vacancies USING staging_vacancies
+    WHERE vacancies.vacancy_id = staging_vacancies.vacancy_id
+      AND vacancies.published_at <> staging_vacancies.published_at
+    """
+# Неизменившиеся вакансии не перезаписываются, но ключ запроса, по которому они встретились, обновляется
+UPDATE_INGEST_KEY_QUERY = """
+    UPDATE vacancies SET ingest_key = staging_vacancies.ingest_key
+    FROM staging_vacancies
+    WHERE vacancies.vacancy_id = staging_vacancies.vacancy_id
+      AND staging_vacancies.ingest_key IS NOT NULL
+      AND vacancies.ingest_key IS DISTINCT FROM staging_vacancies.ingest_key
+    """
+# Закрытыми помечаются только вакансии того же запроса к API: вакансии других ключевых слов или параметров
+# в загруженных данных и не должны встречаться
+CLOSE_MISSING_VACANCIES_QUERY = """
+    UPDATE vacancies SET closed = TRUE
+    WHERE NOT closed
+      AND ingest_key = %s
+      AND NOT EXISTS (SELECT 1 FROM staging_vacancies WHERE staging_vacancies.vacancy_id = vacancies.vacancy_id)
+    RETURNING salary_currency, company_id
+    """
+
+
+def _content_hash(row: tuple) -> str:
+    """
+    Вычисляет хэш содержимого строки таблицы.
+    @param row: Кортеж значений.
+    @return: MD5-хэш в шестнадцатеричном виде.
+    """
+    return hashlib.md5("\x1f".join(map(str, row)).encode("utf-8")).hexdigest()
+
+
+def _vacancy_row(vacancy: Vacancy) -> tuple:
+    """
+    Формирует строку таблицы vacancies из записи о вакансии.
+    @param vacancy: Запись о вакансии.
+    @return: Кортеж значений в порядке VACANCIES_COLUMNS (последнее значение - хэш содержимого вакансии).
+    """
+    row = vacancy.row()
+    return row + (_content_hash(row),)
+
+
+def _as_records(batch: Iterable[Vacancy | dict]) -> list[Vacancy]:
+    """
+    Преобразует данные о вакансиях из ответа API в записи (записи передаются как есть).
+    @param batch: Вакансии (записи или словари из ответа API).
+    @return: Список записей о вакансиях.
+    """
+    companies: dict[str, Company] = {}
+    return [vacancy if isinstance(vacancy, Vacancy) else Vacancy.from_api(vacancy, companies) for vacancy in batch]
+
 
 class SchemaManager:
     """Класс для инициализации базы данных и таблиц PostgreSQL."""
@@ -11,9 +146,14 @@ class SchemaManager:
         """
         self.__params = connection_parameters
 
-    def create_database(self, data_base_name: str) -> None:
+    @instrumentation.timed("schema.create_database")
+    def create_database(self, data_base_name: str, recreate: bool = True) -> None:
         """
         Создаёт базу данных для сохранения информации о компаниях и вакансиях.
+        @param data_base_name: Имя базы данных.
+        @param recreate: Удалить существующую базу данных и создать её заново. Если False, база данных создаётся,
+        только если её ещё нет.
+        @return: None
         """
         conn, cur = None, None
         try:
@@ -22,6 +162,12 @@ class SchemaManager:
             conn.autocommit = True
             cur = conn.cursor()
 
+            if not recreate:
+                cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", [data_base_name])
+                if cur.fetchone() is None:
+                    cur.execute("CREATE DATABASE %s" % data_base_name)
+                return
+
             # Перед удалением или изменением базы данных нужно завершить все активные соединения к ней,
             # в т.ч. pgAdmin
             """Что здесь происходит:
@@ -29,20 +175,19 @@ class SchemaManager:
             pg_terminate_backend(pid) завершает соединение с указанным PID.
             Фильтр pid <> pg_backend_pid() исключает текущее соединение, чтобы не отключить самих себя."""
             cur.execute(
-                sql.SQL(
-                    """
+                sql.SQL("""
                     SELECT pg_terminate_backend(pg_stat_activity.pid)
                     FROM pg_stat_activity
                     WHERE pg_stat_activity.datname = %s
                       AND pid <> pg_backend_pid();
-                    """
-                ),
+                    """),
                 [data_base_name],
             )
 
             # Удаление и создание базы данных
             cur.execute("DROP DATABASE IF EXISTS %s" % data_base_name)
             cur.execute("CREATE DATABASE %s" % data_base_name)
+            bump_generation(data_base_name)
 
         except psycopg2.Error as e:
             print("Ошибка при работе с базой данных!")
@@ -54,92 +199,383 @@ class SchemaManager:
             if "conn" in locals() and conn:
                 conn.close()
 
-    def create_table(self, data_base_name: str, table_name: str, query: str) -> None:
+    @instrumentation.timed("schema.create_table")
+    def create_table(self, data_base_name: str, table_name: str, query: str, recreate: bool = True) -> None:
         """
         Создаёт таблицу для сохранения информации о компаниях и вакансиях.
+        @param data_base_name: Имя базы данных.
+        @param table_name: Имя таблицы.
+        @param query: Запрос на создание таблицы (имя таблицы подставляется в %s).
+        @param recreate: Удалить существующую таблицу и создать её заново. Если False, таблица создаётся, только
+        если её ещё нет.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+
+        with conn.cursor() as cur:
+            cur.execute("SELECT to_regclass(%s)", [table_name])
+            exists = cur.fetchone()[0] is not None
+            if recreate or not exists:
+                cur.execute("DROP TABLE IF EXISTS %s" % table_name)
+                cur.execute(query % table_name)
+
+        conn.commit()
+        conn.close()
+        bump_generation(data_base_name)
+
+    @instrumentation.timed("schema.create_schema")
+    def create_schema(
+        self,
+        data_base_name: str,
+        recreate: bool = True,
+        partitioned: bool = False,
+        partition_months: int = PARTITION_MONTHS,
+    ) -> None:
+        """
+        Создаёт таблицы, индексы и индексы поиска по описанию схемы из модуля schema.py и пересчитывает сводную
+        статистику по уже имеющимся данным.
+        @param data_base_name: Имя базы данных.
+        @param recreate: Удалить существующие таблицы и создать их заново. Если False, создаются только недостающие
+        таблицы и индексы; если версия схемы в базе данных (таблица schema_version) отличается от SCHEMA_VERSION,
+        таблицы всё равно создаются заново - столбцы, типы и индексы старой схемы не переносятся.
+        @param partitioned: Секционировать таблицу vacancies по месяцам published_at. Создаются секции за
+        partition_months последних месяцев, на следующий месяц и секция по умолчанию для остальных дат.
+        @param partition_months: Количество помесячных секций.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+
+        with conn.cursor() as cur:
+            if not recreate and not self.__schema_is_current(cur):
+                print("Схема базы данных устарела, таблицы будут созданы заново")
+                recreate = True
+            if recreate:
+                tables = (SCHEMA_VERSION_TABLE,) + tuple(reversed(SCHEMA))
+                cur.execute("DROP TABLE IF EXISTS %s CASCADE" % ", ".join(table.name for table in tables))
+
+            for table in SCHEMA:
+                cur.execute(table.create_query(partitioned=partitioned))
+            cur.execute(SCHEMA_VERSION_TABLE.create_query())
+            cur.execute("DELETE FROM %s" % SCHEMA_VERSION_TABLE.name)
+            cur.execute("INSERT INTO %s (version) VALUES (%%s)" % SCHEMA_VERSION_TABLE.name, [SCHEMA_VERSION])
+
+            if partitioned and self.__is_partitioned(cur):
+                # Секции создаются за последние partition_months месяцев и на месяц вперёд
+                today = date.today()
+                month_index = today.year * 12 + today.month - partition_months
+                first_month = date(month_index // 12, month_index % 12 + 1, 1)
+                for partition in monthly_partitions(VACANCIES.name, first_month, partition_months + 1):
+                    cur.execute(partition.create_query())
+                cur.execute("CREATE TABLE IF NOT EXISTS vacancies_default PARTITION OF vacancies DEFAULT")
+
+            for table in SCHEMA:
+                for query in table.index_queries():
+                    cur.execute(query)
+
+            refresh_stats(cur)
+
+        conn.commit()
+        conn.close()
+        bump_generation(data_base_name)
+
+        self.create_search_index(data_base_name)
+
+    @staticmethod
+    def __schema_is_current(cur: Any) -> bool:
+        """
+        Проверяет, что таблицы в базе данных созданы по текущей версии схемы.
+        @param cur: Курсор psycopg2.
+        @return: True, если таблицы vacancies ещё нет (переносить нечего) или версия схемы совпадает
+        с SCHEMA_VERSION.
+        """
+        cur.execute("SELECT to_regclass(%s), to_regclass(%s)", [VACANCIES.name, SCHEMA_VERSION_TABLE.name])
+        vacancies, version_table = cur.fetchone()
+        if vacancies is None:
+            return True
+        if version_table is None:
+            return False
+        cur.execute("SELECT version FROM %s" % SCHEMA_VERSION_TABLE.name)
+        return [row[0] for row in cur.fetchall()] == [SCHEMA_VERSION]
+
+    @staticmethod
+    def __is_partitioned(cur: Any) -> bool:
+        """
+        Проверяет, секционирована ли таблица vacancies.
+        @param cur: Курсор psycopg2.
+        @return: True, если таблица секционирована.
+        """
+        cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'vacancies'::regclass")
+        return bool(cur.fetchone()[0])
+
+    @instrumentation.timed("schema.create_search_index")
+    def create_search_index(self, data_base_name: str) -> None:
+        """
+        Добавляет в таблицу vacancies вычисляемый столбец search_vector для полнотекстового поиска (русская
+        и английская конфигурации) с GIN-индексом и, если доступно расширение pg_trgm, триграммный индекс по названию
+        вакансии для поиска подстроки. Повторный вызов ничего не меняет.
+        @param data_base_name: Имя базы данных.
+        @return: None
         """
         conn = psycopg2.connect(dbname=data_base_name, **self.__params)
 
         with conn.cursor() as cur:
-            cur.execute("DROP TABLE IF EXISTS %s" % table_name)
-            cur.execute(query % table_name)
+            cur.execute(ADD_SEARCH_VECTOR_QUERY)
+            cur.execute(CREATE_SEARCH_VECTOR_INDEX_QUERY)
+
+            # Расширение pg_trgm может быть не установлено на сервере или недоступно пользователю
+            cur.execute("SAVEPOINT trigram_index")
+            try:
+                cur.execute(CREATE_TRIGRAM_EXTENSION_QUERY)
+                cur.execute(CREATE_TRIGRAM_INDEX_QUERY)
+            except psycopg2.Error as e:
+                print("Триграммный индекс не создан, поиск подстроки будет выполняться без индекса")
+                print(e)
+                cur.execute("ROLLBACK TO SAVEPOINT trigram_index")
 
         conn.commit()
         conn.close()
 
-    def insert_data(self, data_base_name: str, vacancies_data: list[dict]) -> None:
+    def explain_queries(self, data_base_name: str, analyze: bool = False) -> dict[str, str]:
+        """
+        Получает планы выполнения запросов DBManager (EXPLAIN). Используется для проверки того, что запросы
+        пользуются индексами схемы.
+        @param data_base_name: Имя базы данных.
+        @param analyze: Выполнить запросы и добавить в планы фактическое время (EXPLAIN ANALYZE).
+        @return: Словарь {имя метода DBManager: текст плана}.
+        """
+        from src.db_manager import REPORT_QUERIES
+
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        plans = {}
+
+        with conn.cursor() as cur:
+            for name, (query, params) in REPORT_QUERIES.items():
+                cur.execute(("EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN ") + query, params)
+                plans[name] = "\n".join(row[0] for row in cur.fetchall())
+
+        conn.rollback()
+        conn.close()
+
+        return plans
+
+    @instrumentation.timed("schema.insert_data")
+    def insert_data(
+        self,
+        data_base_name: str,
+        vacancies_data: Iterable[Vacancy | dict],
+        batch_size: int = BATCH_SIZE,
+        use_copy: bool = True,
+        employers_in_memory: int | None = None,
+        incremental: bool = False,
+        scope: str | None = None,
+    ) -> None:
         """
         Сохраняет данные о компаниях и вакансиях в указанную таблицу.
+        Данные загружаются пакетами через COPY FROM STDIN (или INSERT ... VALUES, если COPY недоступен).
+        В инкрементальном режиме таблицы не очищаются: данные загружаются во временные таблицы, после чего
+        в основных таблицах добавляются новые и обновляются изменившиеся строки (по хэшу содержимого), а вакансии
+        того же запроса к API (scope), которых нет в загруженных данных, помечаются закрытыми. Сводная статистика
+        (salary_stats, company_stats) пересчитывается только для валют и компаний изменившихся вакансий. Всё
+        выполняется в одной транзакции, поэтому читатели видят либо старые, либо новые данные.
+        @param data_base_name: Имя базы данных.
+        @param vacancies_data: Вакансии (записи Vacancy или словари из ответа API, которые преобразуются в записи;
+        список или генератор, например JsonWorker.iter_file: вакансии читаются пакетами по batch_size, поэтому память
+        не зависит от объёма данных).
+        @param batch_size: Количество вакансий в одном пакете.
+        @param use_copy: Использовать COPY FROM STDIN вместо INSERT ... VALUES.
+        @param employers_in_memory: Максимальное количество работодателей в памяти при исключении повторов
+        (None - без ограничения, иначе индекс работодателей хранится на диске с LRU-кэшем в памяти).
+        @param incremental: Обновить существующие данные вместо полной перезаписи таблиц.
+        @param scope: Ключ запроса к API, которым получены данные (IngestState.request_key), - сохраняется
+        у вакансий. Если None, отсутствующие в данных вакансии не закрываются. Генератор vacancies_data должен
+        выбрасывать исключение при ошибке загрузки страницы: иначе вакансии пропущенных страниц будут закрыты.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        started_at = time.perf_counter()
+        counts = {"companies": 0, "vacancies": 0}
+
+        companies_table, vacancies_table = "companies", "vacancies"
+
+        with conn.cursor() as cur, EmployerIndex(max_in_memory=employers_in_memory) as employers:
+            if incremental:
+                companies_table, vacancies_table = "staging_companies", "staging_vacancies"
+                cur.execute("CREATE TEMP TABLE staging_companies (LIKE companies) ON COMMIT DROP")
+                cur.execute("CREATE TEMP TABLE staging_vacancies (LIKE vacancies INCLUDING DEFAULTS) ON COMMIT DROP")
+            else:
+                cur.execute("TRUNCATE companies RESTART IDENTITY CASCADE")
+            loader = BulkLoader(cur, batch_size=batch_size, use_copy=use_copy)
+            # Ключ запроса к API дописывается в конец строки вакансии
+            scope_values: tuple = () if scope is None else (scope,)
+            columns = VACANCIES_COLUMNS + ("ingest_key",) * len(scope_values)
+
+            # Индекс работодателей по id исключает повторное добавление компании в таблицу
+            for batch in batched(vacancies_data, batch_size):
+                records = _as_records(batch)
+                companies = [vacancy.company.row() for vacancy in records if employers.add(vacancy.company)]
+
+                # Компании загружаются раньше вакансий пакета, которые на них ссылаются
+                counts["companies"] += loader.load(companies_table, COMPANIES_COLUMNS, companies)
+                rows = (_vacancy_row(vacancy) + scope_values for vacancy in records)
+                counts["vacancies"] += loader.load(vacancies_table, columns, rows)
+
+            if incremental:
+                merged = self.__merge_staging(cur, scope=scope)
+            else:
+                refresh_stats(cur)
+
+        with instrumentation.span("db.commit"):
+            conn.commit()
+        conn.close()
+        bump_generation(data_base_name)
+        report(counts, started_at)
+        if incremental:
+            print("Добавлено или изменено компаний: %d, вакансий: %d, закрыто вакансий: %d" % merged)
+
+    @instrumentation.timed("db.merge_staging")
+    def __merge_staging(self, cur: Any, incremental: bool = True, scope: str | None = None) -> tuple[int, int, int]:
+        """
+        Переносит данные из таблиц staging_companies и staging_vacancies в основные таблицы: добавляет новые
+        и обновляет изменившиеся (по хэшу содержимого) строки, помечает закрытыми вакансии запроса scope, которых нет
+        в загруженных данных, и пересчитывает сводную статистику для валют и компаний изменившихся вакансий.
+        @param cur: Курсор psycopg2.
+        @param incremental: False - основные таблицы пусты (полная загрузка): затронутые ключи не собираются,
+        а статистика пересчитывается полностью.
+        @param scope: Ключ запроса к API загруженных данных. Если None или загруженных вакансий нет, вакансии
+        не закрываются.
+        @return: Количество добавленных или изменённых компаний и вакансий и закрытых вакансий.
+        """
+        cur.execute(UPSERT_COMPANIES_QUERY)
+        updated_companies = cur.rowcount
+        affected = []
+        if incremental:
+            cur.execute(CHANGED_VACANCIES_KEYS_QUERY)
+            affected = cur.fetchall()
+        if self.__is_partitioned(cur):
+            cur.execute(DELETE_MOVED_VACANCIES_QUERY)
+            conflict_target = "vacancy_id, published_at"
+        else:
+            conflict_target = "vacancy_id"
+        cur.execute(
+            UPSERT_VACANCIES_QUERY.format(
+                conflict_target=conflict_target, returning=RETURNING_KEYS if incremental else ""
+            )
+        )
+        updated_vacancies = cur.rowcount
+        if not incremental:
+            refresh_stats(cur)
+            return updated_companies, updated_vacancies, 0
+
+        affected += cur.fetchall()
+        cur.execute(UPDATE_INGEST_KEY_QUERY)
+        closed_vacancies = 0
+        if scope is not None:
+            # Пустые данные - скорее ошибка загрузки, чем закрытие всех вакансий
+            cur.execute("SELECT EXISTS (SELECT 1 FROM staging_vacancies)")
+            if cur.fetchone()[0]:
+                cur.execute(CLOSE_MISSING_VACANCIES_QUERY, [scope])
+                closed_vacancies = cur.rowcount
+                affected += cur.fetchall()
+            else:
+                print("Вакансий не загружено, отсутствующие вакансии не закрываются")
+        refresh_stats(
+            cur,
+            currencies={currency for currency, _ in affected if currency is not None},
+            company_ids={company_id for _, company_id in affected},
+        )
+        return updated_companies, updated_vacancies, closed_vacancies
+
+    @instrumentation.timed("schema.create_staging")
+    def create_staging(self, data_base_name: str) -> None:
+        """
+        Создаёт нежурналируемые (UNLOGGED) таблицы staging_companies и staging_vacancies, в которые можно загружать
+        данные одновременно по нескольким соединениям (см. backfill.py). Данные переносятся в основные таблицы
+        методом merge_staging.
+        @param data_base_name: Имя базы данных.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        with conn.cursor() as cur:
+            cur.execute("DROP TABLE IF EXISTS staging_companies, staging_vacancies")
+            cur.execute("CREATE UNLOGGED TABLE staging_companies (LIKE companies)")
+            cur.execute("CREATE UNLOGGED TABLE staging_vacancies (LIKE vacancies INCLUDING DEFAULTS)")
+        conn.commit()
+        conn.close()
+
+    @instrumentation.timed("schema.merge_staging")
+    def merge_staging(
+        self, data_base_name: str, incremental: bool = True, scope: str | None = None
+    ) -> tuple[int, int, int]:
+        """
+        Переносит данные из таблиц, созданных методом create_staging, в основные таблицы и удаляет их. Всё выполняется
+        в одной транзакции, поэтому читатели видят либо старые, либо новые данные.
+        @param data_base_name: Имя базы данных.
+        @param incremental: Обновить существующие данные (иначе основные таблицы очищаются).
+        @param scope: Ключ запроса к API загруженных данных: отсутствующие в них вакансии этого запроса помечаются
+        закрытыми. Если None, вакансии не закрываются.
+        @return: Количество добавленных или изменённых компаний и вакансий и закрытых вакансий.
         """
         conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        with conn.cursor() as cur:
+            # Статистика нежурналируемых таблиц нужна планировщику для выбора соединений
+            cur.execute("ANALYZE staging_companies, staging_vacancies")
+            if not incremental:
+                cur.execute("TRUNCATE companies RESTART IDENTITY CASCADE")
+            merged = self.__merge_staging(cur, incremental=incremental, scope=scope)
+            cur.execute("DROP TABLE staging_companies, staging_vacancies")
+        with instrumentation.span("db.commit"):
+            conn.commit()
+        conn.close()
+        bump_generation(data_base_name)
+        return merged
 
+    @instrumentation.timed("schema.drop_staging")
+    def drop_staging(self, data_base_name: str) -> None:
+        """
+        Удаляет таблицы, созданные методом create_staging (если загрузка прервана).
+        @param data_base_name: Имя базы данных.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
         with conn.cursor() as cur:
-            cur.execute("TRUNCATE companies RESTART IDENTITY CASCADE")
-
-            # Сохраним кортеж (company_id, company_name) для исключения повторного добавления компании в таблицу
-            already_inserted = []
-            for vacancy in vacancies_data:
-
-                # Заполняем таблицу companies
-                if (vacancy["employer"]["id"], vacancy["employer"]["name"]) not in already_inserted:
-                    cur.execute(
-                        """
-                        INSERT INTO companies (company_id, company_name, company_url, company_alternate_url, trusted)
-                        VALUES (%s, %s, %s, %s, %s)
-                        """,
-                        (
-                            vacancy["employer"]["id"],
-                            vacancy["employer"]["name"],
-                            vacancy["employer"]["url"],
-                            vacancy["employer"]["alternate_url"],
-                            vacancy["employer"]["trusted"],
-                        ),
-                    )
-                    already_inserted.append((vacancy["employer"]["id"], vacancy["employer"]["name"]))
-
-                # Заполняем таблицу vacancies
-                # --Сеанс экзорцизма с ключами salary, потому что кто-то там хочет либо работать без денег,
-                # --либо хочет столько денег, сколько Вселенная дать не в состоянии.
-                if vacancy["salary"] is None:
-                    salary = 0
-                    salary_currency = ""
-                else:
-                    salary_from_ = 0 if vacancy["salary"]["from"] is None else vacancy["salary"]["from"]
-                    salary_to_ = 0 if vacancy["salary"]["to"] is None else vacancy["salary"]["to"]
-                    salary = max(salary_from_, salary_to_)
-                    salary_currency = vacancy["salary"]["currency"]
-
-                # --Сеанс экзорцизма с ключом snippet, потому что кто-то в команде разработчиков hh решил,
-                # --что компетенции и ответственность непременно нужно объединить в какой-то фрагмент...
-                if vacancy["snippet"] is None:
-                    requirement = None
-                    responsibility = None
-                else:
-                    requirement = vacancy["snippet"]["requirement"]
-                    responsibility = vacancy["snippet"]["responsibility"]
-
-                cur.execute(
-                    """
-                    INSERT INTO vacancies (vacancy_id, company_id, vacancy_name, salary,
-                    salary_currency, published_at, vacancy_url, requirement, responsibility)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    """,
-                    (
-                        vacancy["id"],
-                        vacancy["employer"]["id"],
-                        vacancy["name"],
-                        salary,
-                        salary_currency,
-                        vacancy["published_at"],
-                        vacancy["url"],
-                        requirement,
-                        responsibility,
-                    ),
-                )
+            cur.execute("DROP TABLE IF EXISTS staging_companies, staging_vacancies")
+        conn.commit()
+        conn.close()
 
+    def save_ingest_state(self, data_base_name: str, state: IngestState) -> None:
+        """
+        Записывает время и параметры загрузки вакансий из API (см. ingest_state.py).
+        @param data_base_name: Имя базы данных.
+        @param state: Параметры загрузки.
+        @return: None
+        """
+        conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        with conn.cursor() as cur:
+            save_ingest_state(cur, state)
         conn.commit()
         conn.close()
 
+    def load_ingest_state(self, data_base_name: str) -> IngestState | None:
+        """
+        Читает время и параметры последней загрузки вакансий из API.
+        @param data_base_name: Имя базы данных.
+        @return: Параметры последней загрузки или None, если базы данных или таблицы ingest_state нет или загрузок
+        не было.
+        """
+        try:
+            conn = psycopg2.connect(dbname=data_base_name, **self.__params)
+        except psycopg2.OperationalError:
+            return None
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT to_regclass('ingest_state')")
+                if cur.fetchone()[0] is None:
+                    return None
+                return load_ingest_state(cur)
+        finally:
+            conn.close()
+
 
 if __name__ == "__main__":
     init_connection_parameters = {"host": "localhost", "user": "postgres", "password": "1234", "port": 5433}
@@ -148,41 +584,18 @@ if __name__ == "__main__":
     sm = SchemaManager(connection_parameters=init_connection_parameters)
     sm.create_database(data_base_name="headhunter")
 
-    # Создадим таблицу companies для хранения информации о компаниях
-    query_to_create_companies_table = """
-            CREATE TABLE %s (
-                company_id VARCHAR(10) PRIMARY KEY,
-                company_name VARCHAR(255) NOT NULL ,
-                company_url TEXT NOT NULL,
-                company_alternate_url TEXT,
-                trusted BOOL,
-                CONSTRAINT unique_order UNIQUE (company_id, company_name)
-                -- уникальность по комбинации company_id и company_name
-            )
-            """
-    sm.create_table(data_base_name="headhunter", table_name="companies", query=query_to_create_companies_table)
-
-    # Создадим таблицу companies для хранения информации о вакансиях
-    query_to_create_vacancies_table = """
-            CREATE TABLE %s (
-                vacancy_id VARCHAR(10) PRIMARY KEY,
-                company_id VARCHAR REFERENCES companies(company_id),
-                vacancy_name VARCHAR(255) NOT NULL,
-                salary INT,
-                salary_currency VARCHAR(3),
-                published_at DATE NOT NULL,
-                vacancy_url TEXT,
-                requirement TEXT,
-                responsibility TEXT
-            )
-            """
-    sm.create_table(data_base_name="headhunter", table_name="vacancies", query=query_to_create_vacancies_table)
+    # Создадим таблицы companies и vacancies с индексами
+    sm.create_schema(data_base_name="headhunter")
 
     # Прочитаем файл с данными о вакансиях в объект data
     from src.file_utils import JsonWorker
 
     json_worker = JsonWorker()
-    data = json_worker.read_file()
+    data = json_worker.iter_file()
 
     # Добавим данные из объекта data в таблицы (заполним таблицы)
     sm.insert_data(data_base_name="headhunter", vacancies_data=data)
+
+    # Выведем планы выполнения запросов DBManager
+    for query_name, plan in sm.explain_queries(data_base_name="headhunter").items():
+        print("%s:\n%s\n" % (query_name, plan))
@@ -0,0 +1,155 @@
+SEARCH_MODES = ("fts", "substring")  # Полнотекстовый поиск / поиск подстроки в названии вакансии
+
+# Текстовые конфигурации, в которых индексируются вакансии (в вакансиях hh.ru смешаны русский и английский языки)
+TEXT_CONFIGURATIONS = ("russian", "english")
+
+# Вектор полнотекстового поиска: название вакансии имеет больший вес, чем требования и обязанности
+SEARCH_VECTOR_EXPRESSION = " || ".join(
+    "setweight(to_tsvector('{config}', coalesce({fields})), '{weight}')".format(
+        config=config, fields=fields, weight=weight
+    )
+    for fields, weight in (
+        ("vacancy_name, ''", "A"),
+        ("requirement, '') || ' ' || coalesce(responsibility, ''", "B"),
+    )
+    for config in TEXT_CONFIGURATIONS
+)
+
+ADD_SEARCH_VECTOR_QUERY = (
+    "ALTER TABLE vacancies ADD COLUMN IF NOT EXISTS search_vector TSVECTOR GENERATED ALWAYS AS (%s) STORED"
+    % SEARCH_VECTOR_EXPRESSION
+)
+CREATE_SEARCH_VECTOR_INDEX_QUERY = (
+    "CREATE INDEX IF NOT EXISTS vacancies_search_vector_idx ON vacancies USING GIN (search_vector)"
+)
+CREATE_TRIGRAM_EXTENSION_QUERY = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+CREATE_TRIGRAM_INDEX_QUERY = (
+    "CREATE INDEX IF NOT EXISTS vacancies_name_trgm_idx ON vacancies USING GIN (vacancy_name gin_trgm_ops)"
+)
+
+# Шаблоны запросов поиска: столбцы результата, условие поиска и порядок подставляются при формировании запроса
+FTS_QUERY_TEMPLATE = """
+            SELECT %s
+            FROM %s
+            WHERE NOT closed AND search_vector @@ search.query
+            ORDER BY ts_rank_cd(search_vector, search.query) DESC, vacancy_name
+            """
+SUBSTRING_QUERY_TEMPLATE = """
+            SELECT %s
+            FROM vacancies
+            WHERE NOT closed AND (%s)
+            ORDER BY %s DESC, vacancy_name
+            """
+
+# Постраничный поиск: ранг вычисляется во вложенном запросе, чтобы по нему можно было продолжить выдачу с позиции
+# курсора (ранг, название вакансии, ID вакансии)
+SEARCH_PAGE_QUERY_TEMPLATE = """
+            SELECT %s, key_name, key_id, rank
+            FROM (
+                SELECT %s, vacancy_name AS key_name, vacancy_id AS key_id, %s AS rank
+                FROM %s
+                WHERE NOT closed AND (%s)
+            ) AS found
+            WHERE %s
+            ORDER BY rank DESC, key_name, key_id
+            LIMIT %%s
+            """
+# Ранг ts_rank_cd имеет тип real, поэтому значение из курсора приводится к real для точного сравнения
+SEARCH_PAGE_AFTER = "rank < %s::real OR (rank = %s::real AND (key_name, key_id) > (%s, %s))"
+
+
+def _search_parts(keywords: list[str], mode: str, match_all: bool) -> tuple[str, str, str, list[str]]:
+    """
+    Формирует части запроса поиска по ключевым словам.
+    @param keywords: Список ключевых слов.
+    @param mode: Режим поиска - "fts" или "substring".
+    @param match_all: Вакансия должна содержать все слова (AND), иначе хотя бы одно (OR).
+    @return: Кортеж (источник FROM, условие поиска, выражение ранга, параметры). Параметры режима "substring"
+    подставляются сначала в условие, затем в ранг, режима "fts" - в источник.
+    """
+    if mode == "fts":
+        # Каждое слово ищется во всех текстовых конфигурациях, слова объединяются операторами && или ||
+        keyword_query = "(%s)" % " || ".join("plainto_tsquery('%s', %%s)" % config for config in TEXT_CONFIGURATIONS)
+        search_query = (" && " if match_all else " || ").join([keyword_query] * len(keywords))
+        source = "vacancies, (SELECT %s AS query) AS search" % search_query
+        params = [keyword for keyword in keywords for _ in TEXT_CONFIGURATIONS]
+        return source, "search_vector @@ search.query", "ts_rank_cd(search_vector, search.query)", params
+
+    # Формируем условие WHERE с использованием ILIKE (выполняет поиск независимо от регистра)
+    where_clause = (" AND " if match_all else " OR ").join(["vacancy_name ILIKE %s" for _ in keywords])
+    rank = " + ".join(["(vacancy_name ILIKE %s)::int" for _ in keywords])
+    patterns = [f"%{keyword}%" for keyword in keywords]
+    return "vacancies", where_clause, rank, patterns + patterns
+
+
+def build_search_query(
+    keywords: str,
+    mode: str = "substring",
+    match_all: bool = False,
+    columns: str = "vacancy_name, salary, salary_currency",
+) -> tuple[str, list[str]]:
+    """
+    Формирует запрос поиска открытых вакансий по ключевым словам с ранжированием результатов.
+    В режиме "fts" слова ищутся в векторе полнотекстового поиска (название, требования, обязанности) с учётом
+    словоформ русского и английского языков, результаты упорядочены по ts_rank_cd. В режиме "substring" слова ищутся
+    как подстроки в названии вакансии (ILIKE, ускоряется триграммным индексом), результаты упорядочены по количеству
+    найденных слов.
+    @param keywords: Ключевые слова через пробел.
+    @param mode: Режим поиска - "fts" или "substring".
+    @param match_all: Вакансия должна содержать все слова (AND), иначе хотя бы одно (OR).
+    @param columns: Столбцы результата.
+    @return: Кортеж (SQL-запрос, параметры запроса).
+    @raise ValueError: Если передан неизвестный режим поиска.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError("Unknown search mode: %s" % mode)
+
+    keyword_list = keywords.split()
+    if not keyword_list:
+        return "SELECT %s FROM vacancies WHERE FALSE" % columns, []
+
+    source, condition, rank, params = _search_parts(keyword_list, mode, match_all)
+    if mode == "fts":
+        return FTS_QUERY_TEMPLATE % (columns, source), params
+    return SUBSTRING_QUERY_TEMPLATE % (columns, condition, rank), params
+
+
+def build_search_page_query(
+    keywords: str,
+    mode: str = "substring",
+    match_all: bool = False,
+    after: list | None = None,
+    limit: int = 20,
+    columns: str = "vacancy_name, salary, salary_currency",
+) -> tuple[str, list]:
+    """
+    Формирует запрос одной страницы результатов поиска (см. build_search_query) с постраничным выводом по ключу
+    (keyset pagination): следующая страница начинается после последней строки предыдущей, а не пропускает OFFSET строк.
+    @param keywords: Ключевые слова через пробел.
+    @param mode: Режим поиска - "fts" или "substring".
+    @param match_all: Вакансия должна содержать все слова (AND), иначе хотя бы одно (OR).
+    @param after: Ключ последней строки предыдущей страницы [название вакансии, ID вакансии, ранг] (None - первая
+    страница).
+    @param limit: Максимальное количество строк.
+    @param columns: Столбцы результата (к ним добавляются столбцы ключа: название вакансии, ID вакансии и ранг).
+    @return: Кортеж (SQL-запрос, параметры запроса).
+    @raise ValueError: Если передан неизвестный режим поиска.
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError("Unknown search mode: %s" % mode)
+
+    keyword_list = keywords.split()
+    if not keyword_list:
+        return "SELECT %s, vacancy_name, vacancy_id, 0 FROM vacancies WHERE FALSE" % columns, []
+
+    source, condition, rank, params = _search_parts(keyword_list, mode, match_all)
+    if mode == "substring":
+        # В запросе страницы ранг вычисляется раньше условия поиска
+        params = params[len(keyword_list) :] + params[: len(keyword_list)]
+    keyset = "TRUE"
+    if after is not None:
+        name, vacancy_id, last_rank = after
+        keyset = SEARCH_PAGE_AFTER
+        params = params + [last_rank, last_rank, name, vacancy_id]
+    query = SEARCH_PAGE_QUERY_TEMPLATE % (columns, columns, rank, source, condition, keyset)
+    return query, params + [limit]
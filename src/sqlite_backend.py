@@ -0,0 +1,454 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+from src.bulk_loader import BATCH_SIZE, batched, report
+from src.dedup import EmployerIndex
+from src.instrumentation import instrumentation
+from src.models import Vacancy
+from src.schema_manager import COMPANIES_COLUMNS, VACANCIES_COLUMNS, _as_records, _vacancy_row
+from src.search import SEARCH_MODES
+from src.storage import StorageBackend
+
+# Встроенная база данных SQLite: вакансии загружаются и читаются в том же процессе, без сервера и сетевых обращений.
+# Журнал WAL позволяет читать данные во время загрузки, загрузка выполняется в одной транзакции, поэтому читатели
+# видят либо старые, либо новые данные. Сводных таблиц нет: статистика вычисляется запросами по частичным индексам
+
+DATA_BASE_PATH = os.path.join("data", "headhunter.sqlite")
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",  # В режиме WAL фиксация не ждёт записи на диск, целостность базы сохраняется
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",  # 64 МБ страничного кэша
+)
+
+CREATE_TABLE_QUERIES = (
+    """
+    CREATE TABLE IF NOT EXISTS companies (
+        company_id INTEGER PRIMARY KEY,
+        company_name TEXT NOT NULL,
+        company_url TEXT NOT NULL,
+        company_alternate_url TEXT,
+        trusted INTEGER
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS vacancies (
+        vacancy_id INTEGER PRIMARY KEY,
+        company_id INTEGER NOT NULL REFERENCES companies (company_id) ON DELETE CASCADE,
+        vacancy_name TEXT NOT NULL,
+        salary INTEGER,
+        salary_currency TEXT,
+        published_at TEXT NOT NULL,
+        vacancy_url TEXT NOT NULL,
+        requirement TEXT,
+        responsibility TEXT,
+        content_hash TEXT NOT NULL,
+        closed INTEGER NOT NULL DEFAULT 0,
+        ingest_key TEXT
+    )
+    """,
+)
+
+# Частичные индексы по открытым вакансиям: запросы отчётов отбирают строки условием closed = 0
+CREATE_INDEX_QUERIES = (
+    "CREATE INDEX IF NOT EXISTS companies_name_idx ON companies (company_name, company_id)",
+    "CREATE INDEX IF NOT EXISTS vacancies_company_id_idx ON vacancies (company_id, closed)",
+    "CREATE INDEX IF NOT EXISTS vacancies_name_idx ON vacancies (vacancy_name, vacancy_id) WHERE closed = 0",
+    "CREATE INDEX IF NOT EXISTS vacancies_salary_idx ON vacancies (salary_currency, salary) "
+    "WHERE closed = 0 AND salary IS NOT NULL",
+)
+
+# Полнотекстовый индекс FTS5 хранит только словарь и ссылается на строки vacancies (external content), триггеры
+# обновляют его при изменении вакансий. Токенизатор unicode61 приводит к нижнему регистру и кириллицу
+CREATE_FTS_QUERIES = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS vacancies_fts USING fts5(
+        vacancy_name, requirement, responsibility,
+        content = 'vacancies', content_rowid = 'vacancy_id', tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+)
+CREATE_FTS_TRIGGER_QUERIES = (
+    """
+    CREATE TRIGGER IF NOT EXISTS vacancies_fts_insert AFTER INSERT ON vacancies BEGIN
+        INSERT INTO vacancies_fts (rowid, vacancy_name, requirement, responsibility)
+        VALUES (new.vacancy_id, new.vacancy_name, new.requirement, new.responsibility);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vacancies_fts_delete AFTER DELETE ON vacancies BEGIN
+        INSERT INTO vacancies_fts (vacancies_fts, rowid, vacancy_name, requirement, responsibility)
+        VALUES ('delete', old.vacancy_id, old.vacancy_name, old.requirement, old.responsibility);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vacancies_fts_update AFTER UPDATE OF vacancy_name, requirement, responsibility
+    ON vacancies BEGIN
+        INSERT INTO vacancies_fts (vacancies_fts, rowid, vacancy_name, requirement, responsibility)
+        VALUES ('delete', old.vacancy_id, old.vacancy_name, old.requirement, old.responsibility);
+        INSERT INTO vacancies_fts (rowid, vacancy_name, requirement, responsibility)
+        VALUES (new.vacancy_id, new.vacancy_name, new.requirement, new.responsibility);
+    END
+    """,
+)
+REBUILD_FTS_QUERY = "INSERT INTO vacancies_fts (vacancies_fts) VALUES ('rebuild')"
+
+DROP_QUERIES = (
+    "DROP TABLE IF EXISTS vacancies_fts",  # Триггеры удаляются вместе с таблицей vacancies
+    "DROP TABLE IF EXISTS vacancies",
+    "DROP TABLE IF EXISTS companies",
+)
+
+UPSERT_COMPANIES_QUERY = """
+    INSERT INTO companies (%s) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (company_id) DO UPDATE SET
+        company_name = excluded.company_name,
+        company_url = excluded.company_url,
+        company_alternate_url = excluded.company_alternate_url,
+        trusted = excluded.trusted
+    WHERE (companies.company_name, companies.company_url, companies.company_alternate_url, companies.trusted)
+        IS NOT (excluded.company_name, excluded.company_url, excluded.company_alternate_url, excluded.trusted)
+    """ % ", ".join(COMPANIES_COLUMNS)
+# Вакансия перезаписывается, только если изменилось её содержимое (хэш) или она была закрыта
+UPSERT_VACANCIES_QUERY = """
+    INSERT INTO vacancies (%s, ingest_key) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (vacancy_id) DO UPDATE SET
+        company_id = excluded.company_id,
+        vacancy_name = excluded.vacancy_name,
+        salary = excluded.salary,
+        salary_currency = excluded.salary_currency,
+        published_at = excluded.published_at,
+        vacancy_url = excluded.vacancy_url,
+        requirement = excluded.requirement,
+        responsibility = excluded.responsibility,
+        content_hash = excluded.content_hash,
+        closed = 0,
+        ingest_key = coalesce(excluded.ingest_key, vacancies.ingest_key)
+    WHERE vacancies.content_hash <> excluded.content_hash OR vacancies.closed
+    """ % ", ".join(VACANCIES_COLUMNS)
+# Ключ запроса к API у неизменившихся вакансий (см. schema_manager.UPDATE_INGEST_KEY_QUERY)
+UPDATE_INGEST_KEY_QUERY = """
+    UPDATE vacancies SET ingest_key = ?
+    WHERE vacancy_id IN (SELECT vacancy_id FROM loaded_vacancies) AND ingest_key IS NOT ?
+    """
+# Закрываются только вакансии того же запроса к API
+CLOSE_MISSING_VACANCIES_QUERY = """
+    UPDATE vacancies SET closed = 1
+    WHERE closed = 0 AND ingest_key = ? AND vacancy_id NOT IN (SELECT vacancy_id FROM loaded_vacancies)
+    """
+
+# Вакансии считаются по индексу (company_id, closed) без чтения строк таблицы, затем присоединяются названия компаний
+COMPANIES_AND_VACANCIES_COUNT_QUERY = """
+    SELECT company_name, vacancy_count
+    FROM (SELECT company_id, COUNT(*) AS vacancy_count FROM vacancies WHERE closed = 0 GROUP BY company_id)
+        AS company_stats
+    JOIN companies ON companies.company_id = company_stats.company_id
+    ORDER BY company_name
+    """
+ALL_VACANCIES_QUERY = """
+    SELECT vacancy_name, companies.company_name, salary, salary_currency, vacancy_url
+    FROM vacancies
+    JOIN companies ON companies.company_id = vacancies.company_id
+    WHERE vacancies.closed = 0
+    ORDER BY vacancy_name
+    """
+# Средняя зарплата округляется до копеек, как в столбце avg_salary NUMERIC(12, 2) сводной таблицы PostgreSQL
+SALARY_STATS_SUBQUERY = """
+    SELECT salary_currency, COUNT(*) AS vacancy_count, ROUND(AVG(salary), 2) AS avg_salary
+    FROM vacancies
+    WHERE closed = 0 AND salary IS NOT NULL
+    GROUP BY salary_currency
+    """
+AVG_SALARY_QUERY = """
+    SELECT avg_salary, salary_currency
+    FROM (%s)
+    ORDER BY vacancy_count DESC, salary_currency
+    """ % SALARY_STATS_SUBQUERY
+HIGHER_SALARY_QUERY = """
+    SELECT vacancy_name, salary, vacancies.salary_currency FROM vacancies
+    JOIN (%s) AS salary_stats ON salary_stats.salary_currency = vacancies.salary_currency
+    WHERE closed = 0 AND salary > avg_salary
+    ORDER BY vacancies.salary_currency, salary DESC
+    """ % SALARY_STATS_SUBQUERY
+
+# Функции SQLite lower и LIKE приводят к нижнему регистру только латиницу, поэтому название вакансии приводится
+# к нижнему регистру функцией Python, зарегистрированной в соединении
+SUBSTRING_QUERY_TEMPLATE = """
+    SELECT vacancy_name, salary, salary_currency
+    FROM (SELECT vacancy_name, salary, salary_currency, py_lower(vacancy_name) AS name FROM vacancies WHERE closed = 0)
+    WHERE %s
+    ORDER BY %s DESC, vacancy_name
+    """
+# Вес названия вакансии больше веса требований и обязанностей (как веса A и B в ts_rank_cd), bm25 тем меньше,
+# чем релевантнее вакансия
+FTS_QUERY = """
+    SELECT vacancies.vacancy_name, salary, salary_currency
+    FROM vacancies_fts
+    JOIN vacancies ON vacancies.vacancy_id = vacancies_fts.rowid
+    WHERE vacancies_fts MATCH ? AND vacancies.closed = 0
+    ORDER BY bm25(vacancies_fts, 1.0, 0.4, 0.4), vacancies.vacancy_name
+    """
+
+
+def fts_available() -> bool:
+    """
+    Проверяет, собран ли модуль sqlite3 с расширением полнотекстового поиска FTS5.
+    @return: True, если FTS5 доступен.
+    """
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE fts_check USING fts5(text)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+    return True
+
+
+def build_fts_match(keywords: list[str], match_all: bool = False) -> str:
+    """
+    Формирует выражение MATCH для FTS5: каждое слово ищется как префикс, чтобы находились словоформы ("разработчик"
+    находит "разработчика"), кавычки в словах экранируются удвоением.
+    @param keywords: Список ключевых слов.
+    @param match_all: Вакансия должна содержать все слова (AND), иначе хотя бы одно (OR).
+    @return: Выражение MATCH.
+    """
+    terms = ['"%s"*' % keyword.replace('"', '""') for keyword in keywords]
+    return (" AND " if match_all else " OR ").join(terms)
+
+
+class SqliteBackend(StorageBackend):
+    """Хранилище вакансий во встроенной базе данных SQLite."""
+
+    def __init__(self, path: str = DATA_BASE_PATH) -> None:
+        """
+        Инициализатор экземпляра класса.
+        Открывает соединение с базой данных (файл создаётся при первом подключении). Соединение используется под
+        блокировкой, поэтому экземпляр класса можно использовать из нескольких потоков (например, в приёмнике
+        конвейера загрузки).
+        @param path: Путь к файлу базы данных (":memory:" - база данных в памяти).
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Транзакции открываются и фиксируются явно (isolation_level=None), поэтому DDL загрузки тоже в транзакции
+        self.__conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.__conn.create_function("py_lower", 1, str.lower, deterministic=True)
+        for pragma in PRAGMAS:
+            self.__conn.execute(pragma)
+        self.__lock = threading.RLock()
+        self.__fts = fts_available()
+        if not self.__fts:
+            print("SQLite собран без FTS5, полнотекстовый поиск будет заменён поиском подстроки")
+
+    def __enter__(self) -> "SqliteBackend":
+        return self
+
+    @property
+    def fts(self) -> bool:
+        """
+        Доступен ли полнотекстовый поиск FTS5.
+        @return: True, если индекс vacancies_fts создаётся и используется при поиске.
+        """
+        return self.__fts
+
+    def __create(self, cur: sqlite3.Cursor, indexes: bool = True) -> None:
+        """
+        Создаёт недостающие таблицы и, если нужно, индексы и триггеры полнотекстового индекса.
+        @param cur: Курсор sqlite3.
+        @param indexes: Создать индексы и триггеры (при полной загрузке они создаются после загрузки данных).
+        @return: None
+        """
+        queries: tuple[str, ...] = CREATE_TABLE_QUERIES
+        if self.__fts:
+            queries += CREATE_FTS_QUERIES
+        if indexes:
+            queries += CREATE_INDEX_QUERIES
+            if self.__fts:
+                queries += CREATE_FTS_TRIGGER_QUERIES
+        for query in queries:
+            cur.execute(query)
+        # В базе данных, созданной до появления столбца ingest_key, столбец добавляется без пересоздания таблицы
+        if "ingest_key" not in {row[1] for row in cur.execute("PRAGMA table_info(vacancies)")}:
+            cur.execute("ALTER TABLE vacancies ADD COLUMN ingest_key TEXT")
+
+    @instrumentation.timed("schema.create_schema", backend="sqlite")
+    def create_schema(self, recreate: bool = True) -> None:
+        """
+        Создаёт таблицы companies и vacancies, индексы и полнотекстовый индекс.
+        @param recreate: Удалить существующие таблицы и создать их заново. Если False, создаются только недостающие
+        таблицы и индексы.
+        @return: None
+        """
+        with self.__lock:
+            cur = self.__conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            if recreate:
+                for query in DROP_QUERIES:
+                    cur.execute(query)
+            self.__create(cur)
+            cur.execute("COMMIT")
+
+    @instrumentation.timed("schema.insert_data", backend="sqlite")
+    def insert_data(
+        self,
+        vacancies_data: Iterable[Vacancy | dict],
+        batch_size: int = BATCH_SIZE,
+        incremental: bool = False,
+        scope: str | None = None,
+    ) -> None:
+        """
+        Сохраняет данные о компаниях и вакансиях пакетами через executemany.
+        При полной загрузке таблицы создаются заново без индексов, а индексы и полнотекстовый индекс строятся один раз
+        после загрузки данных. В инкрементальном режиме добавляются новые и обновляются изменившиеся строки (по хэшу
+        содержимого), а вакансии того же запроса к API (scope), которых нет в загруженных данных, помечаются
+        закрытыми. Всё выполняется в одной транзакции.
+        @param vacancies_data: Вакансии (записи Vacancy или словари из ответа API; список или генератор).
+        @param batch_size: Количество вакансий в одном пакете.
+        @param incremental: Обновить существующие данные вместо полной перезаписи таблиц.
+        @param scope: Ключ запроса к API, которым получены данные (IngestState.request_key). Если None или вакансий
+        не загружено, вакансии не закрываются.
+        @return: None
+        """
+        started_at = time.perf_counter()
+        counts = {"companies": 0, "vacancies": 0}
+        changed = [0, 0]
+
+        with self.__lock, EmployerIndex() as employers:
+            cur = self.__conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if incremental:
+                    self.__create(cur)
+                    cur.execute("CREATE TEMP TABLE loaded_vacancies (vacancy_id INTEGER PRIMARY KEY)")
+                else:
+                    for query in DROP_QUERIES:
+                        cur.execute(query)
+                    self.__create(cur, indexes=False)
+
+                for batch in batched(vacancies_data, batch_size):
+                    records = _as_records(batch)
+                    companies = [vacancy.company.row() for vacancy in records if employers.add(vacancy.company)]
+                    rows = [_vacancy_row(vacancy) + (scope,) for vacancy in records]
+
+                    with instrumentation.span("db.load_batch", table="vacancies", backend="sqlite"):
+                        cur.executemany(UPSERT_COMPANIES_QUERY, companies)
+                        changed[0] += max(cur.rowcount, 0)
+                        cur.executemany(UPSERT_VACANCIES_QUERY, rows)
+                        changed[1] += max(cur.rowcount, 0)
+                        if incremental:
+                            cur.executemany(
+                                "INSERT OR IGNORE INTO loaded_vacancies VALUES (?)", [(row[0],) for row in rows]
+                            )
+                    counts["companies"] += len(companies)
+                    counts["vacancies"] += len(rows)
+                    instrumentation.count("db.rows", len(companies), table="companies")
+                    instrumentation.count("db.rows", len(rows), table="vacancies")
+
+                if incremental:
+                    closed = 0
+                    if scope is not None:
+                        cur.execute(UPDATE_INGEST_KEY_QUERY, [scope, scope])
+                        # Пустые данные - скорее ошибка загрузки, чем закрытие всех вакансий
+                        if counts["vacancies"]:
+                            cur.execute(CLOSE_MISSING_VACANCIES_QUERY, [scope])
+                            closed = cur.rowcount
+                        else:
+                            print("Вакансий не загружено, отсутствующие вакансии не закрываются")
+                    cur.execute("DROP TABLE loaded_vacancies")
+                else:
+                    for query in CREATE_INDEX_QUERIES:
+                        cur.execute(query)
+                    if self.__fts:
+                        cur.execute(REBUILD_FTS_QUERY)
+                        for query in CREATE_FTS_TRIGGER_QUERIES:
+                            cur.execute(query)
+
+                with instrumentation.span("db.commit", backend="sqlite"):
+                    cur.execute("COMMIT")
+            except BaseException:
+                cur.execute("ROLLBACK")
+                raise
+
+        report(counts, started_at)
+        if incremental:
+            print("Добавлено или изменено компаний: %d, вакансий: %d, закрыто вакансий: %d" % (*changed, closed))
+
+    def __fetch(self, query: str, params: list | None = None) -> list[tuple]:
+        """
+        Выполняет запрос и получает все строки результата.
+        @param query: SQL-запрос.
+        @param params: Параметры запроса.
+        @return: Список кортежей.
+        """
+        with self.__lock:
+            return self.__conn.execute(query, params or []).fetchall()
+
+    @instrumentation.timed("db.query", query="get_companies_and_vacancies_count", backend="sqlite")
+    def get_companies_and_vacancies_count(self) -> list[tuple]:
+        """
+        Получает список всех компаний и количество открытых вакансий у каждой компании.
+        """
+        return self.__fetch(COMPANIES_AND_VACANCIES_COUNT_QUERY)
+
+    @instrumentation.timed("db.query", query="get_all_vacancies", backend="sqlite")
+    def get_all_vacancies(self) -> list[tuple]:
+        """
+        Получает список всех открытых вакансий с указанием названия компании, зарплаты и ссылки на вакансию.
+        """
+        return self.__fetch(ALL_VACANCIES_QUERY)
+
+    @instrumentation.timed("db.query", query="get_avg_salary", backend="sqlite")
+    def get_avg_salary(self) -> list[tuple]:
+        """
+        Получает среднюю зарплату по вакансиям в каждой валюте (валюты с большим количеством вакансий - первыми).
+        """
+        return self.__fetch(AVG_SALARY_QUERY)
+
+    @instrumentation.timed("db.query", query="get_vacancies_with_higher_salary", backend="sqlite")
+    def get_vacancies_with_higher_salary(self) -> list[tuple]:
+        """
+        Получает список всех вакансий, у которых зарплата выше средней по всем вакансиям в той же валюте.
+        """
+        return self.__fetch(HIGHER_SALARY_QUERY)
+
+    @instrumentation.timed("db.query", query="get_vacancies_with_keyword", backend="sqlite")
+    def get_vacancies_with_keyword(
+        self, keywords: str, mode: str = "substring", match_all: bool = False
+    ) -> list[tuple]:
+        """
+        Получает список открытых вакансий по ключевым словам, упорядоченный по релевантности.
+        В режиме "fts" слова ищутся как префиксы в полнотекстовом индексе FTS5 (название, требования, обязанности),
+        результаты упорядочены по bm25. В режиме "substring" слова ищутся как подстроки в названии вакансии без учёта
+        регистра, результаты упорядочены по количеству найденных слов.
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" или "fts".
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        @raise ValueError: Если передан неизвестный режим поиска.
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError("Unknown search mode: %s" % mode)
+
+        keyword_list = keywords.split()
+        if not keyword_list:
+            return []
+        if mode == "fts" and self.__fts:
+            return self.__fetch(FTS_QUERY, [build_fts_match(keyword_list, match_all)])
+
+        where_clause = (" AND " if match_all else " OR ").join(["instr(name, ?) > 0" for _ in keyword_list])
+        rank = " + ".join(["(instr(name, ?) > 0)" for _ in keyword_list])
+        patterns = [keyword.lower() for keyword in keyword_list]
+        return self.__fetch(SUBSTRING_QUERY_TEMPLATE % (where_clause, rank), patterns + patterns)
+
+    def close(self) -> None:
+        """
+        Закрывает соединение с базой данных.
+        @return: None
+        """
+        with self.__lock:
+            self.__conn.close()
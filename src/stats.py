@@ -0,0 +1,51 @@
+from typing import Any, Collection
+
+from src.instrumentation import instrumentation
+
+# Статистика зарплат по валютам и количество вакансий у компаний хранятся в сводных таблицах salary_stats
+# и company_stats (см. schema.py) и пересчитываются после загрузки данных только для затронутых валют и компаний
+
+REFRESH_SALARY_STATS_QUERY = """
+    INSERT INTO salary_stats (salary_currency, vacancy_count, avg_salary, min_salary, p25_salary, median_salary,
+        p75_salary, p90_salary, max_salary)
+    SELECT salary_currency, COUNT(*), AVG(salary), MIN(salary),
+        percentile_cont(0.25) WITHIN GROUP (ORDER BY salary),
+        percentile_cont(0.5) WITHIN GROUP (ORDER BY salary),
+        percentile_cont(0.75) WITHIN GROUP (ORDER BY salary),
+        percentile_cont(0.9) WITHIN GROUP (ORDER BY salary),
+        MAX(salary)
+    FROM vacancies
+    WHERE NOT closed AND salary IS NOT NULL AND {condition}
+    GROUP BY salary_currency
+    """
+REFRESH_COMPANY_STATS_QUERY = """
+    INSERT INTO company_stats (company_id, vacancy_count, salary_vacancy_count)
+    SELECT company_id, COUNT(*), COUNT(salary)
+    FROM vacancies
+    WHERE NOT closed AND {condition}
+    GROUP BY company_id
+    """
+
+
+@instrumentation.timed("db.refresh_stats")
+def refresh_stats(
+    cur: Any, currencies: Collection[str] | None = None, company_ids: Collection[int] | None = None
+) -> None:
+    """
+    Пересчитывает сводные таблицы salary_stats и company_stats в текущей транзакции.
+    @param cur: Курсор psycopg2.
+    @param currencies: Валюты, статистику по которым нужно пересчитать (None - все валюты).
+    @param company_ids: ID компаний, статистику по которым нужно пересчитать (None - все компании).
+    @return: None
+    """
+    for table, key, keys, query in (
+        ("salary_stats", "salary_currency", currencies, REFRESH_SALARY_STATS_QUERY),
+        ("company_stats", "company_id", company_ids, REFRESH_COMPANY_STATS_QUERY),
+    ):
+        if keys is None:
+            cur.execute("DELETE FROM %s" % table)
+            cur.execute(query.format(condition="TRUE"))
+        elif keys:
+            # Строки затронутых ключей удаляются и вычисляются заново; ключ без открытых вакансий просто исчезает
+            cur.execute("DELETE FROM %s WHERE %s = ANY(%%s)" % (table, key), [list(keys)])
+            cur.execute(query.format(condition="%s = ANY(%%s)" % key), [list(keys)])
@@ -0,0 +1,232 @@
+from abc import ABC, abstractmethod
+from typing import Any, Iterable
+
+from src.bulk_loader import BATCH_SIZE
+from src.db_manager import DBManager
+from src.models import Vacancy
+from src.schema_manager import SchemaManager
+
+# Хранилище вакансий - база данных, в которую конвейер загрузки сохраняет вакансии и из которой читаются отчёты.
+# PostgresBackend работает с сервером PostgreSQL через SchemaManager и DBManager, SqliteBackend (sqlite_backend.py) -
+# со встроенной базой данных SQLite в файле, без сервера и сетевых обращений
+
+STORAGE_BACKENDS = ("postgresql", "sqlite")
+
+
+class StorageBackend(ABC):
+    """Абстрактный класс хранилища вакансий: создание схемы, пакетная загрузка и запросы отчётов."""
+
+    def __enter__(self) -> "StorageBackend":
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    @abstractmethod
+    def create_schema(self, recreate: bool = True) -> None:
+        """
+        Создаёт базу данных и таблицы.
+        @param recreate: Удалить существующие данные.
+        @return: None
+        """
+        ...
+
+    @abstractmethod
+    def insert_data(
+        self,
+        vacancies_data: Iterable[Vacancy | dict],
+        batch_size: int = BATCH_SIZE,
+        incremental: bool = False,
+        scope: str | None = None,
+    ) -> None:
+        """
+        Сохраняет данные о компаниях и вакансиях.
+        @param vacancies_data: Вакансии (записи Vacancy или словари из ответа API).
+        @param batch_size: Количество вакансий в одном пакете.
+        @param incremental: Обновить существующие данные вместо полной перезаписи: вакансии запроса scope, которых
+        нет в загруженных данных, помечаются закрытыми.
+        @param scope: Ключ запроса к API, которым получены данные (IngestState.request_key). Если None, вакансии
+        не закрываются.
+        @return: None
+        """
+        ...
+
+    @abstractmethod
+    def get_companies_and_vacancies_count(self) -> list[tuple]:
+        """
+        Получает список всех компаний и количество открытых вакансий у каждой компании.
+        @return: Список кортежей (название компании, количество вакансий), упорядоченный по названию компании.
+        """
+        ...
+
+    @abstractmethod
+    def get_all_vacancies(self) -> list[tuple]:
+        """
+        Получает список всех открытых вакансий.
+        @return: Список кортежей (название вакансии, название компании, зарплата, валюта, ссылка на вакансию),
+        упорядоченный по названию вакансии.
+        """
+        ...
+
+    @abstractmethod
+    def get_avg_salary(self) -> list[tuple]:
+        """
+        Получает среднюю зарплату по вакансиям в каждой валюте.
+        @return: Список кортежей (средняя зарплата, валюта), валюты с большим количеством вакансий - первыми.
+        """
+        ...
+
+    @abstractmethod
+    def get_vacancies_with_higher_salary(self) -> list[tuple]:
+        """
+        Получает список вакансий, у которых зарплата выше средней по всем вакансиям в той же валюте.
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        """
+        ...
+
+    @abstractmethod
+    def get_vacancies_with_keyword(
+        self, keywords: str, mode: str = "substring", match_all: bool = False
+    ) -> list[tuple]:
+        """
+        Получает список вакансий по ключевым словам, упорядоченный по релевантности.
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" (подстрока в названии вакансии) или "fts" (полнотекстовый поиск по
+        названию, требованиям и обязанностям).
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        """
+        ...
+
+    def close(self) -> None:
+        """
+        Освобождает соединения с базой данных.
+        @return: None
+        """
+
+
+class PostgresBackend(StorageBackend):
+    """Хранилище вакансий в базе данных PostgreSQL (SchemaManager и DBManager)."""
+
+    def __init__(self, connection_parameters: dict, data_base_name: str = "headhunter", **db_options: Any) -> None:
+        """
+        Инициализатор экземпляра класса.
+        @param connection_parameters: Параметры подключения к серверу PostgreSQL.
+        @param data_base_name: Имя базы данных.
+        @param db_options: Параметры DBManager (размер пула соединений, размер кэша запросов).
+        """
+        self.__data_base_name = data_base_name
+        self.__schema_manager = SchemaManager(connection_parameters)
+        self.__db_manager = DBManager(connection_parameters, **db_options)
+
+    @property
+    def schema_manager(self) -> SchemaManager:
+        """
+        Менеджер схемы базы данных (создание промежуточных таблиц, статистика, состояние загрузки).
+        @return: Экземпляр класса SchemaManager.
+        """
+        return self.__schema_manager
+
+    @property
+    def db_manager(self) -> DBManager:
+        """
+        Менеджер запросов к базе данных (постраничный вывод, выгрузка).
+        @return: Экземпляр класса DBManager.
+        """
+        return self.__db_manager
+
+    def create_schema(self, recreate: bool = True) -> None:
+        """
+        Создаёт базу данных, таблицы, индексы и индексы поиска (SchemaManager.create_database и create_schema).
+        @param recreate: Удалить существующие базу данных и таблицы.
+        @return: None
+        """
+        self.__schema_manager.create_database(self.__data_base_name, recreate=recreate)
+        self.__schema_manager.create_schema(self.__data_base_name, recreate=recreate)
+
+    def insert_data(
+        self,
+        vacancies_data: Iterable[Vacancy | dict],
+        batch_size: int = BATCH_SIZE,
+        incremental: bool = False,
+        scope: str | None = None,
+    ) -> None:
+        """
+        Загружает вакансии через COPY FROM STDIN (SchemaManager.insert_data).
+        @param vacancies_data: Вакансии (записи Vacancy или словари из ответа API).
+        @param batch_size: Количество вакансий в одном пакете.
+        @param incremental: Обновить существующие данные вместо полной перезаписи.
+        @param scope: Ключ запроса к API, которым получены данные.
+        @return: None
+        """
+        self.__schema_manager.insert_data(
+            self.__data_base_name, vacancies_data, batch_size=batch_size, incremental=incremental, scope=scope
+        )
+
+    def get_companies_and_vacancies_count(self) -> list[tuple]:
+        """
+        Получает количество открытых вакансий у каждой компании (DBManager.get_companies_and_vacancies_count).
+        @return: Список кортежей (название компании, количество вакансий).
+        """
+        return self.__db_manager.get_companies_and_vacancies_count(self.__data_base_name)
+
+    def get_all_vacancies(self) -> list[tuple]:
+        """
+        Получает список всех открытых вакансий (DBManager.get_all_vacancies).
+        @return: Список кортежей (название вакансии, название компании, зарплата, валюта, ссылка на вакансию).
+        """
+        return self.__db_manager.get_all_vacancies(self.__data_base_name)
+
+    def get_avg_salary(self) -> list[tuple]:
+        """
+        Получает среднюю зарплату по вакансиям в каждой валюте из сводной таблицы salary_stats
+        (DBManager.get_avg_salary).
+        @return: Список кортежей (средняя зарплата, валюта).
+        """
+        return self.__db_manager.get_avg_salary(self.__data_base_name)
+
+    def get_vacancies_with_higher_salary(self) -> list[tuple]:
+        """
+        Получает список вакансий с зарплатой выше средней в той же валюте (DBManager.get_vacancies_with_higher_salary).
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        """
+        return self.__db_manager.get_vacancies_with_higher_salary(self.__data_base_name)
+
+    def get_vacancies_with_keyword(
+        self, keywords: str, mode: str = "substring", match_all: bool = False
+    ) -> list[tuple]:
+        """
+        Получает список вакансий по ключевым словам, упорядоченный по релевантности
+        (DBManager.get_vacancies_with_keyword).
+        @param keywords: Ключевые слова через пробел.
+        @param mode: Режим поиска - "substring" или "fts".
+        @param match_all: Вакансия должна содержать все слова, иначе хотя бы одно.
+        @return: Список кортежей (название вакансии, зарплата, валюта).
+        """
+        return self.__db_manager.get_vacancies_with_keyword(self.__data_base_name, keywords, mode, match_all)
+
+    def close(self) -> None:
+        """
+        Освобождает пулы соединений DBManager (общие пулы закрываются, когда их не использует никто другой).
+        @return: None
+        """
+        self.__db_manager.close()
+
+
+def open_backend(name: str, **options: Any) -> StorageBackend:
+    """
+    Создаёт хранилище вакансий по имени.
+    @param name: Имя хранилища - "postgresql" или "sqlite".
+    @param options: Параметры инициализатора класса хранилища (для PostgreSQL - connection_parameters
+    и data_base_name, для SQLite - path).
+    @return: Хранилище вакансий.
+    @raise ValueError: Если передано неизвестное имя хранилища.
+    """
+    if name == "postgresql":
+        return PostgresBackend(**options)
+    if name == "sqlite":
+        # Модуль SQLite импортирует этот модуль, поэтому импортируется при вызове
+        from src.sqlite_backend import SqliteBackend
+
+        return SqliteBackend(**options)
+    raise ValueError("Unknown storage backend: %s" % name)
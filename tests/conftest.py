@@ -0,0 +1,92 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+
+class StubServer:
+    """Локальный HTTP-сервер, имитирующий API HeadHunter."""
+
+    def __init__(self) -> None:
+        """
+        Инициализатор экземпляра класса.
+        Атрибут handler принимает путь, параметры и заголовки запроса и возвращает кортеж (статус-код, заголовки,
+        тело ответа). По умолчанию сервер отвечает пустым списком вакансий.
+        """
+        self.handler: Callable[[str, dict, dict], tuple[int, dict, Any]] = lambda path, params, headers: (
+            200,
+            {},
+            {"items": []},
+        )
+        self.requests: list[tuple[str, dict]] = []
+        self.connections: set[tuple[str, int]] = set()  # Адреса клиентов (по одному на TCP-соединение)
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Поддержка keep-alive соединений
+
+            def do_GET(self) -> None:
+                parts = urlsplit(self.path)
+                params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+                with stub.lock:
+                    stub.requests.append((parts.path, params))
+                    stub.connections.add(self.client_address)
+                status, headers, body = stub.handler(parts.path, params, dict(self.headers))
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        self.__server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.__server.daemon_threads = True
+        self.url = "http://127.0.0.1:%d" % self.__server.server_port
+        self.__thread = threading.Thread(target=self.__server.serve_forever, args=(0.05,), daemon=True)
+        self.__thread.start()
+
+    def close(self) -> None:
+        """
+        Останавливает сервер.
+        @return: None
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+@pytest.fixture
+def stub_server() -> Iterator[StubServer]:
+    """
+    Фикстура локального HTTP-сервера.
+    @return: Экземпляр класса StubServer.
+    """
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def vacancy() -> dict:
+    """
+    Фикстура вакансии в формате ответа API.
+    @return: Словарь с данными о вакансии.
+    """
+    return {
+        "id": "112074842",
+        "name": "Golang Developer",
+        "employer": {"id": "1480667", "name": "Тагес Джамп", "url": "", "alternate_url": "", "trusted": True},
+        "salary": {"from": 114500, "to": None, "currency": "RUR"},
+        "published_at": "2024-11-28T18:20:11+0300",
+        "url": "https://api.hh.ru/vacancies/112074842",
+        "snippet": {"requirement": "Уверенно знаете Go.", "responsibility": None},
+        "premium": False,
+    }
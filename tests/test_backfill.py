@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.backfill import iter_shard, load_shard, main, plan_shards
+from src.file_utils import JsonWorker, SnapshotWorker
+
+
+@pytest.fixture
+def vacancies(vacancy: dict) -> list[dict]:
+    """
+    Вакансии двух компаний в формате ответа API.
+    @param vacancy: Данные о вакансии.
+    @return: Список вакансий.
+    """
+    return [dict(vacancy, id=str(index), employer=dict(vacancy["employer"], id=str(index % 2))) for index in range(25)]
+
+
+def test_json_lines_shards(tmpdir: str, vacancies: list[dict]) -> None:
+    """
+    Проверяем, что при делении файла JSON Lines на части по байтам каждая строка читается ровно один раз.
+    @param tmpdir: Временный каталог.
+    @param vacancies: Вакансии.
+    @return: None
+    """
+    file_name = str(tmpdir.join("data.ndjson"))
+    JsonWorker(file_name).write_lines(vacancies)
+
+    shards = plan_shards(file_name, shard_bytes=100)
+    assert len(shards) > 10
+
+    ids = []
+    for shard in shards:
+        for record in iter_shard(shard):
+            # Из файла JSON Lines читаются словари из ответа API
+            assert isinstance(record, dict)
+            ids.append(record["id"])
+    assert ids == [vacancy["id"] for vacancy in vacancies]
+
+    JsonWorker(file_name).write_file(vacancies)
+    with pytest.raises(ValueError):
+        plan_shards(file_name)
+
+
+def test_snapshot_shards(tmpdir: str, vacancies: list[dict]) -> None:
+    """
+    Проверяем, что снимок делится на части по группам строк, а часть загружается по отдельному соединению.
+    @param tmpdir: Временный каталог.
+    @param vacancies: Вакансии.
+    @return: None
+    """
+    file_name = str(tmpdir.join("data.snapshot"))
+    SnapshotWorker(file_name, row_group_size=10).write_file(vacancies)
+
+    shards = plan_shards(file_name)
+    assert [(shard.start, shard.stop) for shard in shards] == [(0, 1), (1, 2), (2, 3)]
+
+    with patch("src.backfill.psycopg2.connect") as connect:
+        cursor = MagicMock()
+        connect.return_value.cursor.return_value.__enter__.return_value = cursor
+        counts = load_shard({"host": "localhost"}, "headhunter", shards[2])
+
+    assert counts == {"companies": 2, "vacancies": 5}
+    tables = [str(call.args[0]) for call in cursor.copy_expert.call_args_list]
+    assert "staging_companies" in tables[0] and "staging_vacancies" in tables[1]
+    connect.return_value.commit.assert_called_once()
+    connect.return_value.close.assert_called_once()
+
+
+def test_main_close_missing() -> None:
+    """
+    Проверяем, что по умолчанию загрузка из файла не закрывает вакансии, а с --close-missing закрываются только
+    вакансии последней загрузки из API.
+    @return: None
+    """
+    with patch("src.backfill.config", return_value={}), patch("src.backfill.backfill") as backfill, patch(
+        "src.backfill.SchemaManager"
+    ) as schema_manager:
+        schema_manager.return_value.load_ingest_state.return_value.request_key = "python|1|10|0"
+
+        main(["data.ndjson"])
+        assert backfill.call_args.kwargs["scope"] is None
+
+        main(["data.ndjson", "--close-missing"])
+        assert backfill.call_args.kwargs["scope"] == "python|1|10|0"
+
+        schema_manager.return_value.load_ingest_state.return_value = None
+        main(["data.ndjson", "--close-missing"])
+        assert backfill.call_args.kwargs["scope"] is None
@@ -0,0 +1,58 @@
+from unittest.mock import MagicMock, patch
+
+import psycopg2
+
+from src.bulk_loader import BulkLoader, batched, copy_buffer
+
+
+def test_batched() -> None:
+    """
+    Проверяем разбиение последовательности на пакеты.
+    @return: None
+    """
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(batched([], 2)) == []
+
+
+def test_copy_buffer() -> None:
+    """
+    Проверяем формирование буфера в текстовом формате COPY (NULL, логические значения, экранирование).
+    @return: None
+    """
+    buffer = copy_buffer([(1, None, True, "a\tb\nc\\d"), ("2", "", False, 3.5)])
+    assert buffer.read() == "1\t\\N\tt\ta\\tb\\nc\\\\d\n2\t\tf\t3.5\n"
+
+
+def test_load_with_copy() -> None:
+    """
+    Проверяем загрузку пакетами через COPY FROM STDIN.
+    @return: None
+    """
+    cursor = MagicMock()
+    loader = BulkLoader(cursor, batch_size=2)
+
+    count = loader.load("vacancies", ("vacancy_id", "vacancy_name"), [(1, "a"), (2, "b"), (3, "c")])
+
+    assert count == 3
+    assert cursor.copy_expert.call_count == 2
+    assert cursor.copy_expert.call_args_list[0].args[1].read() == "1\ta\n2\tb\n"
+
+
+@patch("src.bulk_loader.execute_values")
+def test_load_fallback_to_execute_values(mock_execute_values: MagicMock) -> None:
+    """
+    Проверяем переключение на execute_values, если COPY завершился ошибкой.
+    @param mock_execute_values: Заглушка для функции execute_values.
+    @return: None
+    """
+    cursor = MagicMock()
+    cursor.copy_expert.side_effect = psycopg2.Error("COPY is not supported")
+    loader = BulkLoader(cursor, batch_size=2)
+
+    count = loader.load("vacancies", ("vacancy_id", "vacancy_name"), [(1, "a"), (2, "b"), (3, "c")])
+
+    assert count == 3
+    # COPY больше не используется после первой ошибки
+    assert cursor.copy_expert.call_count == 1
+    cursor.execute.assert_any_call("ROLLBACK TO SAVEPOINT bulk_copy")
+    assert [call.args[2] for call in mock_execute_values.call_args_list] == [[(1, "a"), (2, "b")], [(3, "c")]]
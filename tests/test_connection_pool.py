@@ -0,0 +1,140 @@
+import threading
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+from psycopg2.pool import PoolError
+
+from src.connection_pool import ConnectionPool, close_all_pools, get_pool, release_pool
+from src.db_manager import DBManager
+
+
+@pytest.fixture
+def mock_connect() -> Iterator[MagicMock]:
+    """
+    Заглушка для функции psycopg2.connect, возвращающая новое соединение при каждом вызове.
+    @return: Заглушка для функции psycopg2.connect.
+    """
+    with patch("psycopg2.connect") as mock:
+        mock.side_effect = lambda *args, **kwargs: MagicMock(closed=0)
+        yield mock
+    close_all_pools()
+
+
+def test_connection_reuse(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что соединение возвращается в пул и используется повторно.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    with ConnectionPool({"host": "localhost"}, "headhunter", min_size=1, max_size=2) as pool:
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+    assert first is second
+    assert mock_connect.call_count == 1
+    mock_connect.assert_called_with(dbname="headhunter", host="localhost")
+
+
+def test_broken_connection_replaced(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что разорванное соединение заменяется новым.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    with ConnectionPool({}, "headhunter", min_size=1, max_size=2) as pool:
+        with pool.connection() as first:
+            first.closed = 2
+        with pool.connection() as second:
+            pass
+
+    assert first is not second
+    assert mock_connect.call_count == 2
+
+
+def test_wait_for_free_connection(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что при занятых соединениях поток ждёт освобождения соединения, а по истечении времени ожидания
+    получает ошибку PoolError.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    pool = ConnectionPool({}, "headhunter", min_size=1, max_size=1, timeout=0.05)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def hold_connection() -> None:
+        with pool.connection():
+            acquired.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold_connection)
+    thread.start()
+    acquired.wait()
+
+    with pytest.raises(PoolError):
+        with pool.connection():
+            pass
+
+    release.set()
+    thread.join()
+    with pool.connection():
+        pass
+    pool.close()
+    assert mock_connect.call_count == 1
+
+
+def test_get_pool_keyed_by_database(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что общий пул создаётся один раз для каждой базы данных.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    params = {"host": "localhost", "port": 5433}
+    assert get_pool(params, "headhunter") is get_pool(dict(params), "headhunter")
+    assert get_pool(params, "headhunter") is not get_pool(params, "postgres")
+
+
+def test_release_pool(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что общий пул закрывается, только когда его освободили все владельцы, и что закрытие DBManager
+    не закрывает пул, который использует другой экземпляр.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    pool = get_pool({}, "headhunter")
+    assert get_pool({}, "headhunter") is pool
+    release_pool(pool)
+    assert not pool.closed
+    release_pool(pool)
+    assert pool.closed
+
+    with DBManager({}) as first:
+        first.get_avg_salary(data_base_name="headhunter")
+        with DBManager({}) as second:
+            second.get_avg_salary(data_base_name="headhunter")
+        shared = get_pool({}, "headhunter")
+        assert not shared.closed
+        first.get_avg_salary(data_base_name="postgres")
+    release_pool(shared)
+    assert shared.closed
+
+
+def test_db_manager_uses_pool(mock_connect: MagicMock) -> None:
+    """
+    Проверяем, что DBManager не открывает новое соединение для каждого запроса.
+    @param mock_connect: Заглушка для функции psycopg2.connect.
+    @return: None
+    """
+    with DBManager({"host": "localhost"}) as dbm:
+        for _ in range(3):
+            dbm.get_avg_salary(data_base_name="headhunter")
+        threads = [threading.Thread(target=dbm.get_all_vacancies, args=("headhunter",)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert 1 <= mock_connect.call_count <= 4
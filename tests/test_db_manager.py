@@ -0,0 +1,111 @@
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.connection_pool import close_all_pools
+from src.db_manager import DBManager
+from src.query_cache import bump_generation
+
+
+@pytest.fixture
+def connection() -> Iterator[MagicMock]:
+    """
+    Заглушка для соединения с базой данных, которое возвращает функция psycopg2.connect.
+    @return: Заглушка для соединения psycopg2.
+    """
+    conn = MagicMock(closed=0)
+    with patch("psycopg2.connect", return_value=conn):
+        yield conn
+    close_all_pools()
+
+
+def test_iter_all_vacancies(connection: MagicMock) -> None:
+    """
+    Проверяем, что генератор вакансий читает строки через именованный (серверный) курсор порциями по itersize.
+    @param connection: Заглушка для соединения psycopg2.
+    @return: None
+    """
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.__iter__.return_value = iter([("Python-разработчик", "Компания", 100000, "RUR", "url")])
+
+    with DBManager({}) as dbm:
+        rows = dbm.iter_all_vacancies(data_base_name="headhunter", itersize=500)
+        connection.cursor.assert_not_called()  # Запрос выполняется только при чтении из генератора
+        assert list(rows) == [("Python-разработчик", "Компания", 100000, "RUR", "url")]
+
+    connection.cursor.assert_called_with(name="dbmanager_stream")
+    assert cursor.itersize == 500
+
+
+def test_iter_vacancies_with_keyword(connection: MagicMock) -> None:
+    """
+    Проверяем параметры запроса вакансий по ключевым словам.
+    @param connection: Заглушка для соединения psycopg2.
+    @return: None
+    """
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.__iter__.return_value = iter([])
+
+    with DBManager({}) as dbm:
+        assert list(dbm.iter_vacancies_with_keyword(data_base_name="headhunter", keywords="python django")) == []
+
+    query, params = cursor.execute.call_args.args
+    assert "ILIKE" in query
+    # Шаблоны подставляются в условие поиска и в выражение ранжирования
+    assert params == ["%python%", "%django%", "%python%", "%django%"]
+
+
+def test_query_cache(connection: MagicMock) -> None:
+    """
+    Проверяем, что повторный запрос выполняется из кэша, пока поколение данных базы не изменится.
+    @param connection: Заглушка для соединения psycopg2.
+    @return: None
+    """
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [(150000.0, "RUR")]
+
+    def queries() -> int:
+        # Проверки соединений пулом (SELECT 1) не учитываются
+        return sum(call.args[0] != "SELECT 1" for call in cursor.execute.call_args_list)
+
+    with DBManager({}) as dbm:
+        assert dbm.get_avg_salary(data_base_name="headhunter") == [(150000.0, "RUR")]
+        assert dbm.get_avg_salary(data_base_name="headhunter") == [(150000.0, "RUR")]
+        assert queries() == 1
+
+        # Запросы с другими параметрами кэшируются отдельно
+        dbm.get_vacancies_with_keyword(data_base_name="headhunter", keywords="python")
+        dbm.get_vacancies_with_keyword(data_base_name="headhunter", keywords="django")
+        assert queries() == 3
+
+        # После загрузки данных результат запрашивается заново
+        bump_generation("headhunter")
+        dbm.get_avg_salary(data_base_name="headhunter")
+        assert queries() == 4
+        assert dbm.cache_stats == {"hits": 1, "misses": 4}
+
+
+def test_page_all_vacancies(connection: MagicMock) -> None:
+    """
+    Проверяем, что следующая страница запрашивается после ключа последней строки предыдущей страницы.
+    @param connection: Заглушка для соединения psycopg2.
+    @return: None
+    """
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchall.return_value = [
+        ("Python-разработчик", "Компания", 100000, "RUR", "url", "Python-разработчик", 1),
+        ("Python-разработчик", "Компания", None, None, "url", "Python-разработчик", 2),
+    ]
+
+    with DBManager({}) as dbm:
+        page = dbm.page_all_vacancies(data_base_name="headhunter", limit=1)
+        assert page.rows == [("Python-разработчик", "Компания", 100000, "RUR", "url")]
+        query, params = cursor.execute.call_args.args
+        assert "WHERE NOT vacancies.closed AND TRUE" in query
+        assert params == [2]
+
+        dbm.page_all_vacancies(data_base_name="headhunter", cursor=page.next_cursor, limit=1)
+        query, params = cursor.execute.call_args.args
+        assert "(vacancy_name, vacancy_id) > (%s, %s)" in query
+        assert params == ["Python-разработчик", 1, 2]
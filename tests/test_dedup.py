@@ -0,0 +1,39 @@
+import pytest
+
+from src.dedup import EmployerIndex
+
+
+@pytest.mark.parametrize("max_in_memory", [None, 2])
+def test_add(max_in_memory: int | None) -> None:
+    """
+    Проверяем исключение повторов и сохранение первой встреченной записи о работодателе.
+    @param max_in_memory: Максимальное количество работодателей в памяти.
+    @return: None
+    """
+    employers = [{"id": str(i % 5), "name": "Компания %d" % i} for i in range(20)]
+
+    with EmployerIndex(max_in_memory=max_in_memory) as index:
+        first_seen = [employer for employer in employers if index.add(employer)]
+
+        assert [employer["id"] for employer in first_seen] == ["0", "1", "2", "3", "4"]
+        assert len(index) == 5
+        assert "3" in index
+        assert "5" not in index
+        assert list(index.records()) == employers[:5]
+
+
+def test_spill_path(tmpdir: str) -> None:
+    """
+    Проверяем, что индекс на диске сохраняется в указанный файл.
+    @param tmpdir: Временный каталог.
+    @return: None
+    """
+    spill_path = str(tmpdir.join("employers.sqlite"))
+    with EmployerIndex(max_in_memory=1, spill_path=spill_path) as index:
+        assert index.add({"id": "1"})
+        assert index.add({"id": "2"})
+        # Работодатель "1" вытеснен из памяти, но найден в индексе на диске
+        assert not index.add({"id": "1"})
+
+    with EmployerIndex(max_in_memory=1, spill_path=spill_path) as index:
+        assert "1" in index
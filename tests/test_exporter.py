@@ -0,0 +1,75 @@
+import gzip
+import io
+import os
+from pathlib import Path
+from typing import IO
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.exporter import copy_to, export_format
+
+
+@pytest.fixture
+def cursor() -> MagicMock:
+    """
+    Заглушка для курсора psycopg2: COPY записывает в файл две строки CSV.
+    @return: Заглушка для курсора.
+    """
+    cur = MagicMock(rowcount=1)
+
+    def copy_expert(command: object, file: IO[bytes]) -> None:
+        file.write("vacancy_id,vacancy_name\n1,Python-разработчик\n".encode("utf-8"))
+
+    cur.copy_expert.side_effect = copy_expert
+    return cur
+
+
+def test_export_format() -> None:
+    """
+    Проверяем определение формата выгрузки по расширению файла.
+    @return: None
+    """
+    assert export_format("vacancies.csv") == ("csv", False)
+    assert export_format("data/vacancies.NDJSON.gz") == ("ndjson", True)
+    assert export_format("vacancies.jsonl") == ("ndjson", False)
+    with pytest.raises(ValueError):
+        export_format("vacancies.xlsx")
+
+
+def test_copy_to_file(cursor: MagicMock, tmp_path: Path) -> None:
+    """
+    Проверяем выгрузку в сжатый файл: формат и сжатие определяются по расширению, временный файл не остаётся.
+    @param cursor: Заглушка для курсора psycopg2.
+    @return: None
+    """
+    file_name = str(tmp_path / "vacancies.ndjson.gz")
+    assert copy_to(cursor, "SELECT 1", file_name) == 1
+
+    command = str(cursor.copy_expert.call_args.args[0])
+    assert "row_to_json" in command and "TO STDOUT" in command
+    with gzip.open(file_name, "rt", encoding="utf-8") as file:
+        assert file.read() == "vacancy_id,vacancy_name\n1,Python-разработчик\n"
+    assert os.listdir(str(tmp_path)) == ["vacancies.ndjson.gz"]
+
+
+def test_copy_to_file_object(cursor: MagicMock, tmp_path: Path) -> None:
+    """
+    Проверяем выгрузку в файловый объект и удаление временного файла при ошибке выгрузки.
+    @param cursor: Заглушка для курсора psycopg2.
+    @return: None
+    """
+    buffer = io.BytesIO()
+    copy_to(cursor, "SELECT 1", buffer)
+    assert "HEADER" in str(cursor.copy_expert.call_args.args[0])
+    assert buffer.getvalue().decode("utf-8").startswith("vacancy_id")
+
+    cursor.copy_expert.side_effect = RuntimeError
+    with pytest.raises(RuntimeError):
+        copy_to(cursor, "SELECT 1", str(tmp_path / "vacancies.csv"))
+    assert os.listdir(str(tmp_path)) == []
+
+    # Ошибка открытия файла не подменяется ошибкой удаления несозданного временного файла
+    with patch("src.exporter.open", side_effect=OSError("No space left on device"), create=True):
+        with pytest.raises(OSError, match="No space left"):
+            copy_to(cursor, "SELECT 1", str(tmp_path / "vacancies.csv"))
@@ -1,53 +1,203 @@
+import time
+from datetime import datetime, timedelta
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.headhunter_api import HeadHunterAPI
+from src.headhunter_api import BASE_URL, HeadHunterAPI
+from src.http_client import HttpClient
+from tests.conftest import StubServer
 
 
 @pytest.fixture
 def hh_api() -> HeadHunterAPI:
     """
     Заглушка для API.
-    @return: экземпляр класса HeadHunterAPI.
+    @return: экземпляр класса HeadHunterAPI с заглушкой HTTP-клиента.
     """
-    return HeadHunterAPI()
+    return HeadHunterAPI(client=MagicMock())
 
 
-@patch("src.headhunter_api.requests.get")
-def test_connect_to_api(mock_get: MagicMock, hh_api: MagicMock) -> None:
+def test_load_vacancies(hh_api: HeadHunterAPI) -> None:
     """
-    Проверяем подключение к API.
-    @param mock_get: Заглушка для метода requests.get.
-    @param hh_api: Заглушка для экземпляра класса HeadHunterAPI.
-    @return:
+    Проверяем получение данных из API.
+    @param hh_api: Экземпляр класса HeadHunterAPI с заглушкой HTTP-клиента.
+    @return: None
     """
-    mock_response = mock_get.return_value  # Заглушка для имитации валидного ответа.
-    mock_response.raise_for_status.return_value = None  # Заглушка для имитации ответа None из метода __connect_to_api.
+    with patch.object(hh_api.client, "get") as mock_get:
+        mock_response = mock_get.return_value
+        mock_response.raise_for_status.return_value = None
+        mock_response.json.return_value = {"items": [{"id": 1, "name": "Охраняющий"}]}
 
-    response = hh_api._HeadHunterAPI__connect_to_api()
-    assert response is not None
-    mock_get.assert_called_once_with(hh_api._HeadHunterAPI__url)
+        vacancies = hh_api.load_vacancies("Python")
+
+    assert len(vacancies) == 1
+    assert vacancies[0]["id"] == 1
+    assert vacancies[0]["name"] == "Охраняющий"
+    # Проверочный запрос к API без параметров не выполняется, страница запрашивается один раз
+    mock_get.assert_called_once_with(
+        BASE_URL,
+        headers={"User-Agent": "HH-User-Agent"},
+        params={"text": "Python", "per_page": 10, "only_with_salary": True, "page": 0},
+    )
 
 
-@patch("src.headhunter_api.requests.get")
-def test_load_vacancies(mock_get: MagicMock, hh_api: MagicMock) -> None:
+def test_load_vacancies_pages(stub_server: StubServer) -> None:
     """
-    Проверяем получение данных из API.
-    @param mock_get: Заглушка для метода requests.get.
-    @param hh_api: Заглушка для экземпляра класса HeadHunterAPI.
+    Проверяем параллельную загрузку нескольких страниц и объединение результатов в порядке страниц.
+    @param stub_server: Локальный HTTP-сервер.
     @return: None
     """
-    mock_response = mock_get.return_value
-    mock_response.raise_for_status.return_value = None
-    mock_response.json.return_value = {"items": [{"id": 1, "name": "Охраняющий"}]}
+    delay = 0.3
 
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        page = int(params["page"])
+        time.sleep(delay * (5 - page) / 5)  # Первые страницы отвечают дольше последних
+        per_page = int(params.get("per_page", 10))
+        return 200, {}, {"items": [{"id": str(page * per_page + i)} for i in range(per_page)]}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(url=stub_server.url + "/vacancies", pages=5, per_page=3, client=HttpClient())
+
+    start = time.perf_counter()
     vacancies = hh_api.load_vacancies("Python")
-    assert len(vacancies) == 1
-    assert vacancies[0]["id"] == 1
-    assert vacancies[0]["name"] == "Охраняющий"
-    mock_get.assert_called_with(
-        hh_api._HeadHunterAPI__url,
-        headers=hh_api._HeadHunterAPI__headers,
-        params=hh_api._HeadHunterAPI__params,
+    elapsed = time.perf_counter() - start
+
+    assert [vacancy["id"] for vacancy in vacancies] == [str(i) for i in range(15)]
+    assert sorted(int(params["page"]) for path, params in stub_server.requests) == list(range(5))
+    # Последовательная загрузка заняла бы около 0.9 с, параллельная - около времени самой медленной страницы
+    assert elapsed < 2 * delay
+
+
+def test_load_vacancies_page_error(stub_server: StubServer) -> None:
+    """
+    Проверяем, что ошибка при загрузке одной страницы не прерывает загрузку остальных.
+    @param stub_server: Локальный HTTP-сервер.
+    @return: None
+    """
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        if params.get("page") == "1":
+            return 400, {}, {"errors": [{"type": "bad_argument"}]}
+        return 200, {}, {"items": [{"id": params.get("page")}]}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(url=stub_server.url + "/vacancies", pages=3, per_page=1, client=HttpClient())
+
+    vacancies = hh_api.load_vacancies("Python")
+    assert [vacancy["id"] for vacancy in vacancies] == ["0", "2"]
+
+
+def test_iter_vacancies_strict(stub_server: StubServer) -> None:
+    """
+    Проверяем, что с strict ошибка загрузки страницы прерывает потоковую загрузку, а без strict страница
+    пропускается.
+    @param stub_server: Локальный HTTP-сервер.
+    @return: None
+    """
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        if params.get("page") == "1":
+            return 500, {}, {"errors": [{"type": "server_error"}]}
+        return 200, {}, {"items": [{"id": params.get("page")}]}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(
+        url=stub_server.url + "/vacancies", pages=3, per_page=1, max_workers=1, client=HttpClient(max_retries=0)
     )
+
+    pages = list(hh_api.iter_vacancies(["python"]))
+    assert sorted(page[0]["id"] for page in pages) == ["0", "2"]
+    with pytest.raises(RuntimeError):
+        list(hh_api.iter_vacancies(["python"], strict=True))
+
+
+def test_load_vacancies_many(stub_server: StubServer) -> None:
+    """
+    Проверяем загрузку по нескольким ключевым словам с исключением повторов вакансий и сохранением ключевых слов.
+    @param stub_server: Локальный HTTP-сервер.
+    @return: None
+    """
+    found = {"python": ["1", "2", "3", "4"], "django": ["3", "5", "1", "6"]}
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        page, per_page = int(params["page"]), int(params["per_page"])
+        ids = found[params["text"].lower()][page * per_page : (page + 1) * per_page]
+        return 200, {}, {"items": [{"id": vacancy_id} for vacancy_id in ids]}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(url=stub_server.url + "/vacancies", pages=2, per_page=2, client=HttpClient())
+
+    vacancies = hh_api.load_vacancies_many(["python", "django", " Python ", ""])
+
+    assert [vacancy["id"] for vacancy in vacancies] == ["1", "2", "3", "4", "5", "6"]
+    assert [vacancy["matched_keywords"] for vacancy in vacancies] == [
+        ["python", "django"],
+        ["python"],
+        ["python", "django"],
+        ["python"],
+        ["django"],
+        ["django"],
+    ]
+    # Повтор ключевого слова не приводит к повторной загрузке страниц
+    assert len(stub_server.requests) == 4
+
+
+def test_crawl_vacancies(stub_server: StubServer) -> None:
+    """
+    Проверяем, что запрос, по которому найдено больше вакансий, чем выдаёт API, делится на окна дат публикации,
+    и в результате оказываются все вакансии без повторов.
+    @param stub_server: Локальный HTTP-сервер.
+    @return: None
+    """
+    max_results = 20
+    date_to = datetime(2024, 12, 1)
+    # 95 вакансий, опубликованных с интервалом в минуту (вакансия "0" - самая поздняя)
+    published = {str(number): date_to - timedelta(minutes=number) for number in range(95)}
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        page, per_page = int(params["page"]), int(params["per_page"])
+        if (page + 1) * per_page > max_results:
+            return 400, {}, {"errors": [{"type": "bad_argument", "value": "page"}]}
+        date_from = datetime.fromisoformat(params["date_from"])
+        window_end = datetime.fromisoformat(params["date_to"])
+        ids = [vacancy_id for vacancy_id, date in published.items() if date_from <= date <= window_end]
+        items = [{"id": vacancy_id} for vacancy_id in ids[page * per_page : (page + 1) * per_page]]
+        return 200, {}, {"items": items, "found": len(ids), "pages": (len(ids) + per_page - 1) // per_page}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(url=stub_server.url + "/vacancies", per_page=5, client=HttpClient())
+
+    vacancies = hh_api.crawl_vacancies(
+        ["python"], date_from=date_to - timedelta(minutes=100), date_to=date_to, max_results=max_results
+    )
+
+    assert [vacancy["id"] for vacancy in vacancies] == [str(number) for number in range(95)]
+    assert all(vacancy["matched_keywords"] == ["python"] for vacancy in vacancies)
+    # Запросы за пределами доступной глубины выдачи не выполняются
+    assert all(int(params["page"]) < max_results // 5 for path, params in stub_server.requests)
+
+
+def test_crawl_keeps_probe_page(stub_server: StubServer) -> None:
+    """
+    Проверяем, что вакансии первой страницы разделённого окна попадают в результат, даже если окна-части
+    загрузить не удалось, и что конец периода по умолчанию передаётся с часовым поясом.
+    @param stub_server: Локальный HTTP-сервер.
+    @return: None
+    """
+    probe_params: list[dict] = []
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, dict]:
+        window = (params["date_from"], params["date_to"])
+        if probe_params and window != (probe_params[0]["date_from"], probe_params[0]["date_to"]):
+            return 500, {}, {"errors": [{"type": "server_error"}]}
+        probe_params.append(params)
+        return 200, {}, {"items": [{"id": str(number)} for number in range(5)], "found": 100, "pages": 20}
+
+    stub_server.handler = handler
+    hh_api = HeadHunterAPI(url=stub_server.url + "/vacancies", per_page=5, client=HttpClient(max_retries=0))
+
+    vacancies = hh_api.crawl_vacancies(["python"], max_results=20)
+
+    assert [vacancy["id"] for vacancy in vacancies] == [str(number) for number in range(5)]
+    assert datetime.fromisoformat(probe_params[0]["date_to"]).utcoffset() == timedelta(0)
@@ -0,0 +1,137 @@
+import time
+from email.utils import formatdate
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+
+from src.http_client import HttpClient
+from src.response_cache import ResponseCache
+from tests.conftest import StubServer
+
+
+@pytest.fixture
+def client() -> HttpClient:
+    """
+    Фикстура экземпляра класса HttpClient.
+    @return: Экземпляр класса HttpClient.
+    """
+    return HttpClient(pool_size=2, timeout=5, max_retries=3, backoff_factor=0.01)
+
+
+def test_keep_alive(stub_server: StubServer, client: HttpClient) -> None:
+    """
+    Проверяем, что последовательные запросы используют одно соединение из пула.
+    @param stub_server: Локальный HTTP-сервер.
+    @param client: Экземпляр класса HttpClient.
+    @return: None
+    """
+    for page in range(5):
+        response = client.get(stub_server.url + "/vacancies", params={"page": page})
+        assert response.status_code == 200
+
+    assert len(stub_server.requests) == 5
+    assert len(stub_server.connections) == 1
+
+
+@patch("src.http_client.time.sleep")
+def test_retry_on_server_error(mock_sleep: MagicMock, stub_server: StubServer, client: HttpClient) -> None:
+    """
+    Проверяем повторные попытки при статус-коде 503 и соблюдение заголовка Retry-After.
+    @param mock_sleep: Заглушка для метода time.sleep.
+    @param stub_server: Локальный HTTP-сервер.
+    @param client: Экземпляр класса HttpClient.
+    @return: None
+    """
+    responses = iter([(503, {}, {}), (429, {"Retry-After": "7"}, {}), (200, {}, {"items": [1]})])
+    stub_server.handler = lambda path, params, headers: next(responses)
+
+    response = client.get(stub_server.url + "/vacancies")
+
+    assert response.status_code == 200
+    assert response.json() == {"items": [1]}
+    assert len(stub_server.requests) == 3
+    delays = [call.args[0] for call in mock_sleep.call_args_list]
+    assert 0 <= delays[0] <= 0.01
+    assert delays[1] == 7
+
+
+@patch("src.http_client.time.sleep")
+def test_retry_exhausted(mock_sleep: MagicMock, stub_server: StubServer, client: HttpClient) -> None:
+    """
+    Проверяем, что после исчерпания попыток возвращается последний ответ сервера.
+    @param mock_sleep: Заглушка для метода time.sleep.
+    @param stub_server: Локальный HTTP-сервер.
+    @param client: Экземпляр класса HttpClient.
+    @return: None
+    """
+    stub_server.handler = lambda path, params, headers: (500, {}, {})
+
+    response = client.get(stub_server.url + "/vacancies")
+
+    assert response.status_code == 500
+    assert len(stub_server.requests) == 4
+    assert mock_sleep.call_count == 3
+
+
+@patch("src.http_client.time.sleep")
+def test_no_retry_on_client_error(mock_sleep: MagicMock, stub_server: StubServer, client: HttpClient) -> None:
+    """
+    Проверяем, что при статус-коде 400 повторные попытки не выполняются.
+    @param mock_sleep: Заглушка для метода time.sleep.
+    @param stub_server: Локальный HTTP-сервер.
+    @param client: Экземпляр класса HttpClient.
+    @return: None
+    """
+    stub_server.handler = lambda path, params, headers: (400, {}, {})
+
+    assert client.get(stub_server.url + "/vacancies").status_code == 400
+    assert len(stub_server.requests) == 1
+    mock_sleep.assert_not_called()
+
+
+def test_retry_after_http_date() -> None:
+    """
+    Проверяем разбор заголовка Retry-After в формате HTTP-даты.
+    @return: None
+    """
+    response = requests.Response()
+    response.headers["Retry-After"] = formatdate(usegmt=True)
+    delay = HttpClient._retry_after(response)
+    assert delay is not None and 0 <= delay <= 1
+
+    response.headers["Retry-After"] = "invalid"
+    assert HttpClient._retry_after(response) is None
+
+
+def test_cached_response(stub_server: StubServer, tmpdir: str) -> None:
+    """
+    Проверяем, что свежий ответ выдаётся из кэша без запроса к серверу, а устаревший проверяется по ETag.
+    @param stub_server: Локальный HTTP-сервер.
+    @param tmpdir: Каталог для файла кэша.
+    @return: None
+    """
+
+    def handler(path: str, params: dict, headers: dict) -> tuple[int, dict, Any]:
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"ETag": '"v1"'}, {"items": [params["page"]]}
+
+    stub_server.handler = handler
+    cache = ResponseCache(path=str(tmpdir.join("cache.sqlite")), ttl=60)
+
+    with HttpClient(cache=cache) as client:
+        assert client.get(stub_server.url + "/vacancies", params={"page": "1"}).json() == {"items": ["1"]}
+        assert client.get(stub_server.url + "/vacancies", params={"page": "1"}).json() == {"items": ["1"]}
+        assert len(stub_server.requests) == 1
+
+        # Запись устарела: выполняется условный запрос, сервер отвечает 304, тело берётся из кэша
+        with patch("src.response_cache.time.time", return_value=time.time() + 120):
+            response = client.get(stub_server.url + "/vacancies", params={"page": "1"})
+        assert response.status_code == 200
+        assert response.json() == {"items": ["1"]}
+        assert len(stub_server.requests) == 2
+
+    assert cache.stats == {"hits": 1, "misses": 1, "revalidated": 1, "stored": 1, "evicted": 0}
+    cache.close()
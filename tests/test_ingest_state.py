@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from src.ingest_state import IngestState, is_fresh, load_ingest_state, save_ingest_state
+
+NOW = datetime(2024, 12, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_is_fresh() -> None:
+    """
+    Проверяем, что данные используются повторно только при тех же параметрах загрузки и не старше max_age.
+    Ключевые слова сравниваются без учёта регистра, пробелов и порядка.
+    @return: None
+    """
+    requested = IngestState(keywords="python, Django", pages=1, per_page=10, crawl=False)
+    state = IngestState(keywords="django,python", pages=1, per_page=10, crawl=False, ingested_at=NOW)
+
+    assert is_fresh(state, requested, timedelta(hours=12), now=NOW + timedelta(hours=1))
+    assert not is_fresh(state, requested, timedelta(hours=12), now=NOW + timedelta(hours=13))
+    assert not is_fresh(None, requested, now=NOW)
+    assert not is_fresh(state, IngestState("python", 1, 10, False), now=NOW)
+    assert not is_fresh(state, IngestState("python,django", 2, 10, False), now=NOW)
+    assert state.request_key == requested.request_key == "django,python|1|10|0"
+
+
+def test_save_and_load() -> None:
+    """
+    Проверяем запись нормализованных ключевых слов и чтение последней загрузки.
+    @return: None
+    """
+    cur = MagicMock()
+    save_ingest_state(cur, IngestState(keywords="Python, django", pages=1, per_page=10, crawl=True))
+    assert cur.execute.call_args.args[1] == ["django,python", 1, 10, True]
+
+    cur.fetchone.return_value = ("django,python", 1, 10, True, NOW, 100)
+    assert load_ingest_state(cur) == IngestState("django,python", 1, 10, True, NOW, 100)
+    cur.fetchone.return_value = None
+    assert load_ingest_state(cur) is None
@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from src.instrumentation import _NULL_SPAN, Instrumentation
+
+
+@pytest.fixture
+def instrumentation() -> Instrumentation:
+    """
+    Создаём отдельный экземпляр Instrumentation, чтобы не менять общий экземпляр проекта.
+    @return: Экземпляр Instrumentation.
+    """
+    return Instrumentation()
+
+
+def test_disabled(instrumentation: Instrumentation) -> None:
+    """
+    Проверяем, что отключённое инструментирование ничего не записывает.
+    @return: None
+    """
+
+    @instrumentation.timed("test.function")
+    def function() -> int:
+        return 1
+
+    assert instrumentation.span("test.span") is _NULL_SPAN
+    with instrumentation.span("test.span"):
+        instrumentation.count("test.counter")
+    assert function() == 1
+    assert instrumentation.snapshot() == {"spans": [], "counters": []}
+
+
+def test_spans_and_counters(instrumentation: Instrumentation) -> None:
+    """
+    Проверяем запись интервалов (в том числе завершившихся исключением), счётчиков и генераторных функций.
+    @return: None
+    """
+
+    @instrumentation.timed("test.generator", kind="gen")
+    def generator() -> Iterator[int]:
+        yield from range(3)
+
+    instrumentation.enable()
+    with instrumentation.span("test.span", table="vacancies"):
+        instrumentation.count("test.rows", 10, table="vacancies")
+        instrumentation.count("test.rows", 5, table="vacancies")
+    with pytest.raises(ValueError):
+        with instrumentation.span("test.span", table="vacancies"):
+            raise ValueError
+    assert list(generator()) == [0, 1, 2]
+
+    spans, counters = instrumentation.snapshot()["spans"], instrumentation.snapshot()["counters"]
+    assert [(span["name"], span["labels"], span["count"], span["errors"]) for span in spans] == [
+        ("test.generator", {"kind": "gen"}, 1, 0),
+        ("test.span", {"table": "vacancies"}, 2, 1),
+    ]
+    assert counters == [{"name": "test.rows", "labels": {"table": "vacancies"}, "value": 15}]
+
+    instrumentation.reset()
+    assert instrumentation.snapshot() == {"spans": [], "counters": []}
+
+
+def test_export(instrumentation: Instrumentation, tmp_path: Path) -> None:
+    """
+    Проверяем журнал интервалов (с родительским интервалом) и файл метрик Prometheus.
+    @return: None
+    """
+    log_path, metrics_path = str(tmp_path / "trace.jsonl"), str(tmp_path / "metrics.prom")
+    instrumentation.enable(log_path=log_path, metrics_path=metrics_path)
+    with instrumentation.span("test.outer"):
+        with instrumentation.span("test.inner", query='say "hi"'):
+            pass
+    instrumentation.count("test.pages")
+    instrumentation.export()
+    instrumentation.disable()
+
+    with open(log_path, encoding="utf-8") as file:
+        events = [json.loads(line) for line in file]
+    assert [(event["span"], event.get("parent")) for event in events] == [
+        ("test.inner", "test.outer"),
+        ("test.outer", None),
+    ]
+    assert events[0]["labels"] == {"query": 'say "hi"'}
+
+    with open(metrics_path, encoding="utf-8") as file:
+        metrics = file.read()
+    assert "# TYPE hh_span_seconds summary" in metrics
+    assert 'hh_span_seconds_count{query="say \\"hi\\"",span="test.inner"} 1' in metrics
+    assert 'hh_events_total{counter="test.pages"} 1' in metrics
@@ -1,26 +1,38 @@
 import json
 import os
+from typing import Iterator
 
 import pytest
 
-from src.file_utils import JsonWorker
+from src.file_utils import JsonWorker, SnapshotWorker
+from src.models import Company
 
 
 @pytest.fixture
-def json_worker(tmpdir: str) -> JsonWorker:
+def file_name(tmpdir: str) -> str:
     """
-    Фикстура экземпляра класса JsonWorker.
+    Фикстура пути к json-файлу во временном каталоге.
     @param tmpdir: Имитирует расположение json-файла.
+    @return: Путь к json-файлу.
+    """
+    return str(tmpdir.join("test_data.json"))
+
+
+@pytest.fixture
+def json_worker(file_name: str) -> JsonWorker:
+    """
+    Фикстура экземпляра класса JsonWorker.
+    @param file_name: Путь к json-файлу.
     @return: Экземпляр класса JsonWorker.
     """
-    file_name = tmpdir.join("test_data.json")
-    return JsonWorker(file_name=str(file_name))
+    return JsonWorker(file_name=file_name)
 
 
-def test_write_file(json_worker: JsonWorker) -> None:
+def test_write_file(json_worker: JsonWorker, file_name: str) -> None:
     """
     Проверяем запись в json-файл.
     @param json_worker: Экземпляр класса JsonWorker.
+    @param file_name: Путь к json-файлу.
     @return: None
     """
     test_data = [
@@ -31,10 +43,10 @@ def test_write_file(json_worker: JsonWorker) -> None:
     json_worker.write_file(test_data)
 
     # Проверяем, что файл существует
-    assert os.path.exists(json_worker._JsonWorker__file_name)
+    assert os.path.exists(file_name)
 
     # Проверяем содержимое файла
-    with open(json_worker._JsonWorker__file_name, "r", encoding="utf-8") as file:
+    with open(file_name, "r", encoding="utf-8") as file:
         data = json.load(file)
         assert data == test_data
 
@@ -58,3 +70,133 @@ def test_read_file(json_worker: JsonWorker) -> None:
 
     # Проверяем, что прочитанные данные совпадают с тестовыми данными
     assert data == test_data
+
+
+def test_write_lines(json_worker: JsonWorker, file_name: str) -> None:
+    """
+    Проверяем запись в формате JSON Lines из генератора и потоковое чтение обратно.
+    @param json_worker: Экземпляр класса JsonWorker.
+    @param file_name: Путь к json-файлу.
+    @return: None
+    """
+    test_data = [{"name": "Holger Krekel", "age": 30}, {"name": "Bruno Oliveira", "age": 25}]
+
+    assert json_worker.write_lines(item for item in test_data) == 2
+
+    with open(file_name, "r", encoding="utf-8") as file:
+        assert len(file.readlines()) == 2
+
+    assert list(json_worker.iter_file()) == test_data
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1 << 16])
+def test_iter_file_array(json_worker: JsonWorker, file_name: str, chunk_size: int) -> None:
+    """
+    Проверяем потоковый разбор JSON-массива при разных размерах блока, в том числе когда элемент или число
+    разрезаны границей блока.
+    @param json_worker: Экземпляр класса JsonWorker.
+    @param file_name: Путь к json-файлу.
+    @param chunk_size: Размер читаемого блока.
+    @return: None
+    """
+    test_data = [{"name": "Holger Krekel", "tags": ["a, b", "]"]}, 1234567, [1, [2]], "строка", None]
+    with open(file_name, "w", encoding="utf-8") as file:
+        file.write("\n  " + json.dumps(test_data, ensure_ascii=False, indent=2))
+
+    assert list(json_worker.iter_file(chunk_size=chunk_size)) == test_data
+
+
+def test_iter_file_truncated(json_worker: JsonWorker, file_name: str) -> None:
+    """
+    Проверяем, что обрезанный JSON-массив приводит к ошибке.
+    @param json_worker: Экземпляр класса JsonWorker.
+    @param file_name: Путь к json-файлу.
+    @return: None
+    """
+    with open(file_name, "w", encoding="utf-8") as file:
+        file.write('[{"name": "Holger Krekel"}, {"name": "Bruno')
+
+    with pytest.raises(ValueError):
+        list(json_worker.iter_file(chunk_size=8))
+
+
+@pytest.fixture
+def vacancies() -> list[dict]:
+    """
+    Вакансии в формате ответа API (с полями, которые не сохраняются в снимке).
+    @return: Список вакансий.
+    """
+    employer = {"id": "1", "name": "Компания", "url": "url", "alternate_url": "alt", "trusted": True, "logo": None}
+    return [
+        {
+            "id": str(index),
+            "name": "Python-разработчик",
+            "published_at": "2024-12-01T10:00:00+0300",
+            "url": "url/%d" % index,
+            "employer": employer,
+            "salary": {"from": 100000, "to": None, "currency": "RUR", "gross": False} if index % 2 else None,
+            "snippet": {"requirement": "Python", "responsibility": None},
+            "area": {"name": "Москва"},
+        }
+        for index in range(5)
+    ]
+
+
+def test_snapshot(tmpdir: str, vacancies: list[dict]) -> None:
+    """
+    Проверяем запись снимка группами строк и восстановление полей, используемых при загрузке в базу данных.
+    @param tmpdir: Имитирует расположение файла снимка.
+    @param vacancies: Вакансии в формате ответа API.
+    @return: None
+    """
+    snapshot = SnapshotWorker(file_name=str(tmpdir.join("test.snapshot")), row_group_size=2)
+
+    assert snapshot.write_file(iter(vacancies)) == 5
+
+    data = snapshot.read_file()
+    assert len(data) == 5
+    assert (data[0].salary, data[0].salary_currency) == (None, None)
+    assert (data[1].salary, data[1].salary_currency) == (100000, "RUR")
+    assert data[1].company == Company("1", "Компания", "url", "alt", True)
+    assert data[1].company is data[0].company
+    assert (data[1].requirement, data[1].responsibility) == ("Python", None)
+
+    # Чтение одного столбца без распаковки остальных
+    assert snapshot.read_column("vacancy_id") == ["0", "1", "2", "3", "4"]
+    with pytest.raises(ValueError):
+        snapshot.read_column("area")
+
+
+def test_snapshot_interrupted(tmpdir: str, vacancies: list[dict]) -> None:
+    """
+    Проверяем, что прерванная запись не заменяет прежний снимок и не оставляет временный файл.
+    @param tmpdir: Имитирует расположение файла снимка.
+    @param vacancies: Вакансии в формате ответа API.
+    @return: None
+    """
+    file_name = str(tmpdir.join("test.snapshot"))
+    snapshot = SnapshotWorker(file_name=file_name, row_group_size=2)
+    snapshot.write_file(vacancies[:2])
+
+    def failing() -> Iterator[dict]:
+        yield from vacancies
+        raise RuntimeError("Failed to load page 1 for keyword 'python'")
+
+    with pytest.raises(RuntimeError):
+        snapshot.write_file(failing())
+
+    assert snapshot.read_column("vacancy_id") == ["0", "1"]
+    assert not os.path.exists(file_name + ".tmp")
+
+
+def test_snapshot_invalid_file(tmpdir: str) -> None:
+    """
+    Проверяем, что файл другого формата не читается как снимок.
+    @param tmpdir: Имитирует расположение файла.
+    @return: None
+    """
+    file_name = str(tmpdir.join("test_data.json"))
+    JsonWorker(file_name=file_name).write_file([{"id": "1"}])
+
+    with pytest.raises(ValueError):
+        SnapshotWorker(file_name=file_name).read_file()
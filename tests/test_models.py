@@ -0,0 +1,44 @@
+import sys
+
+from src.models import Company, Vacancy
+
+
+def test_vacancy_from_api(vacancy: dict) -> None:
+    """
+    Проверяем создание записи о вакансии: зарплата приводится к одному значению, фрагмент описания разбирается.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    record = Vacancy.from_api(vacancy)
+    assert record.company == Company("1480667", "Тагес Джамп", "", "", True)
+    assert (record.salary, record.salary_currency) == (114500, "RUR")
+    assert (record.requirement, record.responsibility) == ("Уверенно знаете Go.", None)
+
+    # Берётся верхняя граница диапазона
+    vacancy["salary"]["to"] = 150000
+    assert Vacancy.from_api(vacancy).salary == 150000
+
+    vacancy["salary"], vacancy["snippet"] = None, None
+    record = Vacancy.from_api(vacancy)
+    assert (record.salary, record.salary_currency, record.requirement) == (None, None, None)
+
+    # Зарплата без границ диапазона считается неуказанной
+    vacancy["salary"] = {"from": None, "to": None, "currency": "RUR"}
+    record = Vacancy.from_api(vacancy)
+    assert (record.salary, record.salary_currency) == (None, None)
+
+
+def test_shared_company(vacancy: dict) -> None:
+    """
+    Проверяем, что вакансии одной компании ссылаются на одну запись о компании, а записи компактнее словарей.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    companies: dict[str, Company] = {}
+    first = Vacancy.from_api(vacancy, companies)
+    second = Vacancy.from_api(dict(vacancy, id="2"), companies)
+
+    assert first.company is second.company
+    assert list(companies) == ["1480667"]
+    assert not hasattr(first, "__dict__")
+    assert sys.getsizeof(first) < sys.getsizeof(vacancy)
@@ -0,0 +1,38 @@
+import pytest
+
+from src.pagination import decode_cursor, encode_cursor, make_page, page_limit
+
+
+def test_cursor() -> None:
+    """
+    Проверяем, что ключ восстанавливается из курсора без потерь, а повреждённый курсор отклоняется.
+    @return: None
+    """
+    key = ["Python-разработчик", 9223372036854775807, 0.1]
+    cursor = encode_cursor(key)
+    assert cursor.isascii() and "=" not in cursor
+    assert decode_cursor(cursor, 3) == key
+
+    with pytest.raises(ValueError):
+        decode_cursor("не курсор", 3)
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 2)
+
+
+def test_make_page() -> None:
+    """
+    Проверяем, что лишняя строка определяет наличие следующей страницы, а столбцы ключа не попадают в страницу.
+    @return: None
+    """
+    rows = [("a", 100, "a", 1), ("b", 200, "b", 2), ("c", 300, "c", 3)]
+    page = make_page(rows, key_size=2, limit=2)
+    assert page.rows == [("a", 100), ("b", 200)]
+    assert page.next_cursor is not None
+    assert decode_cursor(page.next_cursor, 2) == ["b", 2]
+
+    page = make_page(rows, key_size=2, limit=3)
+    assert len(page.rows) == 3
+    assert page.next_cursor is None
+
+    with pytest.raises(ValueError):
+        page_limit(0)
@@ -0,0 +1,100 @@
+import time
+from typing import Iterator
+
+import pytest
+
+from src.models import Vacancy
+from src.pipeline import Pipeline, normalize_page
+
+
+def test_stages_overlap() -> None:
+    """
+    Проверяем, что источник и приёмник работают одновременно, а источник не уходит вперёд больше, чем позволяют
+    очереди.
+    @return: None
+    """
+    delay = 0.05
+    produced: list[int] = []
+    consumed: list[int] = []
+
+    def source() -> Iterator[list[int]]:
+        for page in range(10):
+            time.sleep(delay)
+            produced.append(page)
+            yield [page]
+
+    def sink(items: Iterator[int]) -> int:
+        for item in items:
+            # Страницы, полученные источником, но ещё не обработанные приёмником: по queue_size в двух очередях
+            # и по одной странице у источника, стадии и приёмника
+            assert len(produced) - len(consumed) <= 2 * 2 + 3
+            time.sleep(delay)
+            consumed.append(item)
+        return len(consumed)
+
+    pipeline = Pipeline(source(), stages=[lambda page: page], queue_size=2)
+    start = time.perf_counter()
+    assert pipeline.run(sink) == 10
+    elapsed = time.perf_counter() - start
+
+    assert consumed == list(range(10))
+    # Последовательное выполнение заняло бы около 20 * delay
+    assert elapsed < 15 * delay
+    assert set(pipeline.busy_time) == {"source", "<lambda>", "sink"}
+
+
+def test_stage_error() -> None:
+    """
+    Проверяем, что ошибка стадии прерывает приёмник и передаётся вызывающему коду.
+    @return: None
+    """
+
+    def stage(page: list[int]) -> list[int]:
+        if page == [3]:
+            raise ValueError("bad page")
+        return page
+
+    consumed = []
+
+    def sink(items: Iterator[int]) -> None:
+        for item in items:
+            consumed.append(item)
+
+    with pytest.raises(ValueError, match="bad page"):
+        Pipeline(([page] for page in range(10)), stages=[stage]).run(sink)
+    assert consumed == [0, 1, 2]
+
+
+def test_normalize_page() -> None:
+    """
+    Проверяем, что стадия нормализации преобразует вакансии в записи, а вакансии одной компании ссылаются на одну
+    запись о компании.
+    @return: None
+    """
+    employer: dict = {
+        "id": "2",
+        "name": "Компания",
+        "url": None,
+        "alternate_url": None,
+        "trusted": True,
+        "logo_urls": {},
+    }
+    page = [
+        {
+            "id": str(index),
+            "name": "Python-разработчик",
+            "area": {"name": "Москва"},
+            "employer": dict(employer),
+            "salary": {"from": 100, "to": None, "currency": "RUR", "gross": True},
+            "published_at": "2024-12-01T10:00:00+0300",
+            "url": "url",
+            "snippet": None,
+        }
+        for index in range(2)
+    ]
+
+    first, second = normalize_page(page)
+
+    assert isinstance(first, Vacancy)
+    assert (first.salary, first.salary_currency, first.requirement) == (100, "RUR", None)
+    assert first.company is second.company
@@ -0,0 +1,41 @@
+from src.query_cache import QueryCache, bump_generation, data_generation
+
+
+def test_lru_eviction() -> None:
+    """
+    Проверяем вытеснение давно не использованных результатов и то, что большие результаты не кэшируются.
+    @return: None
+    """
+    cache = QueryCache(max_size=2, max_rows=3)
+    cache.put("a", 0, [1])
+    cache.put("b", 0, [2])
+    assert cache.get("a", 0) == [1]  # "a" использован позже "b"
+    cache.put("c", 0, [3])
+    assert cache.get("b", 0) is None
+    assert cache.get("a", 0) == [1]
+    assert cache.get("c", 0) == [3]
+
+    cache.put("d", 0, [1, 2, 3, 4])
+    assert cache.get("d", 0) is None
+    assert len(cache) == 2
+
+
+def test_generation() -> None:
+    """
+    Проверяем, что результат, сохранённый при прежнем поколении данных, не выдаётся и удаляется из кэша,
+    а изменение списка вызывающим кодом не меняет результат в кэше.
+    @return: None
+    """
+    cache = QueryCache()
+    generation = data_generation("test_generation")
+    cache.put("a", generation, [1, 2])
+    rows = cache.get("a", generation)
+    assert rows == [1, 2]
+    rows.append(3)
+    assert cache.get("a", generation) == [1, 2]
+
+    bump_generation("test_generation")
+    assert data_generation("test_generation") == generation + 1
+    assert cache.get("a", data_generation("test_generation")) is None
+    assert len(cache) == 0
+    assert cache.stats == {"hits": 2, "misses": 1}
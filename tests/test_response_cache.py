@@ -0,0 +1,53 @@
+from itertools import count
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache(tmpdir: str) -> Iterator[ResponseCache]:
+    """
+    Фикстура кэша ответов размером не больше 10 байт.
+    @param tmpdir: Каталог для файла кэша.
+    @return: Экземпляр класса ResponseCache.
+    """
+    response_cache = ResponseCache(path=str(tmpdir.join("cache.sqlite")), max_bytes=10)
+    yield response_cache
+    response_cache.close()
+
+
+def test_key() -> None:
+    """
+    Проверяем, что ключ кэша не зависит от порядка параметров запроса.
+    @return: None
+    """
+    assert ResponseCache.key("url", {"a": 1, "b": 2}) == ResponseCache.key("url", {"b": 2, "a": 1})
+    assert ResponseCache.key("url", {"a": 1}) != ResponseCache.key("url", {"a": 2})
+
+
+@patch("src.response_cache.time.time", side_effect=count())
+def test_lru_eviction(mock_time: MagicMock, cache: ResponseCache) -> None:
+    """
+    Проверяем, что при превышении размера вытесняется давно не использованная запись.
+    @param mock_time: Заглушка для time.time (каждый вызов возвращает следующую секунду).
+    @param cache: Экземпляр класса ResponseCache.
+    @return: None
+    """
+    cache.put("a", 200, {"ETag": "1"}, b"aaaa")
+    cache.put("b", 200, {}, b"bbbb")
+    assert cache.get("a") is not None  # Запись "a" использована позже записи "b"
+    cache.put("c", 200, {}, b"cccc")
+
+    assert cache.get("b") is None
+    cached = cache.get("a")
+    assert cached is not None
+    assert cached.content == b"aaaa"
+    assert cached.header("etag") == "1"
+    assert cache.stats["evicted"] == 1
+
+    # Ответ больше размера кэша не сохраняется
+    cache.put("d", 200, {}, b"d" * 11)
+    assert cache.get("d") is None
@@ -0,0 +1,57 @@
+from datetime import date
+
+from src.schema import SCHEMA, SCHEMA_VERSION, VACANCIES, monthly_partitions, schema_version
+
+
+def test_create_query() -> None:
+    """
+    Проверяем, что секционированная таблица включает столбец секционирования в первичный ключ.
+    @return: None
+    """
+    query = VACANCIES.create_query()
+    assert query.startswith("CREATE TABLE IF NOT EXISTS vacancies (")
+    assert "vacancy_id BIGINT" in query
+    assert "PRIMARY KEY (vacancy_id)" in query
+    assert "PARTITION BY" not in query
+
+    query = VACANCIES.create_query(partitioned=True)
+    assert "PRIMARY KEY (vacancy_id, published_at)" in query
+    assert query.endswith("PARTITION BY RANGE (published_at)")
+
+
+def test_index_queries() -> None:
+    """
+    Проверяем формирование запросов создания индексов, в том числе частичного.
+    @return: None
+    """
+    queries = VACANCIES.index_queries()
+    assert len(queries) == len(VACANCIES.indexes)
+    assert (
+        "CREATE INDEX IF NOT EXISTS vacancies_salary_idx ON vacancies USING btree "
+        "(salary_currency, salary, vacancy_id) WHERE salary IS NOT NULL"
+    ) in queries
+
+
+def test_schema_version() -> None:
+    """
+    Проверяем, что версия схемы меняется при изменении описания таблиц.
+    @return: None
+    """
+    assert len(SCHEMA_VERSION) == 32
+    assert schema_version(SCHEMA) == SCHEMA_VERSION
+    assert schema_version(SCHEMA[:-1]) != SCHEMA_VERSION
+
+
+def test_monthly_partitions() -> None:
+    """
+    Проверяем, что помесячные секции идут подряд и переходят через границу года.
+    @return: None
+    """
+    partitions = monthly_partitions("vacancies", date(2024, 11, 15), 3)
+    names = [partition.name for partition in partitions]
+    assert names == ["vacancies_2024_11", "vacancies_2024_12", "vacancies_2025_01"]
+    assert partitions[1].end == date(2025, 1, 1)
+    assert partitions[2].create_query() == (
+        "CREATE TABLE IF NOT EXISTS vacancies_2025_01 PARTITION OF vacancies FOR VALUES FROM ('2025-01-01') TO "
+        "('2025-02-01')"
+    )
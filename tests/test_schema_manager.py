@@ -0,0 +1,117 @@
+import copy
+from typing import Iterator
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.models import Vacancy
+from src.schema_manager import (
+    CLOSE_MISSING_VACANCIES_QUERY,
+    VACANCIES_COLUMNS,
+    SchemaManager,
+    _as_records,
+    _vacancy_row,
+)
+
+
+def test_vacancy_row(vacancy: dict) -> None:
+    """
+    Проверяем формирование строки таблицы vacancies из записи о вакансии.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    row = dict(zip(VACANCIES_COLUMNS, _vacancy_row(Vacancy.from_api(vacancy))))
+    assert row["vacancy_id"] == "112074842"
+    assert row["company_id"] == "1480667"
+    assert row["salary"] == 114500
+    assert row["salary_currency"] == "RUR"
+    assert row["requirement"] == "Уверенно знаете Go."
+    assert row["responsibility"] is None
+
+
+def test_content_hash(vacancy: dict) -> None:
+    """
+    Проверяем, что хэш содержимого меняется только при изменении сохраняемых полей вакансии.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    content_hash = _vacancy_row(Vacancy.from_api(vacancy))[-1]
+    assert len(content_hash) == 32
+
+    unchanged = copy.deepcopy(vacancy)
+    unchanged["premium"] = True  # Поле не сохраняется в базе данных
+    assert _vacancy_row(Vacancy.from_api(unchanged))[-1] == content_hash
+
+    changed = copy.deepcopy(vacancy)
+    changed["salary"]["from"] = 120000
+    assert _vacancy_row(Vacancy.from_api(changed))[-1] != content_hash
+
+
+def test_as_records(vacancy: dict) -> None:
+    """
+    Проверяем, что словари из ответа API преобразуются в записи, а записи передаются как есть.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    record = Vacancy.from_api(vacancy)
+    converted, same = _as_records([vacancy, record])
+
+    assert converted == record
+    assert same is record
+
+
+def executed_queries(cur: MagicMock) -> list[str]:
+    """
+    Получает запросы, выполненные через заглушку курсора.
+    @param cur: Заглушка курсора psycopg2.
+    @return: Список текстов запросов.
+    """
+    return [call.args[0] for call in cur.execute.call_args_list]
+
+
+def test_insert_data_page_error(vacancy: dict) -> None:
+    """
+    Проверяем, что ошибка загрузки страницы при инкрементальной загрузке прерывает её до фиксации транзакции,
+    и отсутствующие в загруженных данных вакансии не закрываются.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+
+    def pages() -> Iterator[dict]:
+        yield vacancy
+        raise RuntimeError("Failed to load page 1 for keyword 'python'")
+
+    with patch("src.schema_manager.psycopg2.connect") as connect:
+        cur = connect.return_value.cursor.return_value.__enter__.return_value
+        with pytest.raises(RuntimeError):
+            SchemaManager({}).insert_data("test", pages(), batch_size=1, incremental=True, scope="python|1|10|0")
+
+    connect.return_value.commit.assert_not_called()
+    assert CLOSE_MISSING_VACANCIES_QUERY not in executed_queries(cur)
+
+
+def test_insert_data_scope(vacancy: dict) -> None:
+    """
+    Проверяем, что закрываются только вакансии того же запроса к API, а без загруженных вакансий
+    или без ключа запроса вакансии не закрываются.
+    @param vacancy: Данные о вакансии.
+    @return: None
+    """
+    with patch("src.schema_manager.psycopg2.connect") as connect:
+        cur = connect.return_value.cursor.return_value.__enter__.return_value
+        cur.fetchall.return_value = []
+        cur.rowcount = 0
+
+        cur.fetchone.return_value = (True,)
+        SchemaManager({}).insert_data("test", [vacancy], incremental=True, scope="python|1|10|0")
+        assert (CLOSE_MISSING_VACANCIES_QUERY, ["python|1|10|0"]) in [call.args for call in cur.execute.call_args_list]
+
+        cur.reset_mock()
+        cur.fetchone.return_value = (False,)
+        SchemaManager({}).insert_data("test", [], incremental=True, scope="python|1|10|0")
+        assert CLOSE_MISSING_VACANCIES_QUERY not in executed_queries(cur)
+
+        cur.reset_mock()
+        cur.fetchone.return_value = (True,)
+        SchemaManager({}).insert_data("test", [vacancy], incremental=True)
+        assert CLOSE_MISSING_VACANCIES_QUERY not in executed_queries(cur)
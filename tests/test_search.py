@@ -0,0 +1,63 @@
+import pytest
+
+from src.search import build_search_page_query, build_search_query
+
+
+def test_substring_query() -> None:
+    """
+    Проверяем запрос поиска подстроки в названии вакансии с семантикой OR и AND.
+    @return: None
+    """
+    query, params = build_search_query("python django")
+    assert "vacancy_name ILIKE %s OR vacancy_name ILIKE %s" in query
+    assert params == ["%python%", "%django%", "%python%", "%django%"]
+
+    query, params = build_search_query("python django", match_all=True)
+    assert "vacancy_name ILIKE %s AND vacancy_name ILIKE %s" in query
+
+
+def test_fts_query() -> None:
+    """
+    Проверяем запрос полнотекстового поиска: каждое слово ищется в русской и английской конфигурациях.
+    @return: None
+    """
+    query, params = build_search_query("python разработчик", mode="fts", match_all=True)
+    assert query.count("plainto_tsquery('russian', %s)") == 2
+    assert query.count("plainto_tsquery('english', %s)") == 2
+    assert ") && (" in query
+    assert "ts_rank_cd" in query
+    assert params == ["python", "python", "разработчик", "разработчик"]
+
+
+def test_empty_keywords() -> None:
+    """
+    Проверяем, что пустая строка ключевых слов не приводит к ошибке SQL.
+    @return: None
+    """
+    query, params = build_search_query("  ", mode="fts")
+    assert "WHERE FALSE" in query
+    assert params == []
+
+
+def test_unknown_mode() -> None:
+    """
+    Проверяем ошибку при неизвестном режиме поиска.
+    @return: None
+    """
+    with pytest.raises(ValueError):
+        build_search_query("python", mode="regex")
+
+
+def test_build_search_page_query() -> None:
+    """
+    Проверяем порядок параметров запроса страницы: ранг, условие поиска, ключ курсора, LIMIT.
+    @return: None
+    """
+    query, params = build_search_page_query("python django", after=["Python-разработчик", 10, 2], limit=21)
+    assert query.index("::int") < query.index("vacancy_name ILIKE %s OR")
+    assert "rank < %s::real" in query
+    assert params == ["%python%", "%django%", "%python%", "%django%", 2, 2, "Python-разработчик", 10, 21]
+
+    query, params = build_search_page_query("python", mode="fts", limit=21)
+    assert "ts_rank_cd" in query and "rank < %s::real" not in query
+    assert params == ["python", "python", 21]
@@ -0,0 +1,143 @@
+import sqlite3
+from pathlib import Path
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+from src.sqlite_backend import SqliteBackend, build_fts_match
+from src.storage import PostgresBackend, open_backend
+
+
+def make_vacancy(vacancy: dict, vacancy_id: str, name: str, salary: int, employer_id: str = "1480667") -> dict:
+    """
+    Создаёт вакансию в формате ответа API на основе фикстуры.
+    @param vacancy: Фикстура вакансии.
+    @param vacancy_id: ID вакансии.
+    @param name: Название вакансии.
+    @param salary: Зарплата.
+    @param employer_id: ID работодателя.
+    @return: Словарь с данными о вакансии.
+    """
+    employer = dict(vacancy["employer"], id=employer_id, name="Компания %s" % employer_id)
+    salary_data = dict(vacancy["salary"], **{"from": salary})
+    return dict(vacancy, id=vacancy_id, name=name, employer=employer, salary=salary_data)
+
+
+@pytest.fixture
+def backend(vacancy: dict, tmp_path: Path) -> Iterator[SqliteBackend]:
+    """
+    База данных SQLite во временном каталоге с тремя вакансиями двух компаний.
+    @return: Экземпляр SqliteBackend.
+    """
+    with SqliteBackend(str(tmp_path / "headhunter.sqlite")) as store:
+        store.create_schema()
+        store.insert_data(
+            [
+                make_vacancy(vacancy, "1", "Python-разработчик", 100000),
+                make_vacancy(vacancy, "2", "Разработчик Go", 200000),
+                make_vacancy(vacancy, "3", "Аналитик", 60000, employer_id="2"),
+            ],
+            scope="python|1|10|0",
+        )
+        yield store
+
+
+def test_reports(backend: SqliteBackend) -> None:
+    """
+    Проверяем запросы отчётов: количество вакансий у компаний, список вакансий и средняя зарплата по валютам.
+    @return: None
+    """
+    assert backend.get_companies_and_vacancies_count() == [("Компания 1480667", 2), ("Компания 2", 1)]
+    assert [row[:3] for row in backend.get_all_vacancies()] == [
+        ("Python-разработчик", "Компания 1480667", 100000),
+        ("Аналитик", "Компания 2", 60000),
+        ("Разработчик Go", "Компания 1480667", 200000),
+    ]
+    assert backend.get_avg_salary() == [(120000.0, "RUR")]
+    assert backend.get_vacancies_with_higher_salary() == [("Разработчик Go", 200000, "RUR")]
+
+
+def test_keyword_search(backend: SqliteBackend) -> None:
+    """
+    Проверяем поиск подстроки без учёта регистра (в том числе кириллицы) и полнотекстовый поиск FTS5 по префиксам.
+    @return: None
+    """
+    assert backend.get_vacancies_with_keyword("разработчик go") == [
+        ("Разработчик Go", 200000, "RUR"),
+        ("Python-разработчик", 100000, "RUR"),
+    ]
+    assert backend.get_vacancies_with_keyword("разработчик go", match_all=True) == [("Разработчик Go", 200000, "RUR")]
+    assert backend.get_vacancies_with_keyword("  ") == []
+    with pytest.raises(ValueError):
+        backend.get_vacancies_with_keyword("python", mode="regex")
+
+    assert build_fts_match(['say"', "go"], match_all=True) == '"say"""* AND "go"*'
+    if backend.fts:
+        assert backend.get_vacancies_with_keyword("аналит", mode="fts") == [("Аналитик", 60000, "RUR")]
+        # Слова ищутся и в требованиях к кандидату
+        assert len(backend.get_vacancies_with_keyword("уверенно", mode="fts")) == 3
+
+
+def test_incremental(backend: SqliteBackend, vacancy: dict) -> None:
+    """
+    Проверяем, что инкрементальная загрузка обновляет изменившиеся вакансии (и полнотекстовый индекс),
+    а отсутствующие в данных вакансии того же запроса к API помечает закрытыми.
+    @return: None
+    """
+    # Без ключа запроса и без загруженных вакансий вакансии не закрываются
+    backend.insert_data([make_vacancy(vacancy, "1", "Python-разработчик", 100000)], incremental=True)
+    backend.insert_data([], incremental=True, scope="python|1|10|0")
+    assert len(backend.get_all_vacancies()) == 3
+
+    backend.insert_data(
+        [make_vacancy(vacancy, "1", "Java-разработчик", 150000)], incremental=True, scope="python|1|10|0"
+    )
+
+    assert backend.get_all_vacancies()[0][:3] == ("Java-разработчик", "Компания 1480667", 150000)
+    assert backend.get_companies_and_vacancies_count() == [("Компания 1480667", 1)]
+    if backend.fts:
+        assert backend.get_vacancies_with_keyword("python", mode="fts") == []
+        assert backend.get_vacancies_with_keyword("java", mode="fts") == [("Java-разработчик", 150000, "RUR")]
+
+
+def test_add_ingest_key_column(tmp_path: Path) -> None:
+    """
+    Проверяем, что в базу данных, созданную без столбца ingest_key, столбец добавляется при создании схемы.
+    @return: None
+    """
+    path = str(tmp_path / "headhunter.sqlite")
+    with SqliteBackend(path) as store:
+        store.create_schema()
+    conn = sqlite3.connect(path)
+    conn.execute("ALTER TABLE vacancies DROP COLUMN ingest_key")
+    conn.close()
+
+    with SqliteBackend(path) as store:
+        store.create_schema(recreate=False)
+    conn = sqlite3.connect(path)
+    assert "ingest_key" in {row[1] for row in conn.execute("PRAGMA table_info(vacancies)")}
+    conn.close()
+
+
+def test_postgres_backend() -> None:
+    """
+    Проверяем, что хранилище PostgreSQL передаёт вызовы SchemaManager и DBManager с именем базы данных.
+    @return: None
+    """
+    with patch("src.storage.SchemaManager") as schema_manager, patch("src.storage.DBManager") as db_manager:
+        with open_backend("postgresql", connection_parameters={}, data_base_name="test", cache_size=0) as store:
+            assert isinstance(store, PostgresBackend)
+            store.create_schema(recreate=False)
+            store.insert_data([], incremental=True)
+            store.get_vacancies_with_keyword("python", mode="fts")
+
+    db_manager.assert_called_once_with({}, cache_size=0)
+    schema_manager.return_value.create_database.assert_called_once_with("test", recreate=False)
+    schema_manager.return_value.insert_data.assert_called_once_with(
+        "test", [], batch_size=5000, incremental=True, scope=None
+    )
+    db_manager.return_value.get_vacancies_with_keyword.assert_called_once_with("test", "python", "fts", False)
+    db_manager.return_value.close.assert_called_once()
+    with pytest.raises(ValueError):
+        open_backend("mysql")
@@ -0,0 +1,33 @@
+from unittest.mock import MagicMock
+
+from src.stats import refresh_stats
+
+
+def test_refresh_all() -> None:
+    """
+    Проверяем, что без списка ключей сводные таблицы пересчитываются полностью.
+    @return: None
+    """
+    cursor = MagicMock()
+    refresh_stats(cursor)
+
+    queries = [call.args[0] for call in cursor.execute.call_args_list]
+    assert queries[0] == "DELETE FROM salary_stats"
+    assert "TRUE" in queries[1] and "percentile_cont(0.5)" in queries[1]
+    assert queries[2] == "DELETE FROM company_stats"
+    assert "TRUE" in queries[3]
+
+
+def test_refresh_affected_keys() -> None:
+    """
+    Проверяем, что пересчитываются только затронутые валюты, а пустой набор компаний не приводит к запросам.
+    @return: None
+    """
+    cursor = MagicMock()
+    refresh_stats(cursor, currencies={"RUR"}, company_ids=set())
+
+    assert cursor.execute.call_count == 2
+    delete, insert = cursor.execute.call_args_list
+    assert delete.args == ("DELETE FROM salary_stats WHERE salary_currency = ANY(%s)", [["RUR"]])
+    assert "salary_currency = ANY(%s)" in insert.args[0]
+    assert insert.args[1] == [["RUR"]]